@@ -29,3 +29,26 @@ CREATE TABLE IF NOT EXISTS market_data.tick_data (
     spread DOUBLE PRECISION,
     tick_size DOUBLE PRECISION
 );
+
+-- Create table tracking the outcome of every historical backfill chunk
+CREATE TABLE IF NOT EXISTS market_data.backfill_chunks (
+    symbol TEXT NOT NULL,
+    chunk_start TIMESTAMP NOT NULL,
+    chunk_end TIMESTAMP NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL CHECK (status IN ('done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (symbol, chunk_start)
+);
+
+CREATE INDEX IF NOT EXISTS backfill_chunks_failed_idx
+    ON market_data.backfill_chunks (symbol, chunk_start) WHERE status = 'failed';
+
+-- Create table holding the range the last backfill run planned per symbol
+CREATE TABLE IF NOT EXISTS market_data.backfill_runs (
+    symbol TEXT PRIMARY KEY,
+    range_start TIMESTAMP NOT NULL,
+    range_end TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
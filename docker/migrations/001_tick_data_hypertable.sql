@@ -0,0 +1,42 @@
+-- 001_tick_data_hypertable.sql
+-- Purpose: Turn market_data.tick_data into a compressed hypertable with a dedup key
+
+CREATE EXTENSION IF NOT EXISTS timescaledb;
+
+-- Remove duplicate ticks so the unique index can be built
+DELETE FROM market_data.tick_data t
+USING (
+    SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY symbol, tick_time, bid_price, ask_price ORDER BY id
+    ) AS copy_number
+    FROM market_data.tick_data
+) duplicates
+WHERE t.id = duplicates.id AND duplicates.copy_number > 1;
+
+-- A global serial key cannot be enforced across chunks and is never queried
+ALTER TABLE market_data.tick_data DROP CONSTRAINT IF EXISTS tick_data_pkey;
+ALTER TABLE market_data.tick_data DROP COLUMN IF EXISTS id;
+
+-- Partition by time (1 day chunks) and by symbol
+SELECT create_hypertable(
+    'market_data.tick_data', 'tick_time',
+    partitioning_column => 'symbol',
+    number_partitions => 4,
+    chunk_time_interval => INTERVAL '1 day',
+    create_default_indexes => FALSE,
+    migrate_data => TRUE,
+    if_not_exists => TRUE
+);
+
+-- Dedup key used by ON CONFLICT in the loaders; also serves symbol + time range scans
+CREATE UNIQUE INDEX IF NOT EXISTS tick_data_symbol_time_bid_ask_key
+    ON market_data.tick_data (symbol, tick_time, bid_price, ask_price);
+
+-- Native compression, one segment per symbol, ordered by time within a segment
+ALTER TABLE market_data.tick_data SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'symbol',
+    timescaledb.compress_orderby = 'tick_time'
+);
+
+SELECT add_compression_policy('market_data.tick_data', INTERVAL '7 days', if_not_exists => TRUE);
@@ -0,0 +1,38 @@
+-- 002_historical_data_hypertable.sql
+-- Purpose: Turn market_data.historical_data into a compressed hypertable with a dedup key
+
+CREATE EXTENSION IF NOT EXISTS timescaledb;
+
+-- Remove duplicate bars so the unique index can be built
+DELETE FROM market_data.historical_data h
+USING (
+    SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY symbol, timeframe, open_time ORDER BY id DESC
+    ) AS copy_number
+    FROM market_data.historical_data
+) duplicates
+WHERE h.id = duplicates.id AND duplicates.copy_number > 1;
+
+ALTER TABLE market_data.historical_data DROP CONSTRAINT IF EXISTS historical_data_pkey;
+ALTER TABLE market_data.historical_data DROP COLUMN IF EXISTS id;
+
+SELECT create_hypertable(
+    'market_data.historical_data', 'open_time',
+    partitioning_column => 'symbol',
+    number_partitions => 4,
+    chunk_time_interval => INTERVAL '30 days',
+    create_default_indexes => FALSE,
+    migrate_data => TRUE,
+    if_not_exists => TRUE
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS historical_data_symbol_timeframe_time_key
+    ON market_data.historical_data (symbol, timeframe, open_time);
+
+ALTER TABLE market_data.historical_data SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'symbol, timeframe',
+    timescaledb.compress_orderby = 'open_time'
+);
+
+SELECT add_compression_policy('market_data.historical_data', INTERVAL '30 days', if_not_exists => TRUE);
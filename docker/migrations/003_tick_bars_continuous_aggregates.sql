@@ -0,0 +1,108 @@
+-- migrate:no-transaction
+-- 003_tick_bars_continuous_aggregates.sql
+-- Purpose: Bid OHLC bars derived from market_data.tick_data as continuous aggregates
+-- (1m from ticks; 5m, 15m, 1h and 1d each rolled up from the previous level).
+-- Continuous aggregates cannot be created inside a transaction, so every
+-- statement here commits on its own and is safe to re-run.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS market_data.tick_bars_1m
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+SELECT symbol,
+       time_bucket(INTERVAL '1 minute', tick_time) AS bucket,
+       first(bid_price, tick_time) AS open,
+       max(bid_price) AS high,
+       min(bid_price) AS low,
+       last(bid_price, tick_time) AS close,
+       min(ask_price - bid_price) AS spread_min,
+       max(ask_price - bid_price) AS spread_max,
+       sum(ask_price - bid_price) AS spread_sum,
+       count(*) AS tick_count,
+       sum(volume) AS volume
+FROM market_data.tick_data
+GROUP BY symbol, time_bucket(INTERVAL '1 minute', tick_time);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS market_data.tick_bars_5m
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+SELECT symbol,
+       time_bucket(INTERVAL '5 minutes', bucket) AS bucket,
+       first(open, bucket) AS open,
+       max(high) AS high,
+       min(low) AS low,
+       last(close, bucket) AS close,
+       min(spread_min) AS spread_min,
+       max(spread_max) AS spread_max,
+       sum(spread_sum) AS spread_sum,
+       sum(tick_count) AS tick_count,
+       sum(volume) AS volume
+FROM market_data.tick_bars_1m
+GROUP BY symbol, time_bucket(INTERVAL '5 minutes', bucket);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS market_data.tick_bars_15m
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+SELECT symbol,
+       time_bucket(INTERVAL '15 minutes', bucket) AS bucket,
+       first(open, bucket) AS open,
+       max(high) AS high,
+       min(low) AS low,
+       last(close, bucket) AS close,
+       min(spread_min) AS spread_min,
+       max(spread_max) AS spread_max,
+       sum(spread_sum) AS spread_sum,
+       sum(tick_count) AS tick_count,
+       sum(volume) AS volume
+FROM market_data.tick_bars_5m
+GROUP BY symbol, time_bucket(INTERVAL '15 minutes', bucket);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS market_data.tick_bars_1h
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+SELECT symbol,
+       time_bucket(INTERVAL '1 hour', bucket) AS bucket,
+       first(open, bucket) AS open,
+       max(high) AS high,
+       min(low) AS low,
+       last(close, bucket) AS close,
+       min(spread_min) AS spread_min,
+       max(spread_max) AS spread_max,
+       sum(spread_sum) AS spread_sum,
+       sum(tick_count) AS tick_count,
+       sum(volume) AS volume
+FROM market_data.tick_bars_15m
+GROUP BY symbol, time_bucket(INTERVAL '1 hour', bucket);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS market_data.tick_bars_1d
+WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+SELECT symbol,
+       time_bucket(INTERVAL '1 day', bucket) AS bucket,
+       first(open, bucket) AS open,
+       max(high) AS high,
+       min(low) AS low,
+       last(close, bucket) AS close,
+       min(spread_min) AS spread_min,
+       max(spread_max) AS spread_max,
+       sum(spread_sum) AS spread_sum,
+       sum(tick_count) AS tick_count,
+       sum(volume) AS volume
+FROM market_data.tick_bars_1h
+GROUP BY symbol, time_bucket(INTERVAL '1 day', bucket);
+
+-- Refresh policies: each level keeps its recent buckets current; bars older
+-- than start_offset are refreshed explicitly after a backfill (see bar_queries.refresh_bars)
+SELECT add_continuous_aggregate_policy('market_data.tick_bars_1m',
+    start_offset => INTERVAL '3 hours', end_offset => INTERVAL '1 minute',
+    schedule_interval => INTERVAL '1 minute', if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('market_data.tick_bars_5m',
+    start_offset => INTERVAL '6 hours', end_offset => INTERVAL '5 minutes',
+    schedule_interval => INTERVAL '5 minutes', if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('market_data.tick_bars_15m',
+    start_offset => INTERVAL '12 hours', end_offset => INTERVAL '15 minutes',
+    schedule_interval => INTERVAL '15 minutes', if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('market_data.tick_bars_1h',
+    start_offset => INTERVAL '2 days', end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '1 hour', if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('market_data.tick_bars_1d',
+    start_offset => INTERVAL '7 days', end_offset => INTERVAL '1 day',
+    schedule_interval => INTERVAL '1 day', if_not_exists => TRUE);
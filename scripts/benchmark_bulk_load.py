@@ -0,0 +1,125 @@
+"""
+scripts/benchmark_bulk_load.py
+
+Bulk Load Benchmark
+===================
+
+Measures tick ingestion throughput (rows/sec) into a scratch copy of
+market_data.tick_data using the old per-row INSERT path and the COPY-based
+bulk loader on an Arrow table (copy_tick_table, as the collector and the
+backfill use it). Run it against a local PostgreSQL/TimescaleDB instance:
+
+    python scripts/benchmark_bulk_load.py --rows 200000
+"""
+
+import sys
+import time
+import random
+import argparse
+import psycopg2
+import pyarrow as pa
+from pathlib import Path
+from datetime import datetime, timedelta
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src" / "utils"))
+from bulk_loader import copy_tick_table
+from tick_columns import TICK_TABLE_SCHEMA
+
+DB_CONFIG = {
+    "dbname": "market_data",
+    "user": "market_collector",
+    "password": "1331",
+    "host": "localhost",
+    "port": 15433,
+}
+
+BENCH_TABLE = "market_data.tick_data_bench"
+
+
+def create_bench_table(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE SCHEMA IF NOT EXISTS market_data;
+            DROP TABLE IF EXISTS {BENCH_TABLE};
+            CREATE TABLE {BENCH_TABLE} (
+                id SERIAL PRIMARY KEY,
+                symbol TEXT NOT NULL,
+                tick_time TIMESTAMP NOT NULL,
+                bid_price DOUBLE PRECISION NOT NULL,
+                ask_price DOUBLE PRECISION NOT NULL,
+                last_price DOUBLE PRECISION,
+                volume DOUBLE PRECISION,
+                spread DOUBLE PRECISION,
+                tick_size DOUBLE PRECISION
+            );
+            CREATE UNIQUE INDEX ON {BENCH_TABLE} (symbol, tick_time, bid_price, ask_price);
+        """)
+    conn.commit()
+
+
+def generate_rows(count, symbol="EURUSD"):
+    start = datetime(2024, 1, 2)
+    price = 1.1
+    rows = []
+    for i in range(count):
+        price += random.uniform(-1e-4, 1e-4)
+        bid = round(price, 5)
+        ask = round(price + 0.00012, 5)
+        rows.append((symbol, start + timedelta(milliseconds=150 * i), bid, ask,
+                     0.0, 0, ask - bid, None))
+    return rows
+
+
+def insert_per_row(conn, rows):
+    with conn.cursor() as cursor:
+        cursor.executemany(f"""
+            INSERT INTO {BENCH_TABLE} (symbol, tick_time, bid_price, ask_price, last_price, volume, spread, tick_size)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (symbol, tick_time, bid_price, ask_price) DO NOTHING;
+        """, rows)
+    conn.commit()
+
+
+def rows_to_table(rows):
+    # Capture already produces Arrow tables, so building this one is not timed
+    return pa.Table.from_arrays(
+        [pa.array(column, field.type) for column, field in zip(zip(*rows), TICK_TABLE_SCHEMA)],
+        schema=TICK_TABLE_SCHEMA,
+    )
+
+
+def insert_copy(conn, table):
+    copy_tick_table(conn, table, target=BENCH_TABLE)
+    conn.commit()
+
+
+def run(conn, name, loader, rows):
+    create_bench_table(conn)
+    started = time.perf_counter()
+    loader(conn, rows)
+    elapsed = time.perf_counter() - started
+    print(f"{name:>10}: {len(rows):>9} rows in {elapsed:8.2f}s -> {len(rows) / elapsed:>12,.0f} rows/sec")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dsn", help="libpq connection string (defaults to DB_CONFIG)")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn) if args.dsn else psycopg2.connect(**DB_CONFIG)
+    try:
+        rows = generate_rows(args.rows)
+        baseline = run(conn, "executemany", insert_per_row, rows)
+        bulk = run(conn, "copy", insert_copy, rows_to_table(rows))
+        print(f"Speedup: {baseline / bulk:.1f}x")
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE};")
+        conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+scripts/benchmark_schema.py
+
+Tick Schema Benchmark
+=====================
+
+Compares the original plain tick_data table against the hypertable layout
+from docker/migrations/001_tick_data_hypertable.sql on a synthetic year of
+ticks: symbol + time range scan latency and on-disk size before and after
+native compression. Needs a TimescaleDB instance; the data is generated
+server-side in a scratch schema that is dropped afterwards.
+
+    python scripts/benchmark_schema.py --symbols 4 --step "10 seconds"
+"""
+
+import time
+import argparse
+import statistics
+import psycopg2
+from datetime import datetime, timedelta
+
+DB_CONFIG = {
+    "dbname": "market_data",
+    "user": "market_collector",
+    "password": "1331",
+    "host": "localhost",
+    "port": 15433,
+}
+
+BENCH_SCHEMA = "market_data_bench"
+PLAIN_TABLE = f"{BENCH_SCHEMA}.tick_data_plain"
+HYPER_TABLE = f"{BENCH_SCHEMA}.tick_data_hyper"
+
+COLUMNS = """
+    symbol TEXT NOT NULL,
+    tick_time TIMESTAMP NOT NULL,
+    bid_price DOUBLE PRECISION NOT NULL,
+    ask_price DOUBLE PRECISION NOT NULL,
+    last_price DOUBLE PRECISION,
+    volume DOUBLE PRECISION,
+    spread DOUBLE PRECISION,
+    tick_size DOUBLE PRECISION
+"""
+
+# Range scans measured on both layouts
+WINDOWS = [timedelta(hours=1), timedelta(days=1), timedelta(days=7), timedelta(days=30)]
+
+
+def create_tables(cursor):
+    cursor.execute(f"""
+        CREATE EXTENSION IF NOT EXISTS timescaledb;
+        DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;
+        CREATE SCHEMA {BENCH_SCHEMA};
+
+        -- Original layout (plus the dedup index ON CONFLICT needs)
+        CREATE TABLE {PLAIN_TABLE} (id SERIAL PRIMARY KEY, {COLUMNS});
+        CREATE UNIQUE INDEX ON {PLAIN_TABLE} (symbol, tick_time, bid_price, ask_price);
+
+        -- Migrated layout
+        CREATE TABLE {HYPER_TABLE} ({COLUMNS});
+        SELECT create_hypertable('{HYPER_TABLE}', 'tick_time',
+            partitioning_column => 'symbol', number_partitions => 4,
+            chunk_time_interval => INTERVAL '1 day', create_default_indexes => FALSE);
+        CREATE UNIQUE INDEX ON {HYPER_TABLE} (symbol, tick_time, bid_price, ask_price);
+        ALTER TABLE {HYPER_TABLE} SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = 'symbol',
+            timescaledb.compress_orderby = 'tick_time'
+        );
+    """)
+
+
+def load_ticks(cursor, table, symbols, start, end, step):
+    # Random walk per symbol, generated on the server
+    cursor.execute(f"""
+        INSERT INTO {table} (symbol, tick_time, bid_price, ask_price, spread)
+        SELECT symbol, tick_time, bid, bid + 0.00012, 0.00012
+        FROM (
+            SELECT s.symbol, t AS tick_time,
+                   1.1 + sum(random() * 0.0002 - 0.0001) OVER (PARTITION BY s.symbol ORDER BY t) AS bid
+            FROM unnest(%s::text[]) AS s(symbol),
+                 generate_series(%s::timestamp, %s::timestamp, %s::interval) AS t
+        ) walk;
+    """, (symbols, start, end - timedelta(milliseconds=1), step))
+
+
+def table_size(cursor, table, hypertable):
+    if hypertable:
+        cursor.execute("SELECT hypertable_size(%s::regclass);", (table,))
+    else:
+        cursor.execute("SELECT pg_total_relation_size(%s::regclass);", (table,))
+    return cursor.fetchone()[0]
+
+
+def time_range_scan(cursor, table, symbol, start, window, repeat):
+    timings = []
+    for i in range(repeat):
+        # Move the window around so the buffer cache is not the only thing measured
+        window_start = start + timedelta(days=(i * 37) % 300)
+        started = time.perf_counter()
+        cursor.execute(f"""
+            SELECT count(*), min(bid_price), max(ask_price)
+            FROM {table}
+            WHERE symbol = %s AND tick_time >= %s AND tick_time < %s;
+        """, (symbol, window_start, window_start + window))
+        cursor.fetchone()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def report_scans(cursor, label, symbol, start, repeat):
+    for window in WINDOWS:
+        plain = time_range_scan(cursor, PLAIN_TABLE, symbol, start, window, repeat)
+        hyper = time_range_scan(cursor, HYPER_TABLE, symbol, start, window, repeat)
+        print(f"{label:>12} {str(window):>16}: plain {plain * 1000:9.1f} ms | "
+              f"hypertable {hyper * 1000:9.1f} ms | {plain / hyper:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=4)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--step", default="10 seconds", help="interval between synthetic ticks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schema")
+    parser.add_argument("--dsn", help="libpq connection string (defaults to DB_CONFIG)")
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i:02d}" for i in range(args.symbols)]
+    start = datetime(2023, 1, 2)
+    end = start + timedelta(days=args.days)
+
+    conn = psycopg2.connect(args.dsn) if args.dsn else psycopg2.connect(**DB_CONFIG)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        create_tables(cursor)
+        for table in (PLAIN_TABLE, HYPER_TABLE):
+            started = time.perf_counter()
+            load_ticks(cursor, table, symbols, start, end, args.step)
+            print(f"Loaded {cursor.rowcount} ticks into {table} in {time.perf_counter() - started:.1f}s")
+            cursor.execute(f"ANALYZE {table};")
+
+        plain_size = table_size(cursor, PLAIN_TABLE, hypertable=False)
+        hyper_size = table_size(cursor, HYPER_TABLE, hypertable=True)
+        report_scans(cursor, "uncompressed", symbols[0], start, args.repeat)
+
+        cursor.execute(f"SELECT count(compress_chunk(c, if_not_compressed => TRUE)) FROM show_chunks('{HYPER_TABLE}') c;")
+        compressed_size = table_size(cursor, HYPER_TABLE, hypertable=True)
+        report_scans(cursor, "compressed", symbols[0], start, args.repeat)
+
+        mb = 1024 * 1024
+        print(f"Size: plain {plain_size / mb:,.0f} MB | hypertable {hyper_size / mb:,.0f} MB | "
+              f"compressed {compressed_size / mb:,.0f} MB ({plain_size / compressed_size:.1f}x smaller)")
+    finally:
+        if not args.keep:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE;")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
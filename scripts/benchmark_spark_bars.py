@@ -0,0 +1,129 @@
+"""
+scripts/benchmark_spark_bars.py
+
+Spark Bar Aggregation Benchmark
+===============================
+
+Builds bars from the Parquet tick archive three ways and reports runtime and
+shuffle bytes of each, read from the Spark UI's REST API:
+
+- legacy:       one groupBy(window, symbol) with first()/last() per timeframe,
+                as SparkProcessor.process_data used to do
+- single-job:   spark_bars.build_bars without pre-partitioning (an exchange per aggregation)
+- partitioned:  spark_bars.build_bars with the ticks hash-partitioned by symbol (one exchange)
+
+Results are written to Spark's no-op sink, so only the computation is timed.
+The legacy bars are also compared with the single-job ones, which take open
+and close by (tick_time, position in the archive): first()/last() after a
+shuffle pick whichever row arrives first, so their opens and closes can
+differ from the true ones.
+
+    spark-submit scripts/benchmark_spark_bars.py --symbols EURUSD XAUUSD --since 2024-01-01 --until 2024-02-01
+"""
+
+import sys
+import json
+import time
+import argparse
+import urllib.request
+from pathlib import Path
+from datetime import date
+
+from pyspark.sql import SparkSession
+from pyspark.sql import functions as F
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src" / "processors"))
+from bar_builder import TIMEFRAME_MINUTES
+from spark_bars import build_bars, with_scan_order
+
+DATASET_DIR = Path("data/tick_dataset")
+
+TIMEFRAMES = ["M1", "M5", "M15", "H1", "H4", "D1"]
+
+
+def stage_metrics(spark, job_group):
+    """(shuffle write bytes, shuffle read bytes) of all stages run under a job group."""
+    sc = spark.sparkContext
+    api = f"{sc.uiWebUrl}/api/v1/applications/{sc.applicationId}"
+    with urllib.request.urlopen(f"{api}/jobs") as response:
+        jobs = [job for job in json.load(response) if job.get("jobGroup") == job_group]
+    stage_ids = {stage_id for job in jobs for stage_id in job["stageIds"]}
+
+    written = read = 0
+    with urllib.request.urlopen(f"{api}/stages") as response:
+        for stage in json.load(response):
+            if stage["stageId"] in stage_ids and stage["status"] == "COMPLETE":
+                written += stage["shuffleWriteBytes"]
+                read += stage["shuffleReadBytes"]
+    return written, read
+
+
+def measure(spark, name, frames):
+    """Run every DataFrame of `frames` into the no-op sink under one job group."""
+    spark.sparkContext.setJobGroup(name, name)
+    started = time.perf_counter()
+    for frame in frames:
+        frame.write.format("noop").mode("overwrite").save()
+    elapsed = time.perf_counter() - started
+    written, read = stage_metrics(spark, name)
+    print(f"{name:<12} {elapsed:>9.1f} s  shuffle write {written / 1024 ** 2:>10,.1f} MB  "
+          f"read {read / 1024 ** 2:>10,.1f} MB  ({len(frames)} writes)")
+
+
+def legacy_bars(ticks, timeframe):
+    # The previous aggregation: order-dependent first()/last() after a shuffle
+    minutes = TIMEFRAME_MINUTES[timeframe]
+    return ticks.groupBy(F.window(F.col("tick_time").cast("timestamp"), f"{minutes} minutes"), "symbol").agg(
+        F.first("bid_price").alias("bid_open"),
+        F.max("bid_price").alias("bid_high"),
+        F.min("bid_price").alias("bid_low"),
+        F.last("bid_price").alias("bid_close"),
+        F.count(F.lit(1)).alias("tick_count"),
+    ).select("symbol", F.col("window.start").cast("timestamp_ntz").alias("bar_time"),
+             "bid_open", "bid_high", "bid_low", "bid_close", "tick_count")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", type=Path, default=DATASET_DIR, help="tick_dataset directory")
+    parser.add_argument("--symbols", nargs="*", help="only these symbols")
+    parser.add_argument("--since", type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, help="day after the last one (YYYY-MM-DD)")
+    parser.add_argument("--timeframes", nargs="*", default=TIMEFRAMES,
+                        help="fixed-width timeframes to build (the legacy window() cannot do W1/MN1)")
+    args = parser.parse_args()
+
+    spark = SparkSession.builder \
+        .appName("SparkBarBenchmark") \
+        .config("spark.sql.session.timeZone", "UTC") \
+        .getOrCreate()
+
+    ticks = with_scan_order(spark.read.parquet(str(args.dir))).select(
+        "symbol", "date", "tick_time", "scan_order", "bid_price", "ask_price", "volume")
+    if args.symbols:
+        ticks = ticks.where(F.col("symbol").isin(args.symbols))
+    if args.since:
+        ticks = ticks.where(F.col("date") >= F.lit(args.since))
+    if args.until:
+        ticks = ticks.where(F.col("date") < F.lit(args.until))
+    ticks = ticks.drop("date")
+    print(f"{ticks.count():,} ticks, timeframes {' '.join(args.timeframes)}")
+
+    measure(spark, "legacy", [legacy_bars(ticks, timeframe) for timeframe in args.timeframes])
+    measure(spark, "single-job", [build_bars(ticks, args.timeframes)])
+    measure(spark, "partitioned", [build_bars(ticks, args.timeframes, partition_by_symbol=True)])
+
+    # How many legacy bars got a wrong open or close
+    bars = build_bars(ticks, args.timeframes).where(F.col("timeframe") == args.timeframes[0])
+    legacy = legacy_bars(ticks, args.timeframes[0]).select(
+        "symbol", "bar_time", F.col("bid_open").alias("legacy_open"), F.col("bid_close").alias("legacy_close"))
+    mismatched = bars.join(legacy, ["symbol", "bar_time"]).where(
+        (F.col("bid_open") != F.col("legacy_open")) | (F.col("bid_close") != F.col("legacy_close"))
+    ).count()
+    print(f"{mismatched:,} of {legacy.count():,} legacy {args.timeframes[0]} bars differ in open or close")
+
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+scripts/compact_tick_dataset.py
+
+Tick Dataset Compaction
+=======================
+
+Rewrites (symbol, day) partitions of the Parquet tick archive that consist of
+many small files or row groups (collector sessions, flushes) into a few large
+zstd files: rows sorted by tick_time (ticks of one millisecond in arrival
+order), repeated ticks dropped, ~1M-row row groups and files of about --target-mb each. New files
+are written under hidden names and swapped in, so readers keep working.
+Today's partitions and partitions with a file in progress are skipped.
+
+    python scripts/compact_tick_dataset.py --dry-run
+    python scripts/compact_tick_dataset.py --symbols EURUSD XAUUSD --since 2024-01-01
+"""
+
+import sys
+import logging
+import argparse
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from datetime import date, datetime
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src" / "utils"))
+from tick_dataset import (
+    IN_PROGRESS_SUFFIX, in_progress_path, install_partition_files, open_writer,
+    part_files, sort_ticks, to_file_table,
+)
+
+DATASET_DIR = Path("C:/DevProjects/trading_system/data/tick_dataset")
+
+ROW_GROUP_SIZE = 1_000_000
+TARGET_FILE_BYTES = 128 * 1024 * 1024
+COMPRESSION = "zstd"
+
+
+class PartitionStats:
+    """Files, row groups, rows and bytes of one partition."""
+
+    def __init__(self, files=0, row_groups=0, rows=0, size=0):
+        self.files = files
+        self.row_groups = row_groups
+        self.rows = rows
+        self.size = size
+
+    @classmethod
+    def of(cls, paths):
+        stats = cls()
+        for path in paths:
+            metadata = pq.ParquetFile(path).metadata
+            stats.files += 1
+            stats.row_groups += metadata.num_row_groups
+            stats.rows += metadata.num_rows
+            stats.size += path.stat().st_size
+        return stats
+
+    def __iadd__(self, other):
+        self.files += other.files
+        self.row_groups += other.row_groups
+        self.rows += other.rows
+        self.size += other.size
+        return self
+
+    def __str__(self):
+        return (f"{self.files:>6} files {self.row_groups:>7} row groups "
+                f"{self.rows:>13,} rows {self.size / (1024 * 1024):>10,.1f} MB")
+
+
+def find_partitions(base_dir, symbols=None, since=None, until=None):
+    """Yield (symbol, day, directory) for every partition in [since, until)."""
+    for symbol_dir in sorted(Path(base_dir).glob("symbol=*")):
+        symbol = symbol_dir.name.split("=", 1)[1]
+        if symbols and symbol not in symbols:
+            continue
+        for date_dir in sorted(symbol_dir.glob("date=*")):
+            day = date.fromisoformat(date_dir.name.split("=", 1)[1])
+            if (since is None or day >= since) and (until is None or day < until):
+                yield symbol, day, date_dir
+
+
+def needs_compaction(paths, row_group_size=ROW_GROUP_SIZE, compression=COMPRESSION):
+    """A partition is compacted unless it already is one file of full row groups in the target codec."""
+    if len(paths) != 1:
+        return len(paths) > 1
+    metadata = pq.ParquetFile(paths[0]).metadata
+    full_groups = -(-metadata.num_rows // row_group_size)
+    codecs = {metadata.row_group(i).column(0).compression for i in range(metadata.num_row_groups)}
+    return metadata.num_row_groups > full_groups or codecs != {compression.upper()}
+
+
+def compact_partition(directory, row_group_size=ROW_GROUP_SIZE,
+                      target_file_bytes=TARGET_FILE_BYTES, compression=COMPRESSION):
+    """
+    Rewrite one partition; returns (before, after) PartitionStats.
+
+    Returns None if the partition has a file in progress.
+    """
+    directory = Path(directory)
+    if any(p.name.endswith(IN_PROGRESS_SUFFIX) for p in directory.iterdir()):
+        return None
+    sources = part_files(directory)
+    before = PartitionStats.of(sources)
+
+    tables = [to_file_table(pq.read_table(path, partitioning=None)) for path in sources]
+    table = sort_ticks(pa.concat_tables(tables))
+
+    # Size files from the bytes per row of the input; whole row groups per file
+    bytes_per_row = before.size / max(before.rows, 1)
+    groups_per_file = max(1, int(target_file_bytes / bytes_per_row) // row_group_size)
+    rows_per_file = groups_per_file * row_group_size
+
+    outputs = []
+    try:
+        for offset in range(0, max(table.num_rows, 1), rows_per_file):
+            path = in_progress_path(directory / f"compact-{len(outputs):03d}.parquet")
+            outputs.append(path)
+            with open_writer(path, compression=compression) as writer:
+                writer.write_table(table.slice(offset, rows_per_file), row_group_size=row_group_size)
+    except Exception:
+        for path in outputs:
+            path.unlink(missing_ok=True)
+        raise
+
+    after = PartitionStats.of(install_partition_files(outputs, directory))
+    return before, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", type=Path, default=DATASET_DIR, help="tick_dataset directory")
+    parser.add_argument("--symbols", nargs="*", help="only these symbols")
+    parser.add_argument("--since", type=date.fromisoformat, help="first day to compact (YYYY-MM-DD)")
+    parser.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE)
+    parser.add_argument("--target-mb", type=int, default=TARGET_FILE_BYTES // (1024 * 1024))
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be compacted")
+    args = parser.parse_args()
+
+    today = datetime.now().date()
+    total_before, total_after = PartitionStats(), PartitionStats()
+    compacted = skipped = failed = 0
+
+    for symbol, day, directory in find_partitions(args.dir, args.symbols, args.since, until=today):
+        sources = part_files(directory)
+        if not sources or not needs_compaction(sources, args.row_group_size):
+            continue
+        if args.dry_run:
+            print(f"{symbol} {day}: {PartitionStats.of(sources)}")
+            continue
+        try:
+            result = compact_partition(directory, args.row_group_size, args.target_mb * 1024 * 1024)
+        except Exception as e:
+            failed += 1
+            logging.error(f"Error compacting {symbol} {day}: {e}")
+            continue
+        if result is None:
+            skipped += 1
+            continue
+
+        before, after = result
+        total_before += before
+        total_after += after
+        compacted += 1
+        logging.info(f"Compacted {symbol} {day}: {before.files} -> {after.files} files, "
+                     f"{before.rows - after.rows} duplicate ticks dropped.")
+
+    print(f"Compacted {compacted} partitions ({skipped} in progress, {failed} failed)")
+    print(f"  before: {total_before}")
+    print(f"  after:  {total_after}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,7 +1,17 @@
+import os
+import sys
+import shutil
+import argparse
 import psycopg2
-import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import date, datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src" / "utils"))
+from tick_dataset import FILE_SCHEMA, in_progress_path, install_partition_file, open_writer, partition_dir
 
 # Database connection settings
 DB_CONFIG = {
@@ -12,109 +22,223 @@ DB_CONFIG = {
     "port": 15433,
 }
 
-# Parquet output directory
-OUTPUT_DIR = Path("C:/DevProjects/trading_system/data/ticks")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)  # Ensure directory exists
+# Parquet tick archive (tick_dataset layout)
+OUTPUT_DIR = Path("C:/DevProjects/trading_system/data/tick_dataset")
 
-# Function to fetch symbols
-def fetch_symbols(conn):
-    query = "SELECT DISTINCT symbol FROM tick_data;"
-    symbols = pd.read_sql_query(query, conn)["symbol"].tolist()
-    print(f"Symbols found: {symbols}")
-    return symbols
+# Shards are written here first; it must be on the same filesystem as OUTPUT_DIR
+# (hidden, so dataset readers skip it)
+STAGING_DIR = OUTPUT_DIR / ".staging"
+
+# Rows fetched from the server-side cursor at a time; each batch becomes one row group
+BATCH_SIZE = 50_000
 
-# Function to get the minimum available tick time for a symbol
-def get_min_tick_time(conn, symbol):
+# Function to fetch symbols (loose index scan instead of DISTINCT over every tick)
+def fetch_symbols(conn):
     query = """
-        SELECT MIN(tick_time) as min_time
-        FROM tick_data
-        WHERE symbol = %s;
+        WITH RECURSIVE symbols AS (
+            (SELECT symbol FROM market_data.tick_data ORDER BY symbol LIMIT 1)
+            UNION ALL
+            SELECT (SELECT t.symbol FROM market_data.tick_data t
+                    WHERE t.symbol > s.symbol ORDER BY t.symbol LIMIT 1)
+            FROM symbols s
+            WHERE s.symbol IS NOT NULL
+        )
+        SELECT symbol FROM symbols WHERE symbol IS NOT NULL;
     """
-    try:
-        result = pd.read_sql_query(query, conn, params=(symbol,))
-        return result["min_time"].iloc[0] if not result.empty else None
-    except Exception as e:
-        print(f"Error fetching minimum tick time for {symbol} from database: {e}")
-        return None
+    with conn.cursor() as cursor:
+        cursor.execute(query)
+        symbols = [row[0] for row in cursor.fetchall()]
+    conn.rollback()
+    print(f"Symbols found: {symbols}")
+    return symbols
 
-# Function to fetch tick data in chunks
-def fetch_tick_data_chunked(conn, symbol, start_time, chunk_days=30):
-    chunk_end_time = start_time + timedelta(days=chunk_days)
+# Convert fetched rows into an Arrow record batch
+def rows_to_batch(rows):
+    tick_time, bid, ask, last, volume, tick_size = zip(*rows)
+    bid = pa.array(bid, pa.float64())
+    ask = pa.array(ask, pa.float64())
+    return pa.record_batch([
+        pa.array(tick_time, pa.timestamp("ms")),
+        bid,
+        ask,
+        pa.array(last, pa.float64()),
+        pa.array(volume, pa.float64()),
+        pc.subtract(ask, bid),
+        pa.array(tick_size, pa.float64()),
+    ], schema=FILE_SCHEMA)
+
+# Get the time of a symbol's first tick (index lookup)
+def get_first_tick_time(conn, symbol):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT tick_time FROM market_data.tick_data
+            WHERE symbol = %s
+            ORDER BY tick_time
+            LIMIT 1;
+        """, (symbol,))
+        row = cursor.fetchone()
+    conn.rollback()
+    return row[0] if row else None
+
+# Stream a symbol's ticks in [start, end), in time order, as record batches
+def stream_tick_batches(conn, symbol, start, end, batch_size=BATCH_SIZE):
     query = """
-        SELECT tick_time, bid_price, ask_price, last_price, volume
-        FROM tick_data
+        SELECT tick_time, bid_price, ask_price, last_price, volume, tick_size
+        FROM market_data.tick_data
         WHERE symbol = %s AND tick_time >= %s AND tick_time < %s
         ORDER BY tick_time;
     """
+    # Named cursor: rows stay on the server until fetched, so memory is bounded by batch_size
+    with conn.cursor(name=f"export_{symbol.lower()}") as cursor:
+        cursor.itersize = batch_size
+        cursor.execute(query, (symbol, start, end))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows_to_batch(rows)
+    conn.rollback()
+
+
+class DailyParquetWriter:
+    """
+    Writes a time-ordered stream of tick batches into one Parquet file per
+    day, `{directory}/{YYYY-MM-DD}.parquet`.
+
+    Each batch is appended as a row group to the current day's file, which
+    stays under a hidden temporary name until the day is complete.
+    """
+
+    def __init__(self, directory, compression="snappy"):
+        self.directory = Path(directory)
+        self.compression = compression
+        self._day = None
+        self._writer = None
+        self._rows = 0
+
+    def write(self, batch):
+        days = batch.column("tick_time").to_numpy().astype("datetime64[D]")
+        # Batches are time ordered, so each day is one contiguous slice
+        starts = np.concatenate([[0], np.flatnonzero(days[1:] != days[:-1]) + 1])
+        ends = np.append(starts[1:], len(days))
+        for start, end in zip(starts, ends):
+            day = str(days[start])
+            if day != self._day:
+                self._finish_day()
+                self._open_day(day)
+            self._writer.write_batch(batch.slice(start, end - start))
+            self._rows += end - start
+
+    def _temporary_path(self):
+        return in_progress_path(self.directory / f"{self._day}.parquet")
+
+    def _open_day(self, day):
+        self._day = day
+        self._rows = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._writer = open_writer(self._temporary_path(), compression=self.compression)
+
+    def _finish_day(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(self._temporary_path(), self.directory / f"{self._day}.parquet")
+        self._writer = None
+
+    def close(self):
+        self._finish_day()
+
+    def abort(self):
+        """Discard the day in progress."""
+        if self._writer is not None:
+            self._writer.close()
+            self._temporary_path().unlink()
+            self._writer = None
+
+# Month shards [start, end) covering `first_tick` up to `until`
+def month_shards(first_tick, until):
+    shards = []
+    month = datetime(first_tick.year, first_tick.month, 1)
+    while month < until:
+        next_month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+        shards.append((month, min(next_month, until)))
+        month = next_month
+    return shards
+
+# Export one (symbol, month) shard: stage its day files, then swap them in
+def export_shard(db_config, symbol, start, end, output_dir=OUTPUT_DIR,
+                 staging_dir=STAGING_DIR, batch_size=BATCH_SIZE):
+    staged = staging_dir / symbol / start.strftime("%Y%m")
+    shutil.rmtree(staged, ignore_errors=True)  # leftovers of an interrupted run
+    writer = DailyParquetWriter(staged)
+    rows = 0
+
+    conn = psycopg2.connect(**db_config)
     try:
-        params = (symbol, start_time, chunk_end_time)
-        df = pd.read_sql_query(query, conn, params=params)
-        if not df.empty:
-            df['spread'] = df['ask_price'] - df['bid_price']
-            df['tick_size'] = None  # Placeholder
-        return df, chunk_end_time
-    except Exception as e:
-        print(f"Error fetching data for {symbol}: {e}")
-        return pd.DataFrame(), chunk_end_time
-
-# Function to save to Parquet
-def save_to_parquet(df, symbol):
-    if df.empty:
-        print(f"No data found for {symbol}. Skipping.")
-        return
-
-    df['date'] = pd.to_datetime(df['tick_time']).dt.strftime('%Y%m%d')
-    for date, group in df.groupby('date'):
-        output_path = OUTPUT_DIR / symbol / f"{date}.parquet"
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-
-        if output_path.exists():
-            try:
-                existing_data = pd.read_parquet(output_path)
-                group = pd.concat([existing_data, group]).drop_duplicates(
-                    subset=["tick_time", "bid_price", "ask_price"]
-                )
-            except Exception as e:
-                print(f"Error reading existing file {output_path}: {e}")
-
-        group.drop(columns='date', inplace=True)
-        group.to_parquet(output_path, index=False, engine="pyarrow", compression="snappy")
-        print(f"Saved {len(group)} rows to {output_path}")
+        for batch in stream_tick_batches(conn, symbol, start, end, batch_size):
+            writer.write(batch)
+            rows += batch.num_rows
+        writer.close()
+    except Exception:
+        writer.abort()
+        shutil.rmtree(staged, ignore_errors=True)
+        raise
+    finally:
+        conn.close()
+
+    # Every day of the month is staged, so each partition is swapped in exactly once;
+    # its old files (earlier exports, collector parts) are replaced
+    days = sorted(staged.glob("*.parquet")) if staged.exists() else []
+    for path in days:
+        install_partition_file(path, partition_dir(output_dir, symbol, date.fromisoformat(path.stem)))
+    shutil.rmtree(staged, ignore_errors=True)
+    return rows, len(days)
 
 # Main function
 def main():
+    parser = argparse.ArgumentParser(description="Regenerate the Parquet tick archive from tick_data.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="export processes; each works on one (symbol, month) shard at a time")
+    args = parser.parse_args()
+
     try:
         print("Connecting to the database...")
         conn = psycopg2.connect(**DB_CONFIG)
 
-        symbols = fetch_symbols(conn)
-        print(f"Fetched symbols: {symbols}")
+        # Only complete days are regenerated; today's files belong to the running collector
+        until = datetime.combine(datetime.now().date(), datetime.min.time())
 
-        for symbol in symbols:
-            print(f"Processing symbol: {symbol}")
-
-            min_time_db = get_min_tick_time(conn, symbol)
-
-            start_time = min_time_db
-            if not start_time:
+        shards = []
+        for symbol in fetch_symbols(conn):
+            first_tick = get_first_tick_time(conn, symbol)
+            if first_tick is None:
                 print(f"No data found for {symbol}. Skipping.")
                 continue
-
-            print(f"Starting from: {start_time} for {symbol}")
-
-            while start_time < datetime.now():
-                tick_data, next_start_time = fetch_tick_data_chunked(conn, symbol, start_time)
-                print(f"Fetched {len(tick_data)} rows for {symbol} from {start_time} to {next_start_time}")
-
-                save_to_parquet(tick_data, symbol)
-                start_time = next_start_time
-
-        print("Parquet export and regeneration complete.")
+            shards.extend((symbol, start, end) for start, end in month_shards(first_tick, until))
+        conn.close()
+        print(f"Exporting {len(shards)} (symbol, month) shards with {args.workers} workers up to {until}")
+
+        failed = 0
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(export_shard, DB_CONFIG, symbol, start, end): (symbol, start)
+                for symbol, start, end in shards
+            }
+            for future in as_completed(futures):
+                symbol, start = futures[future]
+                try:
+                    rows, days = future.result()
+                    print(f"Exported {rows} rows in {days} day files for {symbol} {start:%Y-%m}")
+                except Exception as e:
+                    failed += 1
+                    print(f"Error exporting {symbol} {start:%Y-%m}: {e}")
+
+        print(f"Parquet export and regeneration complete ({failed} shards failed).")
 
     except Exception as e:
         print(f"Error during export: {e}")
     finally:
-        if 'conn' in locals() and conn:
+        if 'conn' in locals() and not conn.closed:
             conn.close()
 
 if __name__ == "__main__":
@@ -1,8 +1,18 @@
+import sys
 import logging
-import MetaTrader5 as mt5
 import psycopg2
+import MetaTrader5 as mt5
+from psycopg2.pool import ThreadedConnectionPool
+from pathlib import Path
 from datetime import datetime, timedelta
 
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src" / "collectors"))
+from backfill_checkpoints import CheckpointStore
+from backfill_scheduler import BackfillScheduler, PooledTickStore
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src" / "utils"))
+from bar_queries import refresh_bars
+
 # Symbols to fetch
 SYMBOLS = [
     'AUDUSD', 'BTCJPY', 'CHFJPY', 'EURUSD',
@@ -18,53 +28,29 @@ DB_CONFIG = {
     'port': '15433'
 }
 
-# Fetch last tick times from the database
-def get_last_tick_times():
-    conn = psycopg2.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT symbol, MAX(tick_time) AS last_tick_time
-        FROM market_data.tick_data
-        GROUP BY symbol;
-    """)
-    result = {row[0]: row[1] for row in cursor.fetchall()}
-    conn.close()
-    return result
-
-# Fetch and store tick data
-def fetch_and_store_ticks(symbol, start_time, end_time):
-    logging.info(f"Fetching ticks for {symbol} from {start_time} to {end_time}...")
-    ticks = mt5.copy_ticks_range(symbol, start_time, end_time, mt5.COPY_TICKS_ALL)
-
-    if ticks is None or len(ticks) == 0:
-        logging.warning(f"No ticks retrieved for {symbol} from {start_time} to {end_time}.")
-        return
-
-    logging.info(f"Fetched {len(ticks)} ticks for {symbol}. Saving to database...")
-    conn = psycopg2.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
-    for tick in ticks:
-        try:
-            cursor.execute("""
-                INSERT INTO market_data.tick_data (symbol, tick_time, bid_price, ask_price, last_price, volume, spread, tick_size)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (symbol, tick_time, bid_price, ask_price) DO NOTHING;
-            """, (
-                symbol,
-                datetime.fromtimestamp(float(tick['time'])),  # Convert to timestamp
-                float(tick['bid']),  # Convert bid price to float
-                float(tick['ask']),  # Convert ask price to float
-                float(tick['last']) if 'last' in tick.dtype.names else None,  # Last price if available
-                int(tick['volume']) if 'volume' in tick.dtype.names else None,  # Volume if available
-                float(tick['ask'] - tick['bid']),  # Calculate spread
-                float(tick['volume_real']) if 'volume_real' in tick.dtype.names else None  # Real volume if available
-            ))
-        except Exception as e:
-            logging.error(f"Error inserting tick for {symbol}: {e}")
-
-    conn.commit()
-    conn.close()
+# Backfill concurrency
+MT5_FETCHERS = 2
+DB_WRITERS = 4
+
+# Fetch last tick times from the database for symbols without checkpoints
+def get_last_tick_times(pool, symbols):
+    if not symbols:
+        return {}
+
+    conn = pool.getconn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT symbol, MAX(tick_time) AS last_tick_time
+            FROM market_data.tick_data
+            WHERE symbol = ANY(%s)
+            GROUP BY symbol;
+        """, (list(symbols),))
+        result = {row[0]: row[1] for row in cursor.fetchall()}
+        conn.rollback()
+        return result
+    finally:
+        pool.putconn(conn)
 
 # Main function
 def main():
@@ -74,21 +60,42 @@ def main():
 
     logging.info(f"Connected to terminal at: {mt5.terminal_info().path}")
 
-    last_tick_times = get_last_tick_times()
-    now = datetime.now()
-    lookback_hours = 3  # Query 3 hours back if the last tick time is too old or missing
-
-    for symbol in SYMBOLS:
-        start_time = last_tick_times.get(symbol, now - timedelta(hours=lookback_hours))
-        end_time = now
-
-        while start_time < end_time:
-            chunk_end_time = start_time + timedelta(hours=1)
-            if chunk_end_time > end_time:
-                chunk_end_time = end_time
-
-            fetch_and_store_ticks(symbol, start_time, chunk_end_time)
-            start_time = chunk_end_time
+    pool = ThreadedConnectionPool(1, DB_WRITERS, **DB_CONFIG)
+    try:
+        checkpoints = CheckpointStore(pool)
+        checkpoints.ensure_schema()
+
+        # Resume from the checkpoint table; scan tick_data only for symbols never checkpointed
+        last_tick_times = checkpoints.resume_points(SYMBOLS)
+        last_tick_times.update(
+            get_last_tick_times(pool, [s for s in SYMBOLS if s not in last_tick_times])
+        )
+        now = datetime.now()
+        lookback_hours = 3  # Query 3 hours back if the last tick time is too old or missing
+
+        ranges = {
+            symbol: (last_tick_times.get(symbol, now - timedelta(hours=lookback_hours)), now)
+            for symbol in SYMBOLS
+        }
+
+        scheduler = BackfillScheduler(
+            mt5, PooledTickStore(pool), fetchers=MT5_FETCHERS, writers=DB_WRITERS,
+            checkpoints=checkpoints,
+        )
+        scheduler.run(ranges, retries=checkpoints.failed_chunks(SYMBOLS))
+    finally:
+        pool.closeall()
+
+    # Backfilled ticks can be older than the continuous aggregate refresh windows
+    conn = psycopg2.connect(**DB_CONFIG)
+    conn.autocommit = True
+    try:
+        refresh_bars(conn, min(start for start, _ in ranges.values()), now)
+        logging.info("Refreshed tick bars for the backfilled range.")
+    except Exception as e:
+        logging.error(f"Error refreshing tick bars: {e}")
+    finally:
+        conn.close()
 
     mt5.shutdown()
     logging.info("MetaTrader 5 connection closed.")
@@ -0,0 +1,154 @@
+"""
+scripts/migrate_schema.py
+
+Schema Migrations
+=================
+
+Applies the numbered SQL files in docker/migrations/ that have not been
+applied yet, in order, and records each one in market_data.schema_migrations.
+Run it after the init script on a new database and after every upgrade:
+
+    python scripts/migrate_schema.py            # apply pending migrations
+    python scripts/migrate_schema.py --list     # show applied/pending
+
+Files whose first line is `-- migrate:no-transaction` (e.g. continuous
+aggregates, which TimescaleDB refuses to create inside a transaction) are
+run statement by statement in autocommit mode instead; they must be written
+to be safe to re-run, since a failure leaves the earlier statements applied.
+"""
+
+import argparse
+import logging
+import psycopg2
+from pathlib import Path
+
+DB_CONFIG = {
+    "dbname": "market_data",
+    "user": "market_collector",
+    "password": "1331",
+    "host": "localhost",
+    "port": 15433,
+}
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "docker" / "migrations"
+NO_TRANSACTION = "-- migrate:no-transaction"
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """Return [(version, name, path), ...] sorted by version."""
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        version, _, name = path.stem.partition("_")
+        if version.isdigit():
+            migrations.append((int(version), name, path))
+    return migrations
+
+
+def ensure_migrations_table(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE SCHEMA IF NOT EXISTS market_data;
+            CREATE TABLE IF NOT EXISTS market_data.schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            );
+        """)
+    conn.commit()
+
+
+def applied_versions(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT version FROM market_data.schema_migrations;")
+        versions = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+    return versions
+
+
+def split_statements(sql):
+    """Split a script into statements at lines ending with ';' (no dollar-quoting)."""
+    statements, current = [], []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not current and (not stripped or stripped.startswith("--")):
+            continue
+        current.append(line)
+        if stripped.endswith(";") and not stripped.startswith("--"):
+            statements.append("\n".join(current))
+            current = []
+    if current:
+        statements.append("\n".join(current))
+    return statements
+
+
+def apply_migration(conn, version, name, path):
+    """Run one migration file and record it, all in a single transaction."""
+    sql = path.read_text(encoding="utf-8-sig")
+    if sql.startswith(NO_TRANSACTION):
+        return apply_autocommit_migration(conn, version, name, sql)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql)
+            cursor.execute(
+                "INSERT INTO market_data.schema_migrations (version, name) VALUES (%s, %s);",
+                (version, name),
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def apply_autocommit_migration(conn, version, name, sql):
+    """Run each statement in its own transaction, then record the migration."""
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            for statement in split_statements(sql):
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO market_data.schema_migrations (version, name) VALUES (%s, %s);",
+                (version, name),
+            )
+    finally:
+        conn.autocommit = False
+
+
+def migrate(conn, directory=MIGRATIONS_DIR):
+    """Apply all pending migrations; returns the versions applied."""
+    ensure_migrations_table(conn)
+    done = applied_versions(conn)
+
+    applied = []
+    for version, name, path in discover_migrations(directory):
+        if version in done:
+            continue
+        logging.info(f"Applying migration {path.name}...")
+        apply_migration(conn, version, name, path)
+        applied.append(version)
+    logging.info(f"Schema is up to date ({len(applied)} migrations applied).")
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--list", action="store_true", help="show migration status and exit")
+    parser.add_argument("--dsn", help="libpq connection string (defaults to DB_CONFIG)")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn) if args.dsn else psycopg2.connect(**DB_CONFIG)
+    try:
+        if args.list:
+            ensure_migrations_table(conn)
+            done = applied_versions(conn)
+            for version, name, path in discover_migrations():
+                print(f"{'applied' if version in done else 'pending':>8}  {path.name}")
+        else:
+            migrate(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,103 @@
+"""
+scripts/migrate_tick_archive.py
+
+Tick Archive Migration
+======================
+
+Rewrites the old per-symbol archive ({SYMBOL}/{YYYYMMDD}[_NNN].parquet, with
+the differing schemas of the collector and the export) into the hive
+partitioned tick_dataset layout (symbol=/date=/part-000.parquet). Every day
+becomes one file in the canonical schema, sorted by tick_time and without
+repeated ticks. Files already in the target partition are merged in, so the
+migration can be re-run safely. Today is left alone while the collector
+writes it.
+
+    python scripts/migrate_tick_archive.py --dry-run
+    python scripts/migrate_tick_archive.py --delete-source
+"""
+
+import re
+import sys
+import logging
+import argparse
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from datetime import datetime
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src" / "utils"))
+from tick_dataset import (
+    ROW_GROUP_SIZE, in_progress_path, install_partition_file, open_writer,
+    part_files, partition_dir, sort_ticks, to_file_table,
+)
+
+# Old and new archive locations
+LEGACY_DIR = Path("C:/DevProjects/trading_system/data/ticks")
+DATASET_DIR = Path("C:/DevProjects/trading_system/data/tick_dataset")
+
+LEGACY_FILE = re.compile(r"(\d{8})(?:_\d{3})?\.parquet")
+
+
+def discover_legacy_files(source):
+    """Return {(symbol, date): [paths]} for the old layout under `source`."""
+    days = {}
+    for directory in sorted(p for p in Path(source).iterdir() if p.is_dir()):
+        if directory.name.startswith(".") or "=" in directory.name:
+            continue
+        for path in sorted(directory.iterdir()):
+            match = LEGACY_FILE.fullmatch(path.name)
+            if match:
+                day = datetime.strptime(match.group(1), "%Y%m%d").date()
+                days.setdefault((directory.name, day), []).append(path)
+    return days
+
+
+def migrate_day(symbol, day, paths, target, row_group_size=ROW_GROUP_SIZE):
+    """Merge one day's legacy files (and any existing parts) into a single partition file."""
+    partition = partition_dir(target, symbol, day)
+    sources = list(paths) + part_files(partition)
+    tables = [to_file_table(pq.read_table(path, partitioning=None)) for path in sources]
+    table = sort_ticks(pa.concat_tables(tables))
+
+    partition.mkdir(parents=True, exist_ok=True)
+    temporary = in_progress_path(partition / "migrate.parquet")
+    with open_writer(temporary) as writer:
+        writer.write_table(table, row_group_size=row_group_size)
+    install_partition_file(temporary, partition)
+    return table.num_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", type=Path, default=LEGACY_DIR, help="old archive directory")
+    parser.add_argument("--target", type=Path, default=DATASET_DIR, help="tick_dataset directory")
+    parser.add_argument("--delete-source", action="store_true", help="remove old files once migrated")
+    parser.add_argument("--dry-run", action="store_true", help="only list what would be migrated")
+    args = parser.parse_args()
+
+    today = datetime.now().date()
+    days = {key: paths for key, paths in discover_legacy_files(args.source).items() if key[1] < today}
+    logging.info(f"Found {sum(map(len, days.values()))} legacy files for {len(days)} symbol days.")
+
+    failed = 0
+    for (symbol, day), paths in sorted(days.items()):
+        if args.dry_run:
+            print(f"{symbol} {day}: {', '.join(p.name for p in paths)}")
+            continue
+        try:
+            rows = migrate_day(symbol, day, paths, args.target)
+        except Exception as e:
+            failed += 1
+            logging.error(f"Error migrating {symbol} {day}: {e}")
+            continue
+        logging.info(f"Migrated {len(paths)} files ({rows} ticks) for {symbol} {day}.")
+        if args.delete_source:
+            for path in paths:
+                path.unlink()
+
+    logging.info(f"Migration complete ({failed} symbol days failed).")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
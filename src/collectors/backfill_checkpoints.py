@@ -0,0 +1,147 @@
+# backfill_checkpoints.py: Per-chunk watermark table for resumable backfills
+
+CHECKPOINT_TABLE = "market_data.backfill_chunks"
+RUN_TABLE = "market_data.backfill_runs"
+
+CREATE_CHECKPOINT_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+        symbol TEXT NOT NULL,
+        chunk_start TIMESTAMP NOT NULL,
+        chunk_end TIMESTAMP NOT NULL,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL CHECK (status IN ('done', 'failed')),
+        attempts INTEGER NOT NULL DEFAULT 1,
+        updated_at TIMESTAMP NOT NULL DEFAULT now(),
+        PRIMARY KEY (symbol, chunk_start)
+    );
+    CREATE INDEX IF NOT EXISTS backfill_chunks_failed_idx
+        ON {CHECKPOINT_TABLE} (symbol, chunk_start) WHERE status = 'failed';
+    DROP INDEX IF EXISTS market_data.backfill_chunks_symbol_end_idx;
+    CREATE TABLE IF NOT EXISTS {RUN_TABLE} (
+        symbol TEXT PRIMARY KEY,
+        range_start TIMESTAMP NOT NULL,
+        range_end TIMESTAMP NOT NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT now()
+    );
+"""
+
+
+def contiguous_end(range_start, chunks):
+    """
+    End of the recorded chunks that cover a run's range from its start without a gap.
+
+    Writers finish chunks out of order, so after a crash a later chunk can be
+    recorded while an earlier one, possibly the first, is not. Walking the
+    chunks in start order, the watermark only moves past a chunk once every
+    earlier part of the range is covered; the first chunk starting beyond it
+    marks a gap, and resuming there refetches the missing part instead of
+    skipping it. Chunks may overlap, as a resumed run picks its own chunk
+    bounds.
+
+    Args:
+        range_start: Start of the run's planned range
+        chunks: (chunk_start, chunk_end) pairs recorded within the range, in any order
+
+    Returns:
+        The resume point; range_start itself if the first chunk is missing
+    """
+    end = range_start
+    for chunk_start, chunk_end in sorted(chunks):
+        if chunk_start > end:
+            break
+        end = max(end, chunk_end)
+    return end
+
+
+class CheckpointStore:
+    """
+    Records the outcome of every backfill chunk in market_data.backfill_chunks.
+
+    Every run records its planned range per symbol in
+    market_data.backfill_runs. The resume point of a symbol is the end of
+    the recorded chunks covering that range from its start (see
+    contiguous_end), chunks that failed are kept with status 'failed' so
+    they can be retried one by one, and completed chunks are never fetched
+    again.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def _execute(self, query, params=None, fetch=False):
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall() if fetch else None
+            conn.commit()
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def ensure_schema(self):
+        self._execute(CREATE_CHECKPOINT_TABLE)
+
+    def record_ranges(self, ranges):
+        """Record the planned (start, end) range of every symbol of a run."""
+        for symbol, (start, end) in ranges.items():
+            self._execute(f"""
+                INSERT INTO {RUN_TABLE} (symbol, range_start, range_end)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (symbol) DO UPDATE SET
+                    range_start = EXCLUDED.range_start,
+                    range_end = EXCLUDED.range_end,
+                    updated_at = now();
+            """, (symbol, start, end))
+
+    def resume_points(self, symbols):
+        """Return symbol -> resume point within the last recorded range, for symbols that have one."""
+        # Only the chunks of the last range are scanned, through the primary key
+        rows = self._execute(f"""
+            SELECT r.symbol, r.range_start, c.chunk_start, c.chunk_end
+            FROM {RUN_TABLE} r
+            LEFT JOIN {CHECKPOINT_TABLE} c
+                ON c.symbol = r.symbol AND c.chunk_start >= r.range_start AND c.chunk_start < r.range_end
+            WHERE r.symbol = ANY(%s)
+            ORDER BY r.symbol, c.chunk_start;
+        """, (list(symbols),), fetch=True)
+        ranges = {}
+        for symbol, range_start, chunk_start, chunk_end in rows:
+            chunks = ranges.setdefault(symbol, (range_start, []))[1]
+            if chunk_start is not None:
+                chunks.append((chunk_start, chunk_end))
+        return {symbol: contiguous_end(start, chunks) for symbol, (start, chunks) in ranges.items()}
+
+    def failed_chunks(self, symbols):
+        """Return symbol -> [(chunk_start, chunk_end), ...] of chunks to retry."""
+        rows = self._execute(f"""
+            SELECT symbol, chunk_start, chunk_end
+            FROM {CHECKPOINT_TABLE}
+            WHERE status = 'failed' AND symbol = ANY(%s)
+            ORDER BY symbol, chunk_start;
+        """, (list(symbols),), fetch=True)
+        result = {}
+        for symbol, chunk_start, chunk_end in rows:
+            result.setdefault(symbol, []).append((chunk_start, chunk_end))
+        return result
+
+    def _mark(self, symbol, chunk_start, chunk_end, row_count, status):
+        self._execute(f"""
+            INSERT INTO {CHECKPOINT_TABLE} (symbol, chunk_start, chunk_end, row_count, status)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (symbol, chunk_start) DO UPDATE SET
+                chunk_end = EXCLUDED.chunk_end,
+                row_count = EXCLUDED.row_count,
+                status = EXCLUDED.status,
+                attempts = {CHECKPOINT_TABLE}.attempts + 1,
+                updated_at = now();
+        """, (symbol, chunk_start, chunk_end, row_count, status))
+
+    def mark_done(self, symbol, chunk_start, chunk_end, row_count):
+        self._mark(symbol, chunk_start, chunk_end, row_count, "done")
+
+    def mark_failed(self, symbol, chunk_start, chunk_end):
+        self._mark(symbol, chunk_start, chunk_end, 0, "failed")
@@ -0,0 +1,263 @@
+# backfill_scheduler.py: Concurrent multi-symbol historical tick backfill
+
+import sys
+import time
+import logging
+import threading
+from queue import Queue
+from pathlib import Path
+from datetime import timedelta
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from bulk_loader import copy_tick_table
+from tick_columns import ticks_to_table
+
+# Marker telling a worker thread to exit
+_STOP = object()
+
+
+class SymbolProgress:
+    """Running totals for one symbol."""
+
+    def __init__(self, symbol, start, end):
+        self.symbol = symbol
+        self.start = start
+        self.end = end
+        self.position = start
+        self.chunks = 0
+        self.failed_chunks = 0
+        self.ticks = 0
+        self.inserted = 0
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    @property
+    def ticks_per_second(self):
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return self.ticks / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def percent_done(self):
+        total = (self.end - self.start).total_seconds()
+        if total <= 0:
+            return 100.0
+        return 100.0 * (self.position - self.start).total_seconds() / total
+
+    def __str__(self):
+        return (f"{self.symbol}: {self.percent_done:5.1f}% ({self.position}), "
+                f"{self.chunks} chunks, {self.ticks} ticks fetched, {self.inserted} inserted, "
+                f"{self.failed_chunks} failed, {self.ticks_per_second:,.0f} ticks/s")
+
+
+class _SymbolCursor:
+    """Next chunk to fetch for a symbol and the adaptive chunk length."""
+
+    def __init__(self, symbol, start, end, chunk_length, adaptive=True):
+        self.symbol = symbol
+        self.start = start
+        self.end = end
+        self.chunk_length = chunk_length
+        # Retried chunks keep their recorded bounds
+        self.adaptive = adaptive
+
+
+class PooledTickStore:
+    """Writes tick tables to PostgreSQL using connections from a psycopg2 pool."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __call__(self, symbol, table, start, end):
+        conn = self.pool.getconn()
+        try:
+            inserted = copy_tick_table(conn, table)
+            conn.commit()
+            return inserted
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+
+class BackfillScheduler:
+    """
+    Fetches historical ticks for many symbols concurrently.
+
+    A bounded number of fetcher threads pull chunks from MT5 round-robin over
+    the symbols and hand them to writer threads through a bounded queue, so
+    neither side can run ahead of the other. After each chunk the chunk length
+    for that symbol is adapted so the next one holds roughly `target_ticks`.
+
+    Args:
+        mt5_api: The MetaTrader5 module (or a compatible fake)
+        store: Callable `store(symbol, table, start, end)` returning rows inserted
+        fetchers: Number of concurrent MT5 fetchers
+        writers: Number of concurrent database writers
+        target_ticks: Desired number of ticks per chunk
+        initial_chunk, min_chunk, max_chunk: Bounds for the chunk length
+        queue_size: Maximum number of fetched chunks waiting to be written
+        checkpoints: Optional CheckpointStore recording each run's ranges and the outcome of each chunk
+    """
+
+    def __init__(self, mt5_api, store, fetchers=2, writers=4, target_ticks=100_000,
+                 initial_chunk=timedelta(hours=1), min_chunk=timedelta(minutes=1),
+                 max_chunk=timedelta(days=7), queue_size=8, checkpoints=None):
+        self.mt5 = mt5_api
+        self.store = store
+        self.checkpoints = checkpoints
+        self.fetchers = fetchers
+        self.writers = writers
+        self.target_ticks = target_ticks
+        self.initial_chunk = initial_chunk
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.queue_size = queue_size
+        self.progress = {}
+        self._lock = threading.Lock()
+
+    def run(self, ranges, retries=None):
+        """
+        Backfill every symbol over its range.
+
+        Args:
+            ranges: Dict of symbol -> (start, end) datetimes
+            retries: Optional dict of symbol -> [(start, end), ...] chunks that
+                failed in an earlier run and are fetched again as they are
+
+        Returns:
+            Dict of symbol -> SymbolProgress
+        """
+        if self.checkpoints is not None:
+            self.checkpoints.record_ranges(ranges)
+        self.progress = {
+            symbol: SymbolProgress(symbol, start, end) for symbol, (start, end) in ranges.items()
+        }
+        symbol_queue = Queue()
+        write_queue = Queue(maxsize=self.queue_size)
+        self._remaining = 0
+
+        for symbol, chunks in (retries or {}).items():
+            if symbol not in self.progress:
+                continue
+            for start, end in chunks:
+                symbol_queue.put(_SymbolCursor(symbol, start, end, end - start, adaptive=False))
+                self._remaining += 1
+
+        for symbol, (start, end) in ranges.items():
+            if start < end:
+                symbol_queue.put(_SymbolCursor(symbol, start, end, self.initial_chunk))
+                self._remaining += 1
+            else:
+                self.progress[symbol].finished_at = time.monotonic()
+        if not self._remaining:
+            return self.progress
+
+        fetchers = [
+            threading.Thread(target=self._fetch_loop, args=(symbol_queue, write_queue), daemon=True)
+            for _ in range(self.fetchers)
+        ]
+        writers = [
+            threading.Thread(target=self._write_loop, args=(write_queue,), daemon=True)
+            for _ in range(self.writers)
+        ]
+        for t in fetchers + writers:
+            t.start()
+
+        for t in fetchers:
+            t.join()
+        for _ in writers:
+            write_queue.put(_STOP)
+        for t in writers:
+            t.join()
+
+        for progress in self.progress.values():
+            logging.info(f"Backfill finished - {progress}")
+        return self.progress
+
+    def _next_chunk_length(self, tick_count, fetched_length):
+        if tick_count == 0:
+            length = fetched_length * 2
+        else:
+            density = tick_count / fetched_length.total_seconds()
+            length = timedelta(seconds=self.target_ticks / density)
+        return max(self.min_chunk, min(self.max_chunk, length))
+
+    def _fetch_loop(self, symbol_queue, write_queue):
+        while True:
+            cursor = symbol_queue.get()
+            if cursor is _STOP:
+                return
+
+            chunk_start = cursor.start
+            chunk_end = min(cursor.start + cursor.chunk_length, cursor.end)
+            try:
+                ticks = self.mt5.copy_ticks_range(
+                    cursor.symbol, chunk_start, chunk_end, self.mt5.COPY_TICKS_ALL
+                )
+                tick_count = 0 if ticks is None else len(ticks)
+                if tick_count:
+                    write_queue.put((cursor.symbol, ticks_to_table(cursor.symbol, ticks),
+                                     chunk_start, chunk_end))
+                else:
+                    self._record(cursor.symbol, chunk_start, chunk_end, 0, 0)
+                if cursor.adaptive:
+                    cursor.chunk_length = self._next_chunk_length(tick_count, chunk_end - chunk_start)
+            except Exception as e:
+                logging.error(f"Error fetching ticks for {cursor.symbol} "
+                              f"from {chunk_start} to {chunk_end}: {e}")
+                self._record(cursor.symbol, chunk_start, chunk_end, 0, 0, failed=True)
+
+            cursor.start = chunk_end
+            if cursor.start < cursor.end:
+                symbol_queue.put(cursor)
+            else:
+                self._symbol_done(cursor.symbol, symbol_queue)
+
+    def _write_loop(self, write_queue):
+        while True:
+            item = write_queue.get()
+            if item is _STOP:
+                return
+
+            symbol, table, chunk_start, chunk_end = item
+            try:
+                inserted = self.store(symbol, table, chunk_start, chunk_end)
+                self._record(symbol, chunk_start, chunk_end, table.num_rows, inserted)
+            except Exception as e:
+                logging.error(f"Error storing ticks for {symbol} "
+                              f"from {chunk_start} to {chunk_end}: {e}")
+                self._record(symbol, chunk_start, chunk_end, table.num_rows, 0, failed=True)
+
+    def _checkpoint(self, symbol, chunk_start, chunk_end, ticks, failed):
+        try:
+            if failed:
+                self.checkpoints.mark_failed(symbol, chunk_start, chunk_end)
+            else:
+                self.checkpoints.mark_done(symbol, chunk_start, chunk_end, ticks)
+        except Exception as e:
+            logging.error(f"Error recording checkpoint for {symbol} "
+                          f"from {chunk_start} to {chunk_end}: {e}")
+
+    def _record(self, symbol, chunk_start, chunk_end, ticks, inserted, failed=False):
+        if self.checkpoints is not None:
+            self._checkpoint(symbol, chunk_start, chunk_end, ticks, failed)
+
+        with self._lock:
+            progress = self.progress[symbol]
+            progress.chunks += 1
+            progress.failed_chunks += failed
+            progress.ticks += ticks
+            progress.inserted += inserted
+            progress.position = max(progress.position, chunk_end)
+        if ticks:
+            logging.info(str(progress))
+
+    def _symbol_done(self, symbol, symbol_queue):
+        with self._lock:
+            self.progress[symbol].finished_at = time.monotonic()
+            self._remaining -= 1
+            if self._remaining:
+                return
+        for _ in range(self.fetchers):
+            symbol_queue.put(_STOP)
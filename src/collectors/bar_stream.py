@@ -0,0 +1,328 @@
+# bar_stream.py: Streaming OHLC bar aggregation on the live tick path
+
+import sys
+import time
+import queue
+import logging
+import collections
+import pandas as pd
+import pyarrow as pa
+from pathlib import Path
+from datetime import datetime, timedelta
+from psycopg2.extras import execute_values
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "processors"))
+from bar_builder import BAR_COLUMNS, TIMEFRAME_MINUTES, timeframe_names
+
+MINUTE_MS = 60_000
+DAY_MS = 24 * 60 * MINUTE_MS
+
+_EPOCH = datetime(1970, 1, 1)
+
+# A closed bar as handed to subscribers and sinks
+ClosedBar = collections.namedtuple("ClosedBar", ["symbol", "timeframe", "bar_time"] + BAR_COLUMNS)
+
+
+def bar_bounds(time_ms, timeframe):
+    """(start, end) in epoch ms of the `timeframe` bar containing `time_ms`; same buckets as bar_builder."""
+    minutes = TIMEFRAME_MINUTES[timeframe]
+    if minutes:
+        width = minutes * MINUTE_MS
+        start = time_ms // width * width
+        return start, start + width
+    if timeframe == "W1":
+        # 1970-01-01 was a Thursday, so Sunday-based weeks start 4 days before multiples of 7
+        start = ((time_ms // DAY_MS + 4) // 7 * 7 - 4) * DAY_MS
+        return start, start + 7 * DAY_MS
+    moment = _EPOCH + timedelta(milliseconds=time_ms)
+    first = datetime(moment.year, moment.month, 1)
+    following = datetime(moment.year + moment.month // 12, moment.month % 12 + 1, 1)
+    return (first - _EPOCH) // timedelta(milliseconds=1), (following - _EPOCH) // timedelta(milliseconds=1)
+
+
+class OpenBar:
+    """Running statistics of a bar that is still open; add() is O(1)."""
+
+    __slots__ = (
+        "start", "end", "bid_open", "bid_high", "bid_low", "bid_close",
+        "ask_open", "ask_high", "ask_low", "ask_close", "mid_high", "mid_low", "tick_count",
+        "spread_min", "spread_sum", "spread_max", "volume",
+    )
+
+    def __init__(self, start, end, bid, ask, volume):
+        self.start, self.end = start, end
+        self.bid_open = self.bid_high = self.bid_low = self.bid_close = bid
+        self.ask_open = self.ask_high = self.ask_low = self.ask_close = ask
+        self.mid_high = self.mid_low = (bid + ask) / 2
+        self.tick_count = 1
+        self.spread_min = self.spread_sum = self.spread_max = ask - bid
+        self.volume = volume
+
+    def add(self, bid, ask, volume):
+        if bid > self.bid_high:
+            self.bid_high = bid
+        elif bid < self.bid_low:
+            self.bid_low = bid
+        if ask > self.ask_high:
+            self.ask_high = ask
+        elif ask < self.ask_low:
+            self.ask_low = ask
+        self.bid_close, self.ask_close = bid, ask
+        mid = (bid + ask) / 2
+        if mid > self.mid_high:
+            self.mid_high = mid
+        elif mid < self.mid_low:
+            self.mid_low = mid
+        spread = ask - bid
+        if spread < self.spread_min:
+            self.spread_min = spread
+        if spread > self.spread_max:
+            self.spread_max = spread
+        self.spread_sum += spread
+        self.tick_count += 1
+        self.volume += volume
+
+    def close(self, symbol, timeframe):
+        return ClosedBar(
+            symbol, timeframe, _EPOCH + timedelta(milliseconds=self.start),
+            self.bid_open, self.bid_high, self.bid_low, self.bid_close,
+            self.ask_open, self.ask_high, self.ask_low, self.ask_close,
+            (self.bid_open + self.ask_open) / 2, self.mid_high,
+            self.mid_low, (self.bid_close + self.ask_close) / 2,
+            self.tick_count, self.spread_min, self.spread_sum / self.tick_count, self.spread_max,
+            self.volume,
+        )
+
+
+class StreamingBarAggregator:
+    """
+    Maintains open bars per symbol and timeframe from the live tick stream.
+
+    Every tick updates the open bar of each configured timeframe in constant
+    time. A bar closes when a tick of a later bar arrives, or when
+    close_until() moves the watermark (the latest tick time seen on any
+    symbol, minus `close_delay`) past its end, so quiet symbols still close
+    their bars. Closed bars are handed to subscribers right away on the
+    calling thread, and queued for the sinks, which flush() writes in
+    batches from another thread; bars a sink fails to take are kept for
+    that sink and retried on the next flush. Ticks older than a bar already closed are
+    counted in `late_ticks` and left out. Bars have the same buckets and
+    columns as bar_builder.
+
+    Args:
+        timeframes: Timeframe members or names to maintain (e.g. ['M1', 'M5'])
+        sinks: Callables `sink(bars)` taking a list of ClosedBar
+        close_delay: Seconds the watermark waits for late ticks of other symbols
+        max_pending: Closed bars kept for the sinks, and per sink while it
+            fails; the oldest go first beyond it
+    """
+
+    def __init__(self, timeframes, sinks=(), close_delay=1.0, max_pending=1_000_000):
+        self.timeframes = timeframe_names(timeframes)
+        self.sinks = list(sinks)
+        self.close_delay_ms = int(close_delay * 1000)
+        self.pending = collections.deque(maxlen=max_pending)
+        self._unsent = [collections.deque(maxlen=max_pending) for _ in self.sinks]
+        self.late_ticks = 0
+        self._open = {}
+        self._closed_until = {}
+        self._callbacks = []
+        self._queues = []
+        self._watermark = None
+
+    def subscribe(self, callback):
+        """Call `callback(bar)` with every closed bar, on the collecting thread."""
+        self._callbacks.append(callback)
+
+    def subscribe_queue(self, maxsize=100_000):
+        """Queue receiving every closed bar; bars are dropped while it is full."""
+        bars = queue.Queue(maxsize)
+        self._queues.append(bars)
+        return bars
+
+    def open_bar(self, symbol, timeframe):
+        return self._open.get((symbol, getattr(timeframe, "name", timeframe)))
+
+    def on_tick(self, symbol, time_ms, bid, ask, volume=0.0):
+        """Add one tick (time in epoch ms of the naive tick_time); returns the bars it closed."""
+        closed = []
+        for timeframe in self.timeframes:
+            key = (symbol, timeframe)
+            bar = self._open.get(key)
+            if bar is not None and bar.start <= time_ms < bar.end:
+                bar.add(bid, ask, volume)
+                continue
+            if (bar is not None and time_ms < bar.start) or time_ms < self._closed_until.get(key, time_ms):
+                self.late_ticks += 1
+                continue
+            if bar is not None:
+                closed.append(self._close(key, bar))
+            start, end = bar_bounds(time_ms, timeframe)
+            self._open[key] = OpenBar(start, end, bid, ask, volume)
+        return closed
+
+    def on_table(self, symbol, table):
+        """Add the ticks of an Arrow table (tick_columns.TICK_TABLE_SCHEMA); returns the bars closed."""
+        closed = []
+        volumes = [v or 0.0 for v in table["volume"].to_pylist()]
+        for time_ms, bid, ask, volume in zip(
+                table["tick_time"].cast(pa.int64()).to_pylist(), table["bid_price"].to_pylist(),
+                table["ask_price"].to_pylist(), volumes):
+            closed.extend(self.on_tick(symbol, time_ms, bid, ask, volume))
+        if table.num_rows:
+            latest = table["tick_time"].cast(pa.int64())[-1].as_py()
+            self._watermark = latest if self._watermark is None else max(self._watermark, latest)
+        return closed
+
+    def close_until(self, time_ms=None):
+        """Close every open bar ending at or before `time_ms` (default: the watermark)."""
+        if time_ms is None:
+            if self._watermark is None:
+                return []
+            time_ms = self._watermark - self.close_delay_ms
+        closed = []
+        for key, bar in list(self._open.items()):
+            if bar.end <= time_ms:
+                del self._open[key]
+                closed.append(self._close(key, bar))
+        return closed
+
+    def _close(self, key, bar):
+        self._closed_until[key] = bar.end
+        closed = bar.close(*key)
+        for callback in self._callbacks:
+            try:
+                callback(closed)
+            except Exception as e:
+                logging.error(f"Error in bar subscriber {callback}: {e}")
+        for bars in self._queues:
+            try:
+                bars.put_nowait(closed)
+            except queue.Full:
+                logging.warning(f"Bar queue full; dropped {key[0]} {key[1]} bar at {closed.bar_time}")
+        if self.sinks:
+            self.pending.append(closed)
+        return closed
+
+    def flush(self):
+        """Write queued closed bars to every sink; returns the number of bars taken from the queue."""
+        bars = []
+        while self.pending:
+            bars.append(self.pending.popleft())
+        for sink, unsent in zip(self.sinks, self._unsent):
+            overflow = len(unsent) + len(bars) - unsent.maxlen
+            if overflow > 0:
+                logging.warning(f"Dropped {overflow} unsent bars of {type(sink).__name__}")
+            unsent.extend(bars)
+            if not unsent:
+                continue
+            batch = list(unsent)
+            try:
+                sink(batch)
+            except Exception as e:
+                logging.error(f"Error writing {len(batch)} bars to {type(sink).__name__}, retrying on the next flush: {e}")
+                continue
+            unsent.clear()
+        return len(bars)
+
+
+def bars_to_frames(bars):
+    """{(symbol, timeframe): DataFrame indexed by bar_time with BAR_COLUMNS} of ClosedBar records."""
+    frame = pd.DataFrame(bars, columns=ClosedBar._fields)
+    return {
+        key: group.drop(columns=["symbol", "timeframe"]).set_index("bar_time")
+        for key, group in frame.groupby(["symbol", "timeframe"], sort=False)
+    }
+
+
+class ParquetBarSink:
+    """
+    Appends closed bars to a BarStore (see incremental_bars).
+
+    Bars are buffered and written every `write_interval` seconds, a file per
+    symbol and timeframe, rather than on every flush; the store compacts the
+    files once they pile up (BarStore.max_parts). A call that fails to
+    write keeps none of its bars, so they can be handed over again.
+    close() writes the bars still buffered.
+
+    Args:
+        store: BarStore to append to
+        write_interval: Seconds between writes
+        clock: Monotonic clock, replaceable in tests
+    """
+
+    def __init__(self, store, write_interval=300.0, clock=time.monotonic):
+        self.store = store
+        self.write_interval = write_interval
+        self.clock = clock
+        self._bars = []
+        self._written = clock()
+
+    def __call__(self, bars):
+        buffered = self._bars + list(bars)
+        if self.clock() - self._written >= self.write_interval:
+            self._write(buffered)
+            buffered = []
+        self._bars = buffered
+
+    def _write(self, bars):
+        # A retry rewrites the same files, as they are named after their first bar
+        if bars:
+            for (symbol, timeframe), frame in bars_to_frames(bars).items():
+                self.store.append(symbol, timeframe, frame)
+        self._written = self.clock()
+
+    def close(self):
+        self._write(self._bars)
+        self._bars = []
+
+
+class PostgresBarSink:
+    """
+    Upserts closed bars into market_data.historical_data over one connection.
+
+    Bid OHLC is stored, like MT5 rates, and volume is the tick count (MT5's
+    tick_volume). A bar already there for the same symbol, timeframe and
+    open time is replaced.
+    """
+
+    UPSERT = """
+        INSERT INTO market_data.historical_data
+            (symbol, timeframe, open_time, open_price, high_price, low_price, close_price, volume)
+        VALUES %s
+        ON CONFLICT (symbol, timeframe, open_time) DO UPDATE SET
+            open_price = EXCLUDED.open_price,
+            high_price = EXCLUDED.high_price,
+            low_price = EXCLUDED.low_price,
+            close_price = EXCLUDED.close_price,
+            volume = EXCLUDED.volume
+    """
+
+    def __init__(self, connect):
+        self.connect = connect
+        self._conn = None
+
+    def __call__(self, bars):
+        if self._conn is None or self._conn.closed:
+            self._conn = self.connect()
+            if self._conn is None:
+                raise ConnectionError("PostgreSQL is unavailable")
+        rows = [
+            (bar.symbol, bar.timeframe, bar.bar_time, bar.bid_open, bar.bid_high,
+             bar.bid_low, bar.bid_close, bar.tick_count)
+            for bar in bars
+        ]
+        try:
+            with self._conn.cursor() as cursor:
+                execute_values(cursor, self.UPSERT, rows)
+            self._conn.commit()
+        except Exception:
+            try:
+                self._conn.rollback()
+            except Exception:
+                self._conn.close()
+            raise
+
+    def close(self):
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
@@ -0,0 +1,218 @@
+# collector_loop.py: Single-loop multiplexed real-time tick collection
+
+import sys
+import time
+import logging
+import threading
+import pyarrow as pa
+from pathlib import Path
+from tick_buffer import BLOCK, DROP_OLDEST, TickRingBuffer
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from bulk_loader import copy_tick_table
+from tick_columns import ticks_to_table
+
+
+class MarketStateCache:
+    """
+    Caches the result of a market-open check per symbol for `ttl` seconds.
+
+    Args:
+        check: Callable `check(symbol) -> bool` doing the actual (slow) check
+        ttl: Seconds a cached answer stays valid
+        clock: Monotonic clock, replaceable in tests
+    """
+
+    def __init__(self, check, ttl=60.0, clock=time.monotonic):
+        self.check = check
+        self.ttl = ttl
+        self.clock = clock
+        self._states = {}
+
+    def is_open(self, symbol):
+        now = self.clock()
+        cached = self._states.get(symbol)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
+        state = bool(self.check(symbol))
+        self._states[symbol] = (state, now + self.ttl)
+        return state
+
+
+class PostgresSink:
+    """Writes tick tables to PostgreSQL over one connection, reconnecting on failure."""
+
+    def __init__(self, connect):
+        self.connect = connect
+        self._conn = None
+
+    def __call__(self, table):
+        if self._conn is None or self._conn.closed:
+            self._conn = self.connect()
+            if self._conn is None:
+                raise ConnectionError("PostgreSQL is unavailable")
+        try:
+            inserted = copy_tick_table(self._conn, table)
+            self._conn.commit()
+            return inserted
+        except Exception:
+            try:
+                self._conn.rollback()
+            except Exception:
+                self._conn.close()
+            raise
+
+    def close(self):
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+
+
+class TickCollector:
+    """
+    Services all symbols from one capture loop and one database flusher.
+
+    Each pass of the loop polls every symbol whose market is open once
+    (round-robin), appends new ticks to the Parquet archive and queues them
+    in the symbol's bounded ring buffer. A single flusher thread writes the
+    buffered ticks of all symbols in one transaction every `flush_interval`
+    seconds, so the number of threads and connections does not grow with the
+    number of symbols.
+
+    With a spill log, ticks the database cannot take (flush failures, and
+    buffer overflows under the SPILL policy) go to local disk instead, and
+    are replayed through the sink once a flush succeeds again. The capture
+    loop never touches the database either way.
+
+    With a bar aggregator, every captured tick also updates the live bars
+    (see bar_stream); closed bars reach its subscribers from the capture
+    loop and its sinks on the flusher thread.
+
+    Args:
+        symbols: Symbols to collect
+        stream: TickStream (or anything with `poll(symbol)`)
+        parquet_writer: RollingParquetWriter for the tick archive
+        sink: Callable `sink(table) -> rows inserted` for the database
+        market_state: MarketStateCache deciding which symbols to poll
+        interval: Seconds between passes over all symbols
+        flush_interval: Seconds between database flushes
+        buffer_capacity: Ticks buffered per symbol before the policy applies
+        buffer_policy: Backpressure policy of the buffers (see tick_buffer). BLOCK
+            is rejected: one full buffer would stall the capture of every symbol
+        spill_log: Optional SpillLog for ticks the database could not take
+        bar_aggregator: Optional StreamingBarAggregator fed with every tick
+    """
+
+    def __init__(self, symbols, stream, parquet_writer, sink, market_state,
+                 interval=0.5, flush_interval=15.0, buffer_capacity=100_000,
+                 buffer_policy=DROP_OLDEST, spill_log=None, bar_aggregator=None):
+        if buffer_policy == BLOCK:
+            raise ValueError("The block policy would stall the shared capture loop")
+        self.symbols = list(symbols)
+        self.stream = stream
+        self.parquet_writer = parquet_writer
+        self.sink = sink
+        self.market_state = market_state
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.spill_log = spill_log
+        self.bar_aggregator = bar_aggregator
+        spill = self._spill if spill_log is not None else None
+        self.buffers = {
+            symbol: TickRingBuffer(symbol, buffer_capacity, buffer_policy, spill)
+            for symbol in self.symbols
+        }
+        self._reported_losses = {}
+        self._stop = threading.Event()
+
+    def run_once(self):
+        """Poll every open symbol once and return the number of new ticks."""
+        captured = 0
+        for symbol in self.symbols:
+            if not self.market_state.is_open(symbol):
+                continue
+            try:
+                ticks = self.stream.poll(symbol)
+            except Exception as e:
+                logging.error(f"Error polling ticks for {symbol}: {e}")
+                continue
+            if ticks is None or not len(ticks):
+                continue
+
+            table = ticks_to_table(symbol, ticks)
+            if self.bar_aggregator is not None:
+                self.bar_aggregator.on_table(symbol, table)
+            self.parquet_writer.write_table(symbol, table)
+            self.buffers[symbol].put(ticks)
+            captured += len(ticks)
+
+        # Close the bars of symbols that stayed quiet past their end
+        if self.bar_aggregator is not None:
+            self.bar_aggregator.close_until()
+        return captured
+
+    def _spill(self, symbol, ticks):
+        self.spill_log.append(ticks_to_table(symbol, ticks))
+
+    def flush(self):
+        """Write the buffered ticks of all symbols in a single transaction."""
+        if self.bar_aggregator is not None:
+            self.bar_aggregator.flush()
+
+        drained = {symbol: buffer.drain() for symbol, buffer in self.buffers.items()}
+        drained = {symbol: ticks for symbol, ticks in drained.items() if len(ticks)}
+        if not drained:
+            self._replay_spilled()
+            return 0
+
+        table = pa.concat_tables([ticks_to_table(symbol, ticks) for symbol, ticks in drained.items()])
+        try:
+            inserted = self.sink(table)
+            logging.info(f"Saved {inserted} of {table.num_rows} ticks to PostgreSQL.")
+        except Exception as e:
+            logging.error(f"Error saving ticks to PostgreSQL: {e}")
+            if self.spill_log is not None:
+                self.spill_log.append(table)
+                logging.info(f"Spilled {table.num_rows} ticks to {self.spill_log.directory}.")
+            else:
+                # Keep the ticks for the next flush, ahead of those captured meanwhile
+                for symbol, ticks in drained.items():
+                    self.buffers[symbol].requeue(ticks)
+            return 0
+        finally:
+            self._log_losses()
+
+        self._replay_spilled()
+        return inserted
+
+    def _replay_spilled(self):
+        if self.spill_log is not None and self.spill_log.has_pending():
+            self.spill_log.replay(self.sink)
+
+    def _log_losses(self):
+        for buffer in self.buffers.values():
+            losses = buffer.dropped + buffer.spilled
+            if losses != self._reported_losses.get(buffer.symbol, 0):
+                self._reported_losses[buffer.symbol] = losses
+                logging.warning(f"Tick buffer overflow for {buffer.symbol}: {buffer.stats()}")
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def run(self):
+        """Run the capture loop until stop() is called."""
+        flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        flusher.start()
+        try:
+            while not self._stop.is_set():
+                started = time.monotonic()
+                self.run_once()
+                self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+        finally:
+            self._stop.set()
+            flusher.join()
+            self.flush()
+
+    def stop(self):
+        self._stop.set()
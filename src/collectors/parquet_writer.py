@@ -0,0 +1,184 @@
+# parquet_writer.py: Append-only, rolling Parquet writer for real-time ticks
+
+import os
+import sys
+import time
+import logging
+import threading
+import numpy as np
+import pyarrow as pa
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from tick_dataset import in_progress_path, next_part_path, open_writer, partition_dir, to_file_table
+
+
+class _OpenFile:
+    """State of the file currently being written for one symbol."""
+
+    def __init__(self, symbol, date, final_path):
+        self.symbol = symbol
+        self.date = date
+        self.final_path = final_path
+        # Hidden while in progress so readers never pick up a file without a footer
+        self.tmp_path = in_progress_path(final_path)
+        self.writer = None
+        self.opened_at = time.monotonic()
+        self.last_flush = time.monotonic()
+        # Buffered FILE_SCHEMA tables, written together as one row group
+        self.chunks = []
+        self.rows = 0
+        self.rows_written = 0
+
+    def __len__(self):
+        return self.rows
+
+
+class RollingParquetWriter:
+    """
+    Keeps one open ParquetWriter per symbol and day, in the tick_dataset layout.
+
+    Tables of ticks are buffered as they come (column chunks, no per-tick
+    work) and written as a row group once the buffer reaches
+    `row_group_size` rows or `flush_interval` seconds have passed, so the
+    cost of a single write does not depend on how much was written before.
+    Files are finalized (footer written, renamed into place) at the day
+    boundary, after `roll_interval` seconds and on close().
+
+    If a row group cannot be written, its ticks stay buffered for the next
+    flush, up to `max_buffered_rows` per symbol (the oldest go first beyond
+    it), and the file is finalized with the row groups written so far so
+    the retry starts a fresh part.
+    """
+
+    def __init__(self, base_dir, row_group_size=10_000, flush_interval=30.0,
+                 roll_interval=3600.0, compression="snappy", max_buffered_rows=1_000_000):
+        self.base_dir = Path(base_dir)
+        self.row_group_size = row_group_size
+        self.flush_interval = flush_interval
+        self.roll_interval = roll_interval
+        self.compression = compression
+        self.max_buffered_rows = max_buffered_rows
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def write(self, symbol, tick_time, bid, ask, last=None, volume=None, tick_size=None):
+        """Buffer a single tick; `tick_time` is a naive datetime. Prefer write_table for batches."""
+        self.write_table(symbol, pa.table({
+            "tick_time": pa.array([tick_time], pa.timestamp("ms")),
+            "bid_price": [bid],
+            "ask_price": [ask],
+            "last_price": pa.array([last], pa.float64()),
+            "volume": pa.array([volume], pa.float64()),
+            "tick_size": pa.array([tick_size], pa.float64()),
+        }))
+
+    def write_table(self, symbol, table):
+        """
+        Buffer a time-ordered table of one symbol's ticks (tick_columns.TICK_TABLE_SCHEMA).
+
+        Every tick is kept: consecutive ticks can share a millisecond and a quote.
+        """
+        if not table.num_rows:
+            return
+        table = to_file_table(table)
+        days = table["tick_time"].to_numpy().astype("datetime64[D]")
+        # Time ordered, so each day is one contiguous slice
+        starts = np.concatenate([[0], np.flatnonzero(days[1:] != days[:-1]) + 1])
+        ends = np.append(starts[1:], len(days))
+        with self._lock:
+            for start, end in zip(starts, ends):
+                self._buffer(symbol, days[start].item(), table.slice(start, end - start))
+
+    def _buffer(self, symbol, date, table):
+        current = self._files.get(symbol)
+        if current is not None and (
+            current.date != date
+            or time.monotonic() - current.opened_at >= self.roll_interval
+        ):
+            self._finalize(current)
+            current = None
+        if current is None:
+            current = self._open(symbol, date)
+            self._files[symbol] = current
+
+        current.chunks.append(table)
+        current.rows += table.num_rows
+        if (len(current) >= self.row_group_size
+                or time.monotonic() - current.last_flush >= self.flush_interval):
+            self._flush(current)
+
+    def flush(self):
+        """Write buffered ticks of every symbol as row groups."""
+        with self._lock:
+            for current in self._files.values():
+                self._flush(current)
+
+    def close(self):
+        """Flush and finalize every open file."""
+        with self._lock:
+            for current in self._files.values():
+                self._finalize(current)
+            self._files.clear()
+
+    def _open(self, symbol, date):
+        directory = partition_dir(self.base_dir, symbol, date)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        # Never touch a finalized file: later sessions of the same day get their own part
+        return _OpenFile(symbol, date, next_part_path(directory))
+
+    def _flush(self, current):
+        current.last_flush = time.monotonic()
+        if not len(current):
+            return
+
+        try:
+            table = pa.concat_tables(current.chunks)
+            if current.writer is None:
+                current.writer = open_writer(current.tmp_path, compression=self.compression)
+            current.writer.write_table(table)
+        except Exception as e:
+            logging.error(f"Error writing Parquet row group for {current.symbol}, "
+                          f"keeping {len(current)} ticks for the next flush: {e}")
+            self._rotate(current)
+            self._trim(current)
+            return
+        current.rows_written += table.num_rows
+        current.chunks, current.rows = [], 0
+
+    def _trim(self, current):
+        excess = len(current) - self.max_buffered_rows
+        if excess > 0:
+            logging.error(f"Dropped the {excess} oldest unwritten ticks of {current.symbol}")
+            current.chunks = [pa.concat_tables(current.chunks).slice(excess)]
+            current.rows -= excess
+
+    def _rotate(self, current):
+        # A writer that failed is not trusted with more row groups; later ones go to a new part
+        self._close_writer(current)
+        current.final_path = next_part_path(current.final_path.parent)
+        current.tmp_path = in_progress_path(current.final_path)
+        current.rows_written = 0
+
+    def _finalize(self, current):
+        self._flush(current)
+        self._close_writer(current)
+
+    def _close_writer(self, current):
+        if current.writer is None:
+            return
+
+        try:
+            current.writer.close()
+            if not current.rows_written:
+                current.tmp_path.unlink(missing_ok=True)
+                return
+            os.replace(current.tmp_path, current.final_path)
+            logging.info(
+                f"Finalized {current.rows_written} ticks for {current.symbol} in {current.final_path}."
+            )
+        except Exception as e:
+            logging.error(f"Error finalizing Parquet file {current.final_path}: {e}")
+        finally:
+            current.writer = None
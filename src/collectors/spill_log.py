@@ -0,0 +1,137 @@
+# spill_log.py: Local write-ahead spill log for ticks the database could not take
+
+import os
+import sys
+import time
+import logging
+import threading
+import pyarrow as pa
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from tick_columns import TICK_TABLE_SCHEMA
+
+SEGMENT_SUFFIX = ".arrows"
+OPEN_SUFFIX = ".arrows.open"
+
+
+def read_segment(path):
+    """Read a spill segment, keeping every complete batch of a truncated file."""
+    batches = []
+    try:
+        with pa.OSFile(str(path), "rb") as source:
+            reader = pa.ipc.open_stream(source)
+            for batch in reader:
+                batches.append(batch)
+    except (pa.ArrowInvalid, OSError) as e:
+        logging.warning(f"Spill segment {path} is truncated after {len(batches)} batches: {e}")
+    return pa.Table.from_batches(batches, schema=TICK_TABLE_SCHEMA)
+
+
+class SpillLog:
+    """
+    Append-only log of tick tables stored as Arrow IPC stream segments.
+
+    The collector appends here whenever ticks cannot go to PostgreSQL, so
+    capturing never waits for the database. Writes go to an open segment
+    that is fsynced at most every `fsync_interval` seconds and sealed once it
+    reaches `segment_bytes`; replay() loads sealed segments with the bulk
+    loader and deletes them once they are committed.
+
+    Args:
+        directory: Where segments are kept
+        segment_bytes: Size at which the open segment is sealed
+        fsync_interval: Maximum seconds between fsyncs of the open segment
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, fsync_interval=1.0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer = None
+        self._path = None
+        self._last_fsync = 0.0
+
+        # Segments left open by a crashed process are sealed as they are
+        for path in sorted(self.directory.glob(f"*{OPEN_SUFFIX}")):
+            path.rename(path.with_name(path.name[:-len(".open")]))
+        self._sequence = max(
+            (int(p.name.split(".")[0].split("-")[1]) for p in self.directory.glob(f"spill-*{SEGMENT_SUFFIX}")),
+            default=0,
+        )
+
+    def _open_segment(self):
+        self._sequence += 1
+        self._path = self.directory / f"spill-{self._sequence:012d}{OPEN_SUFFIX}"
+        self._file = open(self._path, "wb")
+        self._writer = pa.ipc.new_stream(self._file, TICK_TABLE_SCHEMA)
+        self._last_fsync = time.monotonic()
+
+    def _seal(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._path.rename(self._path.with_name(self._path.name[:-len(".open")]))
+        self._file = self._writer = self._path = None
+
+    def append(self, table):
+        """Append a tick table (TICK_TABLE_SCHEMA)."""
+        if not table.num_rows:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._open_segment()
+            self._writer.write_table(table.cast(TICK_TABLE_SCHEMA))
+            self._file.flush()
+
+            if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_fsync = time.monotonic()
+            if self._file.tell() >= self.segment_bytes:
+                self._seal()
+
+    def sealed_segments(self):
+        return sorted(self.directory.glob(f"spill-*{SEGMENT_SUFFIX}"))
+
+    def has_pending(self):
+        with self._lock:
+            return self._writer is not None or bool(self.sealed_segments())
+
+    def replay(self, sink):
+        """
+        Load spilled ticks through `sink(table)`, oldest segment first.
+
+        The open segment is sealed first. A segment is deleted only after the
+        sink accepted it; on the first failure replay stops and the remaining
+        segments stay for the next attempt.
+
+        Returns:
+            Number of rows replayed
+        """
+        with self._lock:
+            self._seal()
+            segments = self.sealed_segments()
+
+        replayed = 0
+        for path in segments:
+            table = read_segment(path)
+            if table.num_rows:
+                try:
+                    sink(table)
+                except Exception as e:
+                    logging.error(f"Error replaying spill segment {path}: {e}")
+                    break
+            path.unlink()
+            replayed += table.num_rows
+            logging.info(f"Replayed {table.num_rows} spilled ticks from {path.name}.")
+        return replayed
+
+    def close(self):
+        with self._lock:
+            self._seal()
@@ -0,0 +1,161 @@
+# tick_buffer.py: Bounded, preallocated per-symbol tick ring buffer
+
+import threading
+import numpy as np
+
+# 48 bytes per tick; field names follow the MT5 tick layout so drained
+# arrays can be passed to tick_columns.ticks_to_table unchanged
+BUFFER_DTYPE = np.dtype([
+    ("time_msc", np.int64),
+    ("bid", np.float64),
+    ("ask", np.float64),
+    ("last", np.float64),
+    ("volume", np.float64),
+    ("volume_real", np.float64),
+])
+
+# What put() does when the buffer is full
+BLOCK = "block"              # wait until the consumer drains
+DROP_OLDEST = "drop_oldest"  # overwrite the oldest buffered ticks
+SPILL = "spill"              # hand the oldest buffered ticks to a spill callback
+
+POLICIES = (BLOCK, DROP_OLDEST, SPILL)
+
+
+class TickRingBuffer:
+    """
+    Fixed-capacity ring buffer of ticks for one symbol.
+
+    Storage is a single preallocated structured array, so buffering a tick
+    costs no Python objects. put() and drain() work on whole batches.
+
+    Args:
+        symbol: Symbol the buffer belongs to
+        capacity: Maximum number of buffered ticks
+        policy: One of BLOCK, DROP_OLDEST or SPILL
+        spill: Callable `spill(symbol, ticks)` used by the SPILL policy
+        block_timeout: Seconds BLOCK waits for space before dropping the oldest ticks
+    """
+
+    def __init__(self, symbol, capacity=100_000, policy=DROP_OLDEST, spill=None, block_timeout=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        if policy == SPILL and spill is None:
+            raise ValueError("The spill policy needs a spill callback")
+
+        self.symbol = symbol
+        self.capacity = capacity
+        self.policy = policy
+        self.spill = spill
+        self.block_timeout = block_timeout
+        self._data = np.zeros(capacity, dtype=BUFFER_DTYPE)
+        self._head = 0
+        self._size = 0
+        self._cond = threading.Condition()
+
+        # Counters
+        self.accepted = 0
+        self.dropped = 0
+        self.spilled = 0
+
+    def __len__(self):
+        return self._size
+
+    def stats(self):
+        return {
+            "symbol": self.symbol,
+            "buffered": self._size,
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+        }
+
+    def put(self, ticks, block=True):
+        """
+        Append a batch of ticks (any structured array with BUFFER_DTYPE field names).
+
+        With `block=False` the BLOCK policy falls back to dropping the oldest
+        ticks instead of waiting.
+        """
+        if not len(ticks):
+            return
+        with self._cond:
+            position = 0
+            while position < len(ticks):
+                free = self.capacity - self._size
+                if not free:
+                    self._make_room(min(len(ticks) - position, self.capacity), block)
+                    free = self.capacity - self._size
+                count = min(free, len(ticks) - position)
+                self._append(ticks[position:position + count])
+                position += count
+            self.accepted += len(ticks)
+
+    def requeue(self, ticks):
+        """
+        Put drained ticks back in front of the buffered ones, for a consumer that failed to write them.
+
+        They are older than anything still buffered, so ticks that do not
+        fit are taken from the start of the batch: dropped, or spilled under
+        the SPILL policy. Never blocks, and does not count them as accepted
+        again.
+        """
+        if not len(ticks):
+            return
+        with self._cond:
+            overflow = len(ticks) - (self.capacity - self._size)
+            if overflow > 0:
+                oldest, ticks = ticks[:overflow], ticks[overflow:]
+                if self.policy == SPILL:
+                    self.spill(self.symbol, oldest)
+                    self.spilled += len(oldest)
+                else:
+                    self.dropped += len(oldest)
+            if len(ticks):
+                self._head = (self._head - len(ticks)) % self.capacity
+                self._write(self._head, ticks)
+                self._size += len(ticks)
+
+    def _make_room(self, needed, block):
+        if self.policy == BLOCK and block:
+            self._cond.wait_for(lambda: self._size < self.capacity, timeout=self.block_timeout)
+            if self._size < self.capacity:
+                return
+
+        oldest = self._take(needed)
+        if self.policy == SPILL:
+            # Spill happens under the lock so ordering on disk is preserved
+            self.spill(self.symbol, oldest)
+            self.spilled += len(oldest)
+        else:
+            self.dropped += len(oldest)
+
+    def _append(self, ticks):
+        self._write((self._head + self._size) % self.capacity, ticks)
+        self._size += len(ticks)
+
+    def _write(self, start, ticks):
+        # Copy ticks into the ring from slot `start`, wrapping around the end
+        first = min(len(ticks), self.capacity - start)
+        for name in BUFFER_DTYPE.names:
+            column = ticks[name]
+            self._data[name][start:start + first] = column[:first]
+            self._data[name][:len(ticks) - first] = column[first:]
+
+    def _take(self, count):
+        count = min(count, self._size)
+        end = self._head + count
+        if end <= self.capacity:
+            taken = self._data[self._head:end].copy()
+        else:
+            taken = np.concatenate([self._data[self._head:], self._data[:end - self.capacity]])
+        self._head = end % self.capacity
+        self._size -= count
+        return taken
+
+    def drain(self, max_rows=None):
+        """Remove and return up to `max_rows` of the oldest ticks (all by default)."""
+        with self._cond:
+            taken = self._take(self._size if max_rows is None else max_rows)
+            self._cond.notify_all()
+            return taken
@@ -0,0 +1,86 @@
+# tick_stream.py: Gap-free incremental tick capture with mt5.copy_ticks_from
+
+import logging
+import numpy as np
+
+
+class TickStream:
+    """
+    Pulls every new tick per symbol in batches instead of sampling the last one.
+
+    The stream remembers the `time_msc` of the newest tick it returned for each
+    symbol, and how many ticks shared that millisecond, then asks MT5 for all
+    ticks from that second onwards. Ticks already returned are cut off, so
+    consecutive polls are complete and never overlap.
+
+    Args:
+        mt5_api: The MetaTrader5 module (or a compatible fake)
+        batch_size: Number of ticks requested per copy_ticks_from call
+        start_times: Optional dict of symbol -> epoch milliseconds to start from;
+            other symbols start at their current tick
+    """
+
+    def __init__(self, mt5_api, batch_size=10_000, start_times=None):
+        self.mt5 = mt5_api
+        self.batch_size = batch_size
+        self._last_msc = dict(start_times or {})
+        self._seen_at_last = {symbol: 0 for symbol in self._last_msc}
+
+    def last_time_msc(self, symbol):
+        return self._last_msc.get(symbol)
+
+    def _start(self, symbol):
+        tick = self.mt5.symbol_info_tick(symbol)
+        if tick is None:
+            return False
+        self._last_msc[symbol] = int(tick.time_msc)
+        self._seen_at_last[symbol] = 0
+        return True
+
+    def poll(self, symbol):
+        """
+        Return all ticks for `symbol` that arrived since the previous poll.
+
+        Returns:
+            Structured NumPy array in MT5 tick layout (possibly empty), or None
+            if MT5 returned no data for the symbol
+        """
+        if symbol not in self._last_msc and not self._start(symbol):
+            return None
+
+        batches = []
+        count = self.batch_size
+        while True:
+            last_msc = self._last_msc[symbol]
+            ticks = self.mt5.copy_ticks_from(symbol, last_msc // 1000, count, self.mt5.COPY_TICKS_ALL)
+            if ticks is None or not len(ticks):
+                break
+
+            # Drop what was already returned: everything before the last
+            # millisecond and the ticks of that millisecond we have seen
+            time_msc = ticks["time_msc"]
+            first_at_last = np.searchsorted(time_msc, last_msc, side="left")
+            after_last = np.searchsorted(time_msc, last_msc, side="right")
+            skip = first_at_last + min(self._seen_at_last[symbol], after_last - first_at_last)
+            new_ticks = ticks[skip:]
+
+            if len(new_ticks):
+                newest = int(time_msc[-1])
+                at_newest = len(time_msc) - np.searchsorted(time_msc, newest, side="left")
+                self._seen_at_last[symbol] = at_newest if newest != last_msc else int(after_last - first_at_last)
+                self._last_msc[symbol] = newest
+                batches.append(new_ticks)
+
+            if len(ticks) < count:
+                break
+            if not len(new_ticks):
+                # A full batch of already seen ticks: more ticks share this
+                # second than fit in one request, so ask for a bigger batch
+                count *= 2
+                logging.debug(f"Growing tick batch for {symbol} to {count}.")
+            else:
+                count = self.batch_size
+
+        if not batches:
+            return ticks[:0] if ticks is not None else None
+        return batches[0] if len(batches) == 1 else np.concatenate(batches)
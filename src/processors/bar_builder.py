@@ -0,0 +1,206 @@
+# bar_builder.py: Vectorized OHLC bar building from ticks
+
+import numpy as np
+import pandas as pd
+
+PRICE_SIDES = ("bid", "ask", "mid")
+
+MINUTE_NS = 60_000_000_000
+DAY_NS = 24 * 60 * MINUTE_NS
+
+# Timeframe names of config.Timeframe with their bar width in minutes.
+# W1 (weeks starting on Sunday, like MT5) and MN1 (calendar months) have no
+# fixed width; every other bar is aligned to the epoch.
+TIMEFRAME_MINUTES = {
+    "M1": 1, "M2": 2, "M3": 3, "M4": 4, "M5": 5, "M6": 6, "M10": 10, "M12": 12,
+    "M15": 15, "M20": 20, "M30": 30, "H1": 60, "H2": 120, "H3": 180, "H4": 240,
+    "H6": 360, "H8": 480, "H12": 720, "D1": 1440, "W1": None, "MN1": None,
+}
+
+# pandas frequency of each timeframe, for putting bars on a regular grid
+TIMEFRAME_FREQ = {
+    name: f"{minutes}min" for name, minutes in TIMEFRAME_MINUTES.items() if minutes
+}
+TIMEFRAME_FREQ.update({"W1": "W-SUN", "MN1": "MS"})
+
+
+def _derive_parents():
+    # Each fixed timeframe rolls up from the coarsest finer one whose bars nest exactly in it
+    parents = {"W1": "D1", "MN1": "D1"}
+    fixed = [name for name, minutes in TIMEFRAME_MINUTES.items() if minutes]
+    for position, name in enumerate(fixed[1:], start=1):
+        parents[name] = [
+            finer for finer in fixed[:position]
+            if TIMEFRAME_MINUTES[name] % TIMEFRAME_MINUTES[finer] == 0
+        ][-1]
+    return parents
+
+
+# M1 is built from ticks; e.g. M5 <- M1, M15 <- M5, H1 <- M30, H4 <- H2, D1 <- H12, W1/MN1 <- D1
+TIMEFRAME_PARENTS = _derive_parents()
+
+BAR_COLUMNS = (
+    [f"{side}_{field}" for side in PRICE_SIDES for field in ("open", "high", "low", "close")]
+    + ["tick_count", "spread_min", "spread_mean", "spread_max", "volume"]
+)
+
+
+def _ohlc(values, starts, ends):
+    return (
+        values[starts],
+        np.maximum.reduceat(values, starts),
+        np.minimum.reduceat(values, starts),
+        values[ends - 1],
+    )
+
+
+def _runs(buckets):
+    # Start and end positions of the runs of equal bucket ids
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    return starts, np.append(starts[1:], len(buckets))
+
+
+def _empty_bars():
+    return pd.DataFrame(columns=list(BAR_COLUMNS), index=pd.DatetimeIndex([], name="bar_time"))
+
+
+def bucket_starts(times_ns, timeframe):
+    """Start (int64 ns) of the `timeframe` bar each of `times_ns` falls in."""
+    minutes = TIMEFRAME_MINUTES[timeframe]
+    if minutes:
+        width = minutes * MINUTE_NS
+        return times_ns // width * width
+    if timeframe == "W1":
+        # 1970-01-01 was a Thursday, so Sunday-based weeks start 4 days before multiples of 7
+        days = times_ns // DAY_NS
+        return ((days + 4) // 7 * 7 - 4) * DAY_NS
+    return times_ns.view("datetime64[ns]").astype("datetime64[M]").astype("datetime64[ns]").view(np.int64)
+
+
+def build_bars(tick_time, bid, ask, width, volume=None):
+    """
+    Build fixed-width bars from ticks in one pass.
+
+    Every tick gets an integer bucket id (its time floored to `width`); on
+    time-ordered ticks each bucket is a contiguous run, so all statistics are
+    computed with `ufunc.reduceat` over the run starts, without a groupby or
+    any Python-level loop. Only buckets containing ticks produce a bar.
+
+    Args:
+        tick_time: datetime64 array or DatetimeIndex of the ticks
+        bid: Bid prices
+        ask: Ask prices
+        width: Bar width (Timedelta or anything it accepts, e.g. '5min', '1h')
+        volume: Optional tick volumes; missing values count as 0
+
+    Returns:
+        DataFrame indexed by bar start with BAR_COLUMNS
+    """
+    times = np.asarray(tick_time, dtype="datetime64[ns]").view(np.int64)
+    bid = np.asarray(bid, dtype=np.float64)
+    ask = np.asarray(ask, dtype=np.float64)
+    volume = np.zeros(len(times)) if volume is None else np.nan_to_num(np.asarray(volume, dtype=np.float64))
+
+    width_ns = pd.Timedelta(width).value
+    if not len(times):
+        return _empty_bars()
+
+    # The reader guarantees time order; sort only if that was not the case
+    if (times[1:] < times[:-1]).any():
+        order = np.argsort(times, kind="stable")
+        times, bid, ask, volume = times[order], bid[order], ask[order], volume[order]
+
+    buckets = times // width_ns * width_ns
+    starts, ends = _runs(buckets)
+
+    spread = ask - bid
+    columns = {}
+    for side, values in (("bid", bid), ("ask", ask), ("mid", (bid + ask) / 2)):
+        for field, column in zip(("open", "high", "low", "close"), _ohlc(values, starts, ends)):
+            columns[f"{side}_{field}"] = column
+    columns["tick_count"] = ends - starts
+    columns["spread_min"] = np.minimum.reduceat(spread, starts)
+    columns["spread_mean"] = np.add.reduceat(spread, starts) / columns["tick_count"]
+    columns["spread_max"] = np.maximum.reduceat(spread, starts)
+    columns["volume"] = np.add.reduceat(volume, starts)
+
+    index = pd.DatetimeIndex(buckets[starts].view("datetime64[ns]"), name="bar_time")
+    return pd.DataFrame(columns, index=index)
+
+
+def roll_up(bars, timeframe):
+    """
+    Aggregate time-ordered bars (BAR_COLUMNS, only bars with ticks) into `timeframe` bars.
+
+    Same run-based reduction as build_bars, over bars instead of ticks: opens
+    and closes come from the first and last bar of each run, highs and lows
+    from max/min, counts and volume add up, and the spread mean is weighted
+    by tick count.
+    """
+    if bars.empty:
+        return _empty_bars()
+    buckets = bucket_starts(bars.index.asi8, timeframe)
+    starts, ends = _runs(buckets)
+
+    columns = {}
+    for side in PRICE_SIDES:
+        columns[f"{side}_open"] = bars[f"{side}_open"].to_numpy()[starts]
+        columns[f"{side}_high"] = np.maximum.reduceat(bars[f"{side}_high"].to_numpy(), starts)
+        columns[f"{side}_low"] = np.minimum.reduceat(bars[f"{side}_low"].to_numpy(), starts)
+        columns[f"{side}_close"] = bars[f"{side}_close"].to_numpy()[ends - 1]
+    counts = bars["tick_count"].to_numpy()
+    columns["tick_count"] = np.add.reduceat(counts, starts)
+    columns["spread_min"] = np.minimum.reduceat(bars["spread_min"].to_numpy(), starts)
+    columns["spread_mean"] = np.add.reduceat(bars["spread_mean"].to_numpy() * counts, starts) / columns["tick_count"]
+    columns["spread_max"] = np.maximum.reduceat(bars["spread_max"].to_numpy(), starts)
+    columns["volume"] = np.add.reduceat(bars["volume"].to_numpy(), starts)
+
+    index = pd.DatetimeIndex(buckets[starts].view("datetime64[ns]"), name="bar_time")
+    return pd.DataFrame(columns, index=index)
+
+
+def timeframe_names(timeframes=None):
+    """Names of `timeframes` (config.Timeframe members or names), all by default."""
+    names = [getattr(tf, "name", tf) for tf in (timeframes or TIMEFRAME_MINUTES)]
+    unknown = [name for name in names if name not in TIMEFRAME_MINUTES]
+    if unknown:
+        raise ValueError(f"Unknown timeframes: {unknown}")
+    return names
+
+
+def build_ladder(tick_time, bid, ask, timeframes=None, volume=None):
+    """
+    Build bars for several timeframes from one pass over the ticks.
+
+    M1 bars are built from the ticks; every other timeframe is rolled up from
+    its parent in TIMEFRAME_PARENTS, so each level only reads the (much
+    smaller) level below it and the whole ladder costs about as much as M1.
+
+    Returns:
+        {timeframe name: bars} for the requested timeframes (all 21 by default)
+    """
+    names = timeframe_names(timeframes)
+    needed = {"M1"}
+    for name in names:
+        while name != "M1" and name not in needed:
+            needed.add(name)
+            name = TIMEFRAME_PARENTS[name]
+
+    built = {"M1": build_bars(tick_time, bid, ask, "1min", volume)}
+    # TIMEFRAME_MINUTES lists every parent before its children
+    for name in TIMEFRAME_MINUTES:
+        if name in needed and name not in built:
+            built[name] = roll_up(built[TIMEFRAME_PARENTS[name]], name)
+    return {name: built[name] for name in names}
+
+
+def bars_from_frame(data, width):
+    """build_bars() for a tick DataFrame indexed by time with bid/ask(/volume) columns."""
+    volume = data["volume"].to_numpy() if "volume" in data.columns else None
+    return build_bars(data.index, data["bid"].to_numpy(), data["ask"].to_numpy(), width, volume)
+
+
+def ladder_from_frame(data, timeframes=None):
+    """build_ladder() for a tick DataFrame indexed by time with bid/ask(/volume) columns."""
+    volume = data["volume"].to_numpy() if "volume" in data.columns else None
+    return build_ladder(data.index, data["bid"].to_numpy(), data["ask"].to_numpy(), timeframes, volume)
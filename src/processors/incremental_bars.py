@@ -0,0 +1,230 @@
+# incremental_bars.py: Incremental bar maintenance with persisted aggregation state
+
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from bar_builder import BAR_COLUMNS, TIMEFRAME_MINUTES, TIMEFRAME_PARENTS, build_bars, roll_up, timeframe_names
+
+
+class BarStore:
+    """
+    Append-only Parquet store of closed bars.
+
+    Layout: `{base_dir}/symbol={SYMBOL}/timeframe={TF}/part-{first bar}.parquet`.
+    Each append is one file named after its first bar, so re-appending the
+    same bars (after a crash between append and state save) overwrites the
+    file instead of duplicating them.
+
+    Compaction merges the appended parts into one file per calendar month,
+    `month-{YYYYMM}.parquet`. Only the months the parts fall in are
+    rewritten, so its cost depends on the recent bars, not on the history;
+    it runs on append once a symbol and timeframe has more than `max_parts`
+    appended parts.
+
+    Args:
+        base_dir: Root directory of the store
+        max_parts: Appended parts per symbol and timeframe before an append compacts them (None: never)
+    """
+
+    def __init__(self, base_dir, max_parts=100):
+        self.base_dir = Path(base_dir)
+        self.max_parts = max_parts
+
+    def directory(self, symbol, timeframe):
+        return self.base_dir / f"symbol={symbol}" / f"timeframe={timeframe}"
+
+    def part_path(self, symbol, timeframe, first_bar):
+        return self.directory(symbol, timeframe) / f"part-{first_bar:%Y%m%d%H%M%S}.parquet"
+
+    def month_path(self, symbol, timeframe, month):
+        return self.directory(symbol, timeframe) / f"month-{month:%Y%m}.parquet"
+
+    def append(self, symbol, timeframe, bars):
+        if bars.empty:
+            return
+        self._write(self.part_path(symbol, timeframe, bars.index[0]), bars)
+        if self.max_parts is not None and len(self._appended(symbol, timeframe)) > self.max_parts:
+            self.compact(symbol, timeframe)
+
+    @staticmethod
+    def _write(path, bars):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f".{path.name}.inprogress")
+        pq.write_table(pa.Table.from_pandas(bars, preserve_index=True), temporary)
+        os.replace(temporary, path)
+
+    def _appended(self, symbol, timeframe):
+        directory = self.directory(symbol, timeframe)
+        return sorted(directory.glob("part-*.parquet")) if directory.exists() else []
+
+    def parts(self, symbol, timeframe):
+        """Month files followed by appended parts; later files win for repeated bars."""
+        directory = self.directory(symbol, timeframe)
+        if not directory.exists():
+            return []
+        return sorted(directory.glob("month-*.parquet")) + self._appended(symbol, timeframe)
+
+    @staticmethod
+    def _read_files(paths):
+        bars = pd.concat([pq.read_table(path, partitioning=None).to_pandas() for path in paths])
+        bars = bars.sort_index(kind="stable")
+        return bars.loc[~bars.index.duplicated(keep="last")]
+
+    def read(self, symbol, timeframe):
+        """All stored bars of a symbol and timeframe, in time order."""
+        parts = self.parts(symbol, timeframe)
+        if not parts:
+            return pd.DataFrame(columns=list(BAR_COLUMNS), index=pd.DatetimeIndex([], name="bar_time"))
+        return self._read_files(parts)
+
+    def compact(self, symbol, timeframe):
+        """Merge the appended parts of a symbol and timeframe into its month files."""
+        appended = self._appended(symbol, timeframe)
+        if not appended:
+            return
+        bars = self._read_files(appended)
+        for month, month_bars in bars.groupby(bars.index.to_period("M"), sort=True):
+            path = self.month_path(symbol, timeframe, month.start_time)
+            if path.exists():
+                month_bars = pd.concat([self._read_files([path]), month_bars]).sort_index(kind="stable")
+                month_bars = month_bars.loc[~month_bars.index.duplicated(keep="last")]
+            self._write(path, month_bars)
+        # Until the parts are gone their bars are read twice, which read() deduplicates
+        for path in appended:
+            path.unlink()
+
+
+def _bar_to_state(bars):
+    # The open bar as a JSON-serializable dict
+    state = {"bar_time": int(bars.index[-1].value)}
+    state.update({name: bars[name].iloc[-1].item() for name in BAR_COLUMNS})
+    return state
+
+
+def _bar_from_state(state):
+    index = pd.DatetimeIndex([pd.Timestamp(state["bar_time"])], name="bar_time")
+    return pd.DataFrame({name: [state[name]] for name in BAR_COLUMNS}, index=index)
+
+
+class IncrementalBarEngine:
+    """
+    Keeps bars of a timeframe ladder current as new ticks arrive.
+
+    Per symbol, the state holds the time of the last processed tick, how
+    many ticks at that time were processed and, for every timeframe, the
+    start of the last closed bar and the open (not yet closed) bar; it is
+    saved as JSON in `state_dir` after every update. New ticks are turned
+    into M1 bars and rolled up the ladder (TIMEFRAME_PARENTS) on their own;
+    each timeframe then merges the result with its open bar. Every bar
+    except the newest is closed and appended to the store, so an update
+    costs time proportional to the new ticks, not to the history.
+
+    Args:
+        store: BarStore for closed bars
+        state_dir: Directory for the per-symbol state files
+        timeframes: Timeframe members or names to maintain (all 21 by default)
+    """
+
+    def __init__(self, store, state_dir, timeframes=None):
+        self.store = store
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.timeframes = timeframe_names(timeframes)
+
+        # Intermediate levels needed to roll up to the requested ones
+        self._levels = set()
+        for name in self.timeframes:
+            while name not in self._levels:
+                self._levels.add(name)
+                if name == "M1":
+                    break
+                name = TIMEFRAME_PARENTS[name]
+
+    def _state_path(self, symbol):
+        return self.state_dir / f"{symbol}.json"
+
+    def load_state(self, symbol):
+        path = self._state_path(symbol)
+        if not path.exists():
+            return {"last_tick_time": None, "last_tick_count": 0, "last_closed": {}, "open_bars": {}}
+        return json.loads(path.read_text())
+
+    def _save_state(self, symbol, state):
+        path = self._state_path(symbol)
+        temporary = path.with_name(f".{path.name}.tmp")
+        temporary.write_text(json.dumps(state))
+        os.replace(temporary, path)
+
+    def last_tick_time(self, symbol):
+        """Time of the last processed tick (Timestamp), or None before the first update."""
+        last = self.load_state(symbol)["last_tick_time"]
+        return None if last is None else pd.Timestamp(last)
+
+    def update(self, symbol, ticks):
+        """
+        Feed new ticks (DataFrame indexed by time with bid/ask(/volume), time ordered).
+
+        Ticks before the last processed one are ignored, and so are as many
+        ticks at its time as were already processed, so feeding an
+        overlapping range is safe, and ticks sharing the last millisecond
+        that arrive later are still counted. Ticks of one timestamp must be
+        fed in the same order each time.
+
+        Returns:
+            {timeframe: number of bars closed by this update}
+        """
+        state = self.load_state(symbol)
+        last, seen = state["last_tick_time"], state.get("last_tick_count")
+        if last is not None:
+            last = pd.Timestamp(last)
+            keep = ticks.index >= last
+            # States saved before the count was kept skip every tick at `last`
+            keep[np.flatnonzero(ticks.index == last)[:seen]] = False
+            ticks = ticks.loc[keep]
+        if ticks.empty:
+            return {}
+
+        volume = ticks["volume"].to_numpy() if "volume" in ticks.columns else None
+        deltas = {"M1": build_bars(ticks.index, ticks["bid"].to_numpy(), ticks["ask"].to_numpy(), "1min", volume)}
+        # TIMEFRAME_MINUTES lists every parent before its children
+        for name in TIMEFRAME_MINUTES:
+            if name in self._levels and name not in deltas:
+                deltas[name] = roll_up(deltas[TIMEFRAME_PARENTS[name]], name)
+
+        closed = {}
+        for name in self.timeframes:
+            bars = deltas[name]
+            if name in state["open_bars"]:
+                bars = roll_up(pd.concat([_bar_from_state(state["open_bars"][name]), bars]), name)
+            self.store.append(symbol, name, bars.iloc[:-1])
+            if len(bars) > 1:
+                state["last_closed"][name] = int(bars.index[-2].value)
+            state["open_bars"][name] = _bar_to_state(bars)
+            closed[name] = len(bars) - 1
+
+        newest = ticks.index[-1]
+        at_newest = int((ticks.index == newest).sum())
+        state["last_tick_count"] = at_newest + (seen or 0) if newest == last else at_newest
+        state["last_tick_time"] = int(newest.value)
+        self._save_state(symbol, state)
+        logging.debug(f"Updated bars for {symbol} up to {ticks.index[-1]}: {closed}")
+        return closed
+
+    def open_bar(self, symbol, timeframe):
+        """The open bar of a timeframe (one-row DataFrame), or None."""
+        state = self.load_state(symbol)["open_bars"].get(getattr(timeframe, "name", timeframe))
+        return None if state is None else _bar_from_state(state)
+
+    def bars(self, symbol, timeframe):
+        """Closed bars from the store followed by the open bar."""
+        name = getattr(timeframe, "name", timeframe)
+        bars = self.store.read(symbol, name)
+        open_bar = self.open_bar(symbol, name)
+        if open_bar is not None:
+            bars = pd.concat([bars, open_bar]) if not bars.empty else open_bar
+        return bars
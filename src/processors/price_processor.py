@@ -4,29 +4,66 @@ src/processors/price_processor.py
 Basic Price Data Processor
 =========================
 
-This module handles the processing of 15-second market data into larger timeframes
+This module handles the processing of tick data into larger timeframes
 while managing common edge cases in financial data processing.
 
 Key Features:
-- Reads 15-second price data from Parquet files
+- Reads price data from the partitioned Parquet tick archive (see tick_dataset)
 - Aggregates data into larger timeframes (1min, 5min, etc.)
 - Handles common edge cases like market gaps and data issues
 """
 
+import sys
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 from datetime import datetime, timedelta
 
+from bar_builder import TIMEFRAME_FREQ, TIMEFRAME_MINUTES, bars_from_frame, ladder_from_frame
+from incremental_bars import IncrementalBarEngine
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+from sessions import session_for
+from tick_cache import TickCache
+from tick_dataset import open_files, symbol_partitions
+
+# Archive columns read by default, and the names the processor uses for them
+RAW_COLUMNS = {
+    'bid_price': 'bid',
+    'ask_price': 'ask',
+    'volume': 'volume',
+}
+
+def _time_slice(table: pa.Table, start: datetime, end: datetime, in_range: ds.Expression) -> pa.Table:
+    """
+    Rows of a partition table with start <= tick_time <= end.
+
+    A partition sorted by tick_time (the usual case) is cut with a binary
+    search into a zero-copy slice; only overlapping parts that were never
+    compacted fall back to filtering, which copies the columns.
+    """
+    times = table.column('tick_time').to_numpy()
+    if len(times) and not (times[1:] >= times[:-1]).all():
+        return table.filter(in_range)
+    first = times.searchsorted(np.datetime64(start, 'ms'), side='left')
+    last = times.searchsorted(np.datetime64(end, 'ms'), side='right')
+    return table.slice(first, last - first)
+
 class PriceProcessor:
-    def __init__(self, data_path: str):
+    def __init__(self, data_path: str, cache: Optional[TickCache] = None):
         # Set up logging for tracking processing operations
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
         
-        # Path where our 15-second data is stored
+        # Root of the Parquet tick archive (tick_dataset layout)
         self.data_path = Path(data_path)
+
+        # Optional memory-mapped cache of decoded partitions, for repeated reads
+        self.cache = cache
         
         # Dictionary to store our processing rules for edge cases
         self.edge_case_handlers = {
@@ -35,84 +72,141 @@ class PriceProcessor:
             'news_event': self._handle_news_event
         }
 
-    def read_raw_data(self, symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+    def read_raw_data(self, symbol: str, start_date: datetime, end_date: datetime,
+                      columns: Optional[List[str]] = None, deduplicate: bool = True) -> pd.DataFrame:
         """
-        Reads 15-second data for a given symbol and date range.
+        Reads tick data for a given symbol and date range.
+
+        Only the partitions of the days in range are opened; the time range
+        is pushed down to the Parquet row group statistics, so row groups
+        outside it are never decoded. Fragments are read in parallel and come
+        back in time order, so no global sort is needed. With a cache, days
+        already decoded are memory-mapped instead of read from Parquet.
         
         Args:
             symbol: The trading symbol (e.g., 'BTCUSD')
             start_date: Start of the data range
-            end_date: End of the data range
+            end_date: End of the data range (inclusive)
+            columns: Archive columns to read (defaults to RAW_COLUMNS)
+            deduplicate: Keep only the last of the ticks sharing a timestamp
             
         Returns:
-            DataFrame containing the raw price data
+            DataFrame indexed by tick_time
         """
         try:
-            # Create a list of dates we need to read
-            date_range = pd.date_range(start_date, end_date, freq='D')
-            data_frames = []
+            start_date = pd.Timestamp(start_date).to_pydatetime()
+            end_date = pd.Timestamp(end_date).to_pydatetime()
+            columns = list(columns or RAW_COLUMNS)
 
-            for date in date_range:
-                file_path = self.data_path / symbol / f"{date.strftime('%Y%m%d')}.parquet"
-                
-                if file_path.exists():
-                    # Read the parquet file for this date
-                    df = pd.read_parquet(file_path)
-                    data_frames.append(df)
-                else:
-                    self.logger.warning(f"No data file found for {symbol} on {date}")
-
-            if not data_frames:
+            partitions = symbol_partitions(self.data_path, symbol, start_date.date(), end_date.date())
+            if not partitions:
                 raise ValueError(f"No data found for {symbol} between {start_date} and {end_date}")
 
-            # Combine all the daily data
-            combined_data = pd.concat(data_frames)
-            
-            # Sort by time and remove any duplicates
-            combined_data = combined_data.sort_index().loc[start_date:end_date]
-            return combined_data.loc[~combined_data.index.duplicated(keep='last')]
+            in_range = (ds.field('tick_time') >= start_date) & (ds.field('tick_time') <= end_date)
+            if self.cache is not None:
+                # Slices of the mapped entries; only the first and last day are cut
+                tables = []
+                for day, files in partitions:
+                    day_table = self.cache.get(symbol, day, files).select(['tick_time'] + columns)
+                    if day in (start_date.date(), end_date.date()):
+                        day_table = _time_slice(day_table, start_date, end_date, in_range)
+                    tables.append(day_table)
+                table = pa.concat_tables(tables)
+            else:
+                files = [path for _, day_files in partitions for path in day_files]
+                table = open_files(self.data_path, files).to_table(
+                    columns=['tick_time'] + columns, filter=in_range, use_threads=True,
+                )
+            data = table.to_pandas().set_index('tick_time').rename(columns=RAW_COLUMNS)
+
+            # Files are sorted and read in order; only overlapping parts that
+            # were never compacted need a sort
+            if not data.index.is_monotonic_increasing:
+                self.logger.warning(f"Unsorted tick data for {symbol}; compact the archive to avoid sorting")
+                data = data.sort_index(kind='stable')
+
+            # Remove any duplicates
+            if not deduplicate:
+                return data
+            return data.loc[~data.index.duplicated(keep='last')]
 
         except Exception as e:
             self.logger.error(f"Error reading data for {symbol}: {str(e)}")
             raise
 
-    def aggregate_timeframe(self, data: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    def aggregate_timeframe(self, data: pd.DataFrame, timeframe: str,
+                            symbol: Optional[str] = None) -> pd.DataFrame:
         """
-        Aggregates 15-second data into larger timeframes.
+        Aggregates tick data into OHLC bars of a larger timeframe.
         
         Args:
-            data: DataFrame containing 15-second data
+            data: DataFrame of ticks (see read_raw_data)
             timeframe: Target timeframe (e.g., '1min', '5min', '1H')
+            symbol: Symbol of the data, selecting its trading session
             
         Returns:
-            DataFrame with aggregated data
+            DataFrame with bid/ask/mid OHLC, tick count, spread statistics
+            and volume per bar (see bar_builder.BAR_COLUMNS)
         """
         try:
-            # Define our aggregation rules
-            agg_rules = {
-                'bid': 'last',    # Last bid price in the period
-                'ask': 'last',    # Last ask price in the period
-                'volume': 'sum'   # Sum of volume in the period
-            }
+            # Build bars in one vectorized pass
+            resampled = bars_from_frame(data, timeframe)
+            return self._finish_bars(resampled, timeframe, symbol)
 
-            # Resample to the target timeframe
-            resampled = data.resample(timeframe).agg(agg_rules)
+        except Exception as e:
+            self.logger.error(f"Error aggregating timeframe {timeframe}: {str(e)}")
+            raise
+
+    def aggregate_ladder(self, data: pd.DataFrame, timeframes: Optional[List] = None,
+                         symbol: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Aggregates tick data into bars of several timeframes at once.
+
+        M1 bars are built from the ticks once and every coarser timeframe is
+        rolled up from the level below it (see bar_builder.build_ladder).
 
-            # Now let's handle edge cases in our resampled data
-            resampled = self._process_edge_cases(resampled)
+        Args:
+            data: DataFrame of ticks (see read_raw_data)
+            timeframes: Timeframe members or names (e.g. 'M5', 'H4'); all 21 by default
+            symbol: Symbol of the data, selecting its trading session
 
-            return resampled
+        Returns:
+            Dictionary of timeframe name to bars, as aggregate_timeframe returns them
+        """
+        try:
+            ladder = ladder_from_frame(data, timeframes)
+            return {
+                name: self._finish_bars(bars, TIMEFRAME_FREQ[name], symbol,
+                                        intraday=TIMEFRAME_MINUTES[name] is not None and name != 'D1')
+                for name, bars in ladder.items()
+            }
 
         except Exception as e:
-            self.logger.error(f"Error aggregating timeframe {timeframe}: {str(e)}")
+            self.logger.error(f"Error aggregating timeframes {timeframes}: {str(e)}")
             raise
 
-    def _process_edge_cases(self, data: pd.DataFrame) -> pd.DataFrame:
+    def _finish_bars(self, bars: pd.DataFrame, freq: str, symbol: Optional[str] = None,
+                     intraday: bool = True) -> pd.DataFrame:
+        """
+        Lays bars on a regular grid so gaps show up as empty bars, then
+        handles edge cases. Session gaps only apply to intraday bars.
+        """
+        bars = bars.asfreq(freq)
+        bars['tick_count'] = bars['tick_count'].fillna(0).astype('int64')
+        bars['volume'] = bars['volume'].fillna(0)
+
+        # Now let's handle edge cases in our resampled data
+        if intraday:
+            return self._process_edge_cases(bars, symbol)
+        return self._handle_news_event(bars)
+
+    def _process_edge_cases(self, data: pd.DataFrame, symbol: Optional[str] = None) -> pd.DataFrame:
         """
         Processes common edge cases in the data.
         
         Args:
             data: DataFrame containing price data
+            symbol: Symbol of the data, selecting its trading session
             
         Returns:
             DataFrame with edge cases handled
@@ -121,7 +215,7 @@ class PriceProcessor:
         data = self._handle_missing_data(data)
         
         # Check for market gaps (weekends, holidays)
-        data = self._handle_market_gap(data)
+        data = self._handle_market_gap(data, symbol)
         
         # Handle any known news events
         data = self._handle_news_event(data)
@@ -144,16 +238,15 @@ class PriceProcessor:
         # For small gaps (< 1 minute), we'll forward fill the last known price
         return data.ffill(limit=4)  # limit=4 means we'll only fill up to 1 minute
 
-    def _handle_market_gap(self, data: pd.DataFrame) -> pd.DataFrame:
+    def _handle_market_gap(self, data: pd.DataFrame, symbol: Optional[str] = None) -> pd.DataFrame:
         """
-        Handles market gaps like weekends and holidays.
-        These are expected gaps where we don't want to fill in data.
+        Handles market gaps like weekends and daily breaks.
+        These are expected gaps where we don't want to fill in data, so
+        everything outside the symbol's trading session is set to NaN.
         """
-        for idx in data.index:
-            # Check if it's a weekend (except for BTCUSD)
-            if idx.weekday() >= 5 and 'BTCUSD' not in str(data.name):
-                # Mark weekend data as NaN
-                data.loc[idx] = None
+        closed = ~session_for(symbol).open_mask(data.index)
+        if closed.any():
+            data.loc[closed] = None
                 
         return data
 
@@ -189,6 +282,54 @@ class PriceProcessor:
         raw_data = self.read_raw_data(symbol, start_date, end_date)
         
         # Aggregate to desired timeframe
-        processed_data = self.aggregate_timeframe(raw_data, timeframe)
+        processed_data = self.aggregate_timeframe(raw_data, timeframe, symbol)
+        
+        return processed_data
+
+    def process_symbol_ladder(self, symbol: str, start_date: datetime, end_date: datetime,
+                              timeframes: Optional[List] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Processing pipeline for several timeframes from a single read of the raw data.
+        
+        Args:
+            symbol: Trading symbol to process
+            start_date: Start of the data range
+            end_date: End of the data range
+            timeframes: Timeframe members or names; all 21 by default
+            
+        Returns:
+            Dictionary of timeframe name to processed bars
+        """
+        raw_data = self.read_raw_data(symbol, start_date, end_date)
+        return self.aggregate_ladder(raw_data, timeframes, symbol)
+
+    def update_symbol_bars(self, symbol: str, engine: IncrementalBarEngine, end_date: datetime,
+                           start_date: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Brings a symbol's bars in an incremental engine up to end_date.
+
+        Only ticks from the time of the last one the engine processed are
+        read, so keeping the ladder current costs time proportional to the
+        new ticks. Ticks sharing a timestamp are all kept: the engine skips
+        the ones it already has, and picks up ticks written later within the
+        same millisecond.
         
-        return processed_data
\ No newline at end of file
+        Args:
+            symbol: Trading symbol to update
+            engine: IncrementalBarEngine holding the symbol's state
+            end_date: End of the new data (inclusive)
+            start_date: Where to start if the engine has no state for the symbol yet
+            
+        Returns:
+            Dictionary of timeframe name to the number of bars closed
+        """
+        last_tick = engine.last_tick_time(symbol)
+        if last_tick is not None:
+            start_date = last_tick
+        elif start_date is None:
+            raise ValueError(f"No bar state for {symbol}; a start_date is required")
+        if pd.Timestamp(start_date) > pd.Timestamp(end_date):
+            return {}
+
+        raw_data = self.read_raw_data(symbol, start_date, end_date, deduplicate=False)
+        return engine.update(symbol, raw_data)
@@ -0,0 +1,159 @@
+# spark_bars.py: OHLC bars of every timeframe from the tick archive in one Spark job
+
+from pyspark.sql import functions as F
+
+from bar_builder import PRICE_SIDES, TIMEFRAME_MINUTES, timeframe_names
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+def _tick_prices():
+    # Price column of each side in the tick archive (columns need an active session)
+    return {
+        "bid": F.col("bid_price"),
+        "ask": F.col("ask_price"),
+        "mid": (F.col("bid_price") + F.col("ask_price")) / 2,
+    }
+
+
+def bucket_column(time_column, timeframe):
+    """
+    Start of the `timeframe` bar containing `time_column`, with the buckets of bar_builder.
+
+    Expects the session time zone to be UTC, so that epoch arithmetic on
+    naive timestamps keeps their wall-clock time.
+    """
+    ts = time_column.cast("timestamp")
+    minutes = TIMEFRAME_MINUTES[timeframe]
+    if minutes:
+        width = minutes * 60
+        return (F.floor(ts.cast("long") / width) * width).cast("timestamp")
+    if timeframe == "W1":
+        # 1970-01-01 was a Thursday, so Sunday-based weeks start 4 days before multiples of 7
+        days = F.floor(ts.cast("long") / DAY_SECONDS)
+        return ((F.floor((days + 4) / 7) * 7 - 4) * DAY_SECONDS).cast("timestamp")
+    return F.date_trunc("month", ts)
+
+
+def with_scan_order(df):
+    """
+    Add `scan_order`, the position of each row in the archive, to a DataFrame read from Parquet.
+
+    Must be applied to the file scan itself, before any shuffle. The file
+    name orders the parts of a partition as they were written; within a
+    file, the split offset and monotonically_increasing_id() (which counts
+    rows in task order) give the row's position. Ticks sharing a
+    millisecond, or a second for ticks without time_msc, are ordered by it.
+    """
+    return df.withColumn("scan_order", F.struct(
+        F.col("_metadata.file_name"),
+        F.col("_metadata.file_block_start"),
+        F.monotonically_increasing_id(),
+    ))
+
+
+def ohlc_aggregations(order, side, from_bars=False):
+    """
+    Open/high/low/close of one price side as aggregate expressions.
+
+    Open and close are the values at the minimum and maximum of `order`
+    (min_by/max_by). `order` must be unique within a bar for them not to
+    depend on the order rows reach the aggregation after a shuffle: use
+    struct(tick_time, scan_order) for ticks, bar_time for bars.
+
+    Args:
+        order: Ordering column or column name
+        side: Price side (bid/ask/mid)
+        from_bars: Aggregate {side}_open/_high/_low/_close bar columns instead of a price column
+    """
+    names = [f"{side}_{field}" for field in ("open", "high", "low", "close")] if from_bars else [side] * 4
+    return [
+        F.min_by(names[0], order).alias(f"{side}_open"),
+        F.max(names[1]).alias(f"{side}_high"),
+        F.min(names[2]).alias(f"{side}_low"),
+        F.max_by(names[3], order).alias(f"{side}_close"),
+    ]
+
+
+def ticks_to_minute_bars(ticks):
+    """
+    M1 bars (bar_builder.BAR_COLUMNS) per symbol from a tick DataFrame.
+
+    Args:
+        ticks: DataFrame with symbol, tick_time, bid_price, ask_price, volume
+            and scan_order (see with_scan_order)
+
+    Returns:
+        DataFrame with symbol, bar_time and BAR_COLUMNS
+    """
+    priced = ticks.select(
+        "symbol", F.struct("tick_time", "scan_order").alias("tick_order"),
+        bucket_column(F.col("tick_time"), "M1").alias("bar_time"),
+        *[price.alias(side) for side, price in _tick_prices().items()],
+        (F.col("ask_price") - F.col("bid_price")).alias("spread"),
+        F.coalesce(F.col("volume"), F.lit(0.0)).alias("volume"),
+    )
+    aggregations = [agg for side in PRICE_SIDES for agg in ohlc_aggregations("tick_order", side)]
+    aggregations += [
+        F.count(F.lit(1)).alias("tick_count"),
+        F.min("spread").alias("spread_min"),
+        F.avg("spread").alias("spread_mean"),
+        F.max("spread").alias("spread_max"),
+        F.sum("volume").alias("volume"),
+    ]
+    return priced.groupBy("symbol", "bar_time").agg(*aggregations)
+
+
+def roll_up_all(minute_bars, timeframes=None):
+    """
+    Bars of all `timeframes` from M1 bars in one aggregation.
+
+    Every M1 bar is exploded into one row per timeframe carrying that
+    timeframe's bucket, and a single groupBy(symbol, timeframe, bucket)
+    computes every bar size at once: one shuffle over (M1 bars x timeframes)
+    rows instead of a read, shuffle and write per symbol and timeframe.
+
+    Returns:
+        DataFrame with symbol, timeframe, bar_time (naive) and BAR_COLUMNS
+    """
+    names = timeframe_names(timeframes)
+    buckets = F.array(*[
+        F.struct(F.lit(name).alias("timeframe"), bucket_column(F.col("bar_time"), name).alias("start"))
+        for name in names
+    ])
+    exploded = minute_bars.select("*", F.explode(buckets).alias("bucket")) \
+        .select(*minute_bars.columns, "bucket.timeframe", F.col("bucket.start").alias("bucket_start"))
+
+    aggregations = [agg for side in PRICE_SIDES for agg in ohlc_aggregations("bar_time", side, from_bars=True)]
+    aggregations += [
+        F.sum("tick_count").alias("tick_count"),
+        F.min("spread_min").alias("spread_min"),
+        (F.sum(F.col("spread_mean") * F.col("tick_count")) / F.sum("tick_count")).alias("spread_mean"),
+        F.max("spread_max").alias("spread_max"),
+        F.sum("volume").alias("volume"),
+    ]
+    return exploded.groupBy("symbol", "timeframe", "bucket_start").agg(*aggregations) \
+        .withColumnRenamed("bucket_start", "bar_time") \
+        .withColumn("bar_time", F.col("bar_time").cast("timestamp_ntz"))
+
+
+def build_bars(ticks, timeframes=None, partition_by_symbol=False):
+    """
+    Bars of all `timeframes` from a tick DataFrame (ticks_to_minute_bars + roll_up_all).
+
+    By default each aggregation does its own exchange, with map-side
+    partial aggregation, so the M1 step shuffles partial bars rather than
+    ticks and runs with full parallelism.
+
+    With partition_by_symbol, the ticks are hash-partitioned by symbol
+    first. That partitioning satisfies both aggregations, so the plan has a
+    single exchange, but it ships raw ticks without partial aggregation and
+    runs the whole history in at most one task per symbol. It is only worth
+    it where scripts/benchmark_spark_bars.py shows it winning.
+
+    Returns:
+        DataFrame with symbol, timeframe, bar_time and BAR_COLUMNS
+    """
+    if partition_by_symbol:
+        ticks = ticks.repartition("symbol")
+    return roll_up_all(ticks_to_minute_bars(ticks), timeframes)
@@ -1,18 +1,53 @@
 # spark_processor.py
 
 from pyspark.sql import SparkSession
-from pyspark.sql.functions import col, window
+from pyspark.sql.functions import col, lit
 from pyspark.sql.types import StructType, StructField, TimestampType, DoubleType, StringType
 import logging
+import pandas as pd
 from pathlib import Path
 from config import SYMBOLS, Timeframe, DATA_FOLDER
+from spark_bars import build_bars, with_scan_order
+
+# Parquet archives next to DATA_FOLDER: ticks in the tick_dataset layout
+# (symbol=/date=) and bars in the incremental_bars.BarStore layout (symbol=/timeframe=)
+TICK_DATASET_DIR = Path(DATA_FOLDER).parent / "tick_dataset"
+BAR_DIR = Path(DATA_FOLDER).parent / "bars"
+
+# Output of process_all (symbol=/timeframe= partitions)
+PROCESSED_DIR = Path(DATA_FOLDER).parent / "processed"
+
+# Upper bound of the bytes packed into one read task, and the cost charged
+# per opened file, so many small files are packed together
+MAX_PARTITION_BYTES = 128 * 1024 * 1024
+OPEN_COST_BYTES = 4 * 1024 * 1024
+
+def _time_literal(df, column, value):
+    # Naive archive timestamps are read as TIMESTAMP_NTZ; a literal of the
+    # same type keeps the comparison pushable to the Parquet reader. The
+    # literal is built from text so the Python process' time zone plays no part
+    return lit(value.isoformat(sep=" ")).cast(df.schema[column].dataType)
 
 class SparkProcessor:
-    def __init__(self):
+    def __init__(self, tick_dir=TICK_DATASET_DIR, bar_dir=BAR_DIR,
+                 max_partition_bytes=MAX_PARTITION_BYTES, open_cost_bytes=OPEN_COST_BYTES):
+        # Spark sizes read splits as min(maxPartitionBytes, max(openCostInBytes,
+        # input bytes / cores)), so a small selection still uses every core.
+        # Tick times are naive wall-clock times; with a UTC session they
+        # keep their value through timestamp arithmetic. Overwrites only
+        # replace the partitions a job writes
         self.spark = SparkSession.builder \
             .appName("MT5DataProcessor") \
             .config("spark.sql.warehouse.dir", "spark-warehouse") \
+            .config("spark.sql.files.maxPartitionBytes", str(max_partition_bytes)) \
+            .config("spark.sql.files.openCostInBytes", str(open_cost_bytes)) \
+            .config("spark.sql.parquet.filterPushdown", "true") \
+            .config("spark.sql.session.timeZone", "UTC") \
+            .config("spark.sql.sources.partitionOverwriteMode", "dynamic") \
             .getOrCreate()
+
+        self.tick_dir = Path(tick_dir)
+        self.bar_dir = Path(bar_dir)
             
         self.schema = StructType([
             StructField("time", TimestampType(), True),
@@ -29,41 +64,134 @@ class SparkProcessor:
         """Read all CSV files for a symbol/timeframe combination"""
         path = str(Path(DATA_FOLDER) / symbol / timeframe.name / "*.csv")
         return self.spark.read.csv(path, header=True, schema=self.schema)
+
+    def _read_partitioned(self, base_dir, symbols=None, columns=None, scan_order=False):
+        """
+        Read a hive-partitioned (symbol=...) Parquet archive.
+
+        With symbols, only their directories are listed; basePath keeps the
+        symbol partition column. With scan_order, each row's position in the
+        archive is captured at the scan. Returns None if none of them has data.
+        """
+        reader = self.spark.read.option("basePath", str(base_dir))
+        if symbols:
+            paths = [str(base_dir / f"symbol={symbol}") for symbol in symbols]
+            paths = [path for path in paths if Path(path).exists()]
+        else:
+            paths = [str(base_dir)]
+        if not paths:
+            return None
+        df = reader.parquet(*paths)
+        if scan_order:
+            df = with_scan_order(df)
+        return df.select(*columns) if columns else df
+
+    def read_ticks(self, symbols=None, start=None, end=None, columns=None):
+        """
+        Read ticks from the Parquet tick archive.
+
+        Symbols and days outside the range are pruned by partition (no file
+        of theirs is opened), the tick_time range is pushed down to the row
+        group statistics and only the selected columns are decoded.
+
+        Args:
+            symbols: Symbols to read (all by default)
+            start: First tick_time (inclusive)
+            end: Last tick_time (inclusive)
+            columns: Columns to keep; symbol and tick_time are always included
+
+        Returns:
+            DataFrame with symbol, date, tick_time, scan_order (the tie-breaker
+            for equal tick times, see spark_bars.with_scan_order) and the
+            selected columns
+        """
+        if columns:
+            columns = ["symbol", "date", "tick_time", "scan_order"] + [
+                c for c in columns if c not in ("symbol", "date", "tick_time", "scan_order")
+            ]
+        df = self._read_partitioned(self.tick_dir, symbols, columns, scan_order=True)
+        if df is None:
+            raise ValueError(f"No tick data found for {symbols} in {self.tick_dir}")
+
+        # The date conditions prune partitions, the tick_time ones row groups
+        if start is not None:
+            start = pd.Timestamp(start).to_pydatetime()
+            df = df.where((col("date") >= lit(start.date())) & (col("tick_time") >= _time_literal(df, "tick_time", start)))
+        if end is not None:
+            end = pd.Timestamp(end).to_pydatetime()
+            df = df.where((col("date") <= lit(end.date())) & (col("tick_time") <= _time_literal(df, "tick_time", end)))
+        return df
+
+    def read_bars(self, symbols=None, timeframes=None, start=None, end=None, columns=None):
+        """
+        Read bars from the Parquet bar archive, pruned like read_ticks.
+
+        Args:
+            symbols: Symbols to read (all by default)
+            timeframes: Timeframe members or names to read (all by default)
+            start: First bar_time (inclusive)
+            end: Last bar_time (inclusive)
+            columns: Columns to keep; symbol, timeframe and bar_time are always included
+
+        Returns:
+            DataFrame with symbol, timeframe, bar_time and the selected columns
+        """
+        if columns:
+            columns = ["symbol", "timeframe", "bar_time"] + [c for c in columns if c not in ("symbol", "timeframe", "bar_time")]
+        df = self._read_partitioned(self.bar_dir, symbols, columns)
+        if df is None:
+            raise ValueError(f"No bar data found for {symbols} in {self.bar_dir}")
+
+        if timeframes:
+            df = df.where(col("timeframe").isin([getattr(tf, "name", tf) for tf in timeframes]))
+        if start is not None:
+            df = df.where(col("bar_time") >= _time_literal(df, "bar_time", pd.Timestamp(start).to_pydatetime()))
+        if end is not None:
+            df = df.where(col("bar_time") <= _time_literal(df, "bar_time", pd.Timestamp(end).to_pydatetime()))
+        return df
     
-    def process_data(self, symbol, timeframe):
-        """Process data for a symbol/timeframe combination"""
-        df = self.read_symbol_data(symbol, timeframe)
-        
-        # Basic processing example - you can extend this
-        processed = df \
-            .withWatermark("time", "1 hour") \
-            .groupBy(
-                window("time", "1 day"),
-                "symbol"
-            ).agg({
-                "open": "first",
-                "high": "max",
-                "low": "min",
-                "close": "last",
-                "tick_volume": "sum",
-                "real_volume": "sum"
-            })
-            
-        return processed
-    
-    def process_all(self):
-        """Process all symbols and timeframes"""
-        for symbol in SYMBOLS:
-            for timeframe in Timeframe:
-                try:
-                    processed_df = self.process_data(symbol, timeframe)
-                    # Save processed data
-                    output_path = str(Path(DATA_FOLDER) / "processed" / symbol / timeframe.name)
-                    processed_df.write.mode("overwrite").parquet(output_path)
-                except Exception as e:
-                    logging.error(f"Error processing {symbol} {timeframe.name}: {e}")
-                    continue
+    def process_data(self, symbol, timeframe, start=None, end=None):
+        """
+        Build bars of one timeframe for a symbol from the tick archive.
+
+        Args:
+            symbol: Trading symbol to process
+            timeframe: Timeframe member or name
+            start: First tick_time (inclusive)
+            end: Last tick_time (inclusive)
+
+        Returns:
+            DataFrame with symbol, timeframe, bar_time and bar_builder.BAR_COLUMNS
+        """
+        ticks = self.read_ticks([symbol], start, end, columns=["bid_price", "ask_price", "volume"])
+        return build_bars(ticks, [timeframe])
     
+    def process_all(self, symbols=SYMBOLS, timeframes=Timeframe, output_dir=PROCESSED_DIR):
+        """
+        Build bars of all timeframes for all symbols in a single job.
+
+        Ticks are read once, aggregated into M1 bars and rolled up to every
+        timeframe in one grouped aggregation (see spark_bars.build_bars).
+        The result is written once, partitioned by symbol and timeframe;
+        the dynamic overwrite replaces only the (symbol, timeframe)
+        partitions written, so other symbols' bars stay as they are.
+
+        Args:
+            symbols: Symbols to process
+            timeframes: Timeframe members or names to build
+            output_dir: Root of the symbol=/timeframe= output
+        """
+        ticks = self.read_ticks(symbols, columns=["bid_price", "ask_price", "volume"])
+        bars = build_bars(ticks, timeframes)
+
+        # One time-ordered file per (symbol, timeframe); bars are few next to ticks
+        bars = bars.repartition("symbol", "timeframe").sortWithinPartitions("bar_time")
+        bars.write \
+            .mode("overwrite") \
+            .partitionBy("symbol", "timeframe") \
+            .parquet(str(output_dir))
+        logging.info(f"Processed {len(symbols)} symbols into {output_dir}")
+
     def stop(self):
         """Stop Spark session"""
         self.spark.stop()
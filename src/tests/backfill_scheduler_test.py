@@ -0,0 +1,264 @@
+# backfill_scheduler_test.py
+
+import threading
+from datetime import datetime, timedelta
+
+from backfill_checkpoints import CheckpointStore, contiguous_end
+from backfill_scheduler import BackfillScheduler
+from fake_mt5 import FakeMT5
+
+
+class MemoryStore:
+    """Collects stored chunks instead of writing to PostgreSQL."""
+
+    def __init__(self):
+        self.chunks = []
+        self.lock = threading.Lock()
+
+    def __call__(self, symbol, table, start, end):
+        with self.lock:
+            self.chunks.append((symbol, start, end, table.num_rows))
+        return table.num_rows
+
+
+def test_backfills_all_symbols_concurrently():
+    mt5 = FakeMT5(rates={"EURUSD": 10, "XAUUSD": 2, "US30": 0})
+    store = MemoryStore()
+    start = datetime(2024, 1, 2, 0, 0)
+    end = start + timedelta(hours=6)
+    ranges = {symbol: (start, end) for symbol in ("EURUSD", "XAUUSD", "US30")}
+
+    scheduler = BackfillScheduler(mt5, store, fetchers=2, writers=3, target_ticks=20_000,
+                                  initial_chunk=timedelta(minutes=10))
+    progress = scheduler.run(ranges)
+
+    assert progress["EURUSD"].ticks == 6 * 3600 * 10
+    assert progress["XAUUSD"].ticks == 6 * 3600 * 2
+    assert progress["US30"].ticks == 0
+    for symbol in ranges:
+        assert progress[symbol].position == end
+        assert progress[symbol].percent_done == 100.0
+        assert progress[symbol].failed_chunks == 0
+
+    # Chunks of a symbol tile the range without gaps or overlaps
+    eurusd = sorted((s, e) for symbol, s, e, _ in store.chunks if symbol == "EURUSD")
+    assert eurusd[0][0] == start
+    assert all(prev[1] == nxt[0] for prev, nxt in zip(eurusd, eurusd[1:]))
+
+
+def test_chunk_length_adapts_to_tick_density():
+    mt5 = FakeMT5(rates={"BTCUSD": 50, "AUDUSD": 1})
+    store = MemoryStore()
+    start = datetime(2024, 1, 2)
+    ranges = {"BTCUSD": (start, start + timedelta(days=1)),
+              "AUDUSD": (start, start + timedelta(days=1))}
+
+    scheduler = BackfillScheduler(mt5, store, target_ticks=36_000,
+                                  initial_chunk=timedelta(minutes=1))
+    scheduler.run(ranges)
+
+    lengths = {
+        symbol: max(e - s for sym, s, e, _ in store.chunks if sym == symbol)
+        for symbol in ranges
+    }
+    # 36k ticks is 12 minutes of BTCUSD but 10 hours of AUDUSD
+    assert lengths["BTCUSD"] == timedelta(minutes=12)
+    assert lengths["AUDUSD"] == timedelta(hours=10)
+
+
+def test_failed_chunks_are_counted_and_skipped():
+    mt5 = FakeMT5(rates={"EURUSD": 1})
+    start = datetime(2024, 1, 2)
+
+    def failing_store(symbol, table, chunk_start, chunk_end):
+        raise RuntimeError("database is down")
+
+    progress = BackfillScheduler(mt5, failing_store, initial_chunk=timedelta(hours=1)).run(
+        {"EURUSD": (start, start + timedelta(hours=2))}
+    )
+    assert progress["EURUSD"].failed_chunks >= 1
+    assert progress["EURUSD"].inserted == 0
+
+
+class MemoryCheckpoints:
+    """In-memory stand-in for CheckpointStore."""
+
+    def __init__(self):
+        self.chunks = {}
+        self.ranges = {}
+        self.lock = threading.Lock()
+
+    def record_ranges(self, ranges):
+        self.ranges.update(ranges)
+
+    def mark_done(self, symbol, chunk_start, chunk_end, row_count):
+        with self.lock:
+            self.chunks[(symbol, chunk_start)] = (chunk_end, row_count, "done")
+
+    def mark_failed(self, symbol, chunk_start, chunk_end):
+        with self.lock:
+            self.chunks[(symbol, chunk_start)] = (chunk_end, 0, "failed")
+
+    def resume_points(self):
+        return {
+            symbol: contiguous_end(range_start, [
+                (start, end) for (chunk_symbol, start), (end, _, _) in self.chunks.items()
+                if chunk_symbol == symbol and range_start <= start < range_end
+            ])
+            for symbol, (range_start, range_end) in self.ranges.items()
+        }
+
+    def failed_chunks(self):
+        result = {}
+        for (symbol, start), (end, _, status) in sorted(self.chunks.items()):
+            if status == "failed":
+                result.setdefault(symbol, []).append((start, end))
+        return result
+
+
+def test_failed_chunks_are_checkpointed_and_retried_individually():
+    mt5 = FakeMT5(rates={"EURUSD": 1})
+    checkpoints = MemoryCheckpoints()
+    start = datetime(2024, 1, 2)
+    end = start + timedelta(hours=4)
+    bad_chunk = start + timedelta(hours=1)
+
+    def flaky_store(symbol, table, chunk_start, chunk_end):
+        if chunk_start == bad_chunk:
+            raise RuntimeError("connection reset")
+        return table.num_rows
+
+    BackfillScheduler(mt5, flaky_store, initial_chunk=timedelta(hours=1), target_ticks=3600,
+                      checkpoints=checkpoints).run({"EURUSD": (start, end)})
+    assert checkpoints.failed_chunks() == {"EURUSD": [(bad_chunk, bad_chunk + timedelta(hours=1))]}
+
+    # A restart resumes after the last chunk and only fetches the failed one again
+    mt5.calls.clear()
+    store = MemoryStore()
+    BackfillScheduler(mt5, store, checkpoints=checkpoints).run(
+        {"EURUSD": (end, end)}, retries=checkpoints.failed_chunks()
+    )
+    assert [(s, e) for _, s, e, _ in store.chunks] == [(bad_chunk, bad_chunk + timedelta(hours=1))]
+    assert len(mt5.calls) == 1
+    assert checkpoints.failed_chunks() == {}
+
+
+def test_resume_point_stops_at_the_first_unrecorded_chunk():
+    start = datetime(2024, 1, 2)
+    hour = timedelta(hours=1)
+    checkpoints = MemoryCheckpoints()
+    checkpoints.record_ranges({"EURUSD": (start, start + 4 * hour)})
+    # Writers finished chunk 2 and 3 before chunk 1, then the process died with chunk 1 unrecorded
+    checkpoints.mark_done("EURUSD", start + 2 * hour, start + 3 * hour, 10)
+    checkpoints.mark_failed("EURUSD", start + 3 * hour, start + 4 * hour)
+    checkpoints.mark_done("EURUSD", start, start + hour, 10)
+
+    assert checkpoints.resume_points() == {"EURUSD": start + hour}
+
+    # Resuming there fetches the missing chunk; the rest of the range follows on from it
+    mt5 = FakeMT5(rates={"EURUSD": 1})
+    store = MemoryStore()
+    BackfillScheduler(mt5, store, initial_chunk=hour, target_ticks=3600, checkpoints=checkpoints).run(
+        {"EURUSD": (checkpoints.resume_points()["EURUSD"], start + 4 * hour)}
+    )
+    assert min(chunk_start for _, chunk_start, _, _ in store.chunks) == start + hour
+    assert checkpoints.resume_points() == {"EURUSD": start + 4 * hour}
+
+
+def test_missing_first_chunk_resumes_at_the_range_start():
+    start = datetime(2024, 1, 2)
+    hour = timedelta(hours=1)
+    checkpoints = MemoryCheckpoints()
+    checkpoints.record_ranges({"EURUSD": (start, start + 3 * hour)})
+    checkpoints.mark_done("EURUSD", start + hour, start + 2 * hour, 10)
+    checkpoints.mark_done("EURUSD", start + 2 * hour, start + 3 * hour, 10)
+
+    assert checkpoints.resume_points() == {"EURUSD": start}
+
+
+class LosingCheckpoints(MemoryCheckpoints):
+    """Loses the record of the chunks starting at `lost`, as if the process died before writing it."""
+
+    def __init__(self, lost):
+        super().__init__()
+        self.lost = set(lost)
+
+    def mark_done(self, symbol, chunk_start, chunk_end, row_count):
+        if chunk_start not in self.lost:
+            super().mark_done(symbol, chunk_start, chunk_end, row_count)
+
+
+def test_consecutive_resumes_never_refetch_completed_ranges():
+    start = datetime(2024, 1, 2)
+    hour = timedelta(hours=1)
+    mt5 = FakeMT5(rates={"EURUSD": 1})
+    checkpoints = LosingCheckpoints(lost=[start + hour])
+
+    # Chunk bounds of each run differ, as every run adapts its own chunk length
+    BackfillScheduler(mt5, MemoryStore(), initial_chunk=hour, target_ticks=3600,
+                      checkpoints=checkpoints).run({"EURUSD": (start, start + 3 * hour)})
+    assert checkpoints.resume_points() == {"EURUSD": start + hour}
+
+    checkpoints.lost.clear()
+    for end in (4, 5, 6):
+        resume = checkpoints.resume_points()["EURUSD"]
+        store = MemoryStore()
+        BackfillScheduler(mt5, store, initial_chunk=hour / 2, target_ticks=5400,
+                          checkpoints=checkpoints).run({"EURUSD": (resume, start + end * hour)})
+        assert min(chunk_start for _, chunk_start, _, _ in store.chunks) == resume
+        assert checkpoints.resume_points() == {"EURUSD": start + end * hour}
+        if end > 4:
+            assert resume == start + (end - 1) * hour
+
+
+def test_contiguous_end_without_gaps_is_the_last_end():
+    day = datetime(2024, 1, 2)
+    chunks = [(day + timedelta(hours=h), day + timedelta(hours=h + 1)) for h in (3, 0, 2, 1)]
+    assert contiguous_end(day, chunks) == day + timedelta(hours=4)
+    assert contiguous_end(day, []) == day
+
+
+class RowsPool:
+    """Connection pool whose queries all return the same rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def getconn(self):
+        pool = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query, params=None):
+                pass
+
+            def fetchall(self):
+                return pool.rows
+
+        class Connection:
+            def cursor(self):
+                return Cursor()
+
+            def commit(self):
+                pass
+
+        return Connection()
+
+    def putconn(self, conn):
+        pass
+
+
+def test_checkpoint_store_resumes_at_the_gap():
+    day = datetime(2024, 1, 2)
+    hour = timedelta(hours=1)
+    rows = [("EURUSD", day, day, day + hour), ("EURUSD", day, day + 2 * hour, day + 3 * hour),
+            ("XAUUSD", day, day + hour, day + 2 * hour), ("US30", day, None, None)]
+
+    assert CheckpointStore(RowsPool(rows)).resume_points(["EURUSD", "XAUUSD", "US30"]) == {
+        "EURUSD": day + hour, "XAUUSD": day, "US30": day,
+    }
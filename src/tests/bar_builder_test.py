@@ -0,0 +1,82 @@
+# bar_builder_test.py
+
+import numpy as np
+import pandas as pd
+
+from bar_builder import BAR_COLUMNS, TIMEFRAME_MINUTES, TIMEFRAME_PARENTS, build_bars, build_ladder
+
+
+def test_bars_match_pandas_resample():
+    rng = np.random.default_rng(7)
+    times = pd.Timestamp("2024-01-02 09:58") + pd.to_timedelta(np.sort(rng.integers(0, 600_000, 5000)), unit="ms")
+    bid = 1.1 + rng.normal(0, 1e-4, len(times)).cumsum()
+    ask = bid + rng.uniform(1e-5, 3e-5, len(times))
+    ticks = pd.DataFrame({"bid": bid, "ask": ask, "volume": 1.0}, index=times)
+
+    bars = build_bars(times, bid, ask, "1min", volume=ticks["volume"])
+    resampled = ticks.resample("1min")
+    ohlc = resampled["bid"].ohlc()
+
+    assert list(bars.columns) == BAR_COLUMNS
+    for field in ("open", "high", "low", "close"):
+        np.testing.assert_allclose(bars[f"bid_{field}"], ohlc[field])
+    np.testing.assert_allclose(bars["ask_low"], resampled["ask"].min())
+    np.testing.assert_array_equal(bars["tick_count"], resampled["ask"].count())
+    np.testing.assert_allclose(bars["volume"], resampled["volume"].sum())
+    assert bars.index.equals(ohlc.index.rename("bar_time"))
+
+
+def test_mid_spread_and_empty_buckets():
+    times = pd.to_datetime(["2024-01-02 10:00:10", "2024-01-02 10:00:50", "2024-01-02 10:03:00"])
+    bars = build_bars(times, [1.0, 2.0, 3.0], [1.2, 2.4, 3.1], "1min", volume=[1.0, np.nan, 2.0])
+
+    # No bar for the minutes without ticks
+    assert list(bars.index) == list(pd.to_datetime(["2024-01-02 10:00", "2024-01-02 10:03"]))
+    first = bars.iloc[0]
+    assert (first["mid_open"], first["mid_close"]) == (1.1, 2.2)
+    assert first["tick_count"] == 2
+    np.testing.assert_allclose([first["spread_min"], first["spread_mean"], first["spread_max"]], [0.2, 0.3, 0.4])
+    assert first["volume"] == 1.0
+
+
+def test_unsorted_ticks_are_ordered_first():
+    times = pd.to_datetime(["2024-01-02 10:00:50", "2024-01-02 10:00:10"])
+    bars = build_bars(times, [2.0, 1.0], [2.1, 1.1], "1min")
+
+    assert (bars["bid_open"].iloc[0], bars["bid_close"].iloc[0]) == (1.0, 2.0)
+
+
+def random_ticks(days, seed=3):
+    rng = np.random.default_rng(seed)
+    count = days * 20_000
+    offsets = np.sort(rng.integers(0, days * 86_400_000, count))
+    times = pd.Timestamp("2024-01-25") + pd.to_timedelta(offsets, unit="ms")
+    bid = 1.1 + rng.normal(0, 1e-4, count).cumsum()
+    return times, bid, bid + rng.uniform(1e-5, 3e-5, count), rng.uniform(0, 2, count)
+
+
+def test_ladder_matches_building_each_timeframe_from_ticks():
+    times, bid, ask, volume = random_ticks(days=3)
+    ladder = build_ladder(times, bid, ask, ["M1", "M12", "H4", "D1"], volume)
+
+    assert list(ladder) == ["M1", "M12", "H4", "D1"]
+    for name, width in (("M12", "12min"), ("H4", "4h"), ("D1", "1D")):
+        expected = build_bars(times, bid, ask, width, volume)
+        pd.testing.assert_frame_equal(ladder[name], expected, check_exact=False, rtol=1e-9)
+
+
+def test_weeks_start_on_sunday_and_months_on_the_first():
+    times, bid, ask, volume = random_ticks(days=14)
+    ladder = build_ladder(times, bid, ask, ["W1", "MN1"], volume)
+
+    assert list(ladder["W1"].index) == list(pd.to_datetime(["2024-01-21", "2024-01-28", "2024-02-04"]))
+    assert list(ladder["MN1"].index) == list(pd.to_datetime(["2024-01-01", "2024-02-01"]))
+    assert ladder["MN1"]["tick_count"].sum() == len(times)
+    assert ladder["W1"]["bid_high"].max() == bid.max()
+
+
+def test_every_timeframe_rolls_up_from_a_nested_parent():
+    for name, parent in TIMEFRAME_PARENTS.items():
+        if TIMEFRAME_MINUTES[name]:
+            assert TIMEFRAME_MINUTES[name] % TIMEFRAME_MINUTES[parent] == 0
+    assert len(build_ladder(*random_ticks(days=1)[:3])) == 21
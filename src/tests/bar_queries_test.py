@@ -0,0 +1,24 @@
+# bar_queries_test.py
+
+import pytest
+from datetime import timedelta
+from bar_queries import BAR_VIEWS, resolve_timeframe
+
+
+class _Timeframe:
+    name = "H1"
+
+
+def test_timeframes_resolve_by_name_or_member():
+    assert resolve_timeframe("M15") == "M15"
+    assert resolve_timeframe(_Timeframe()) == "H1"
+
+
+def test_timeframes_without_aggregate_are_rejected():
+    with pytest.raises(ValueError):
+        resolve_timeframe("M2")
+
+
+def test_views_roll_up_from_finer_widths():
+    widths = [width for _, width in BAR_VIEWS.values()]
+    assert all(coarse % fine == timedelta(0) for fine, coarse in zip(widths, widths[1:]))
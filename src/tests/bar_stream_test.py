@@ -0,0 +1,162 @@
+# bar_stream_test.py
+
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from bar_builder import BAR_COLUMNS, build_ladder
+from bar_stream import ParquetBarSink, StreamingBarAggregator, bar_bounds, bars_to_frames
+from collector_loop import MarketStateCache, TickCollector
+from collector_loop_test import START_MSC, MemorySink, MemoryWriter
+from fake_mt5 import FakeMT5, make_ticks
+from incremental_bars import BarStore
+from tick_stream import TickStream
+
+TIMEFRAMES = ["M1", "M5", "H1", "W1", "MN1"]
+
+
+def tick_table(times, bid, ask, volume=None):
+    return pa.table({
+        "tick_time": pa.array(np.asarray(times, dtype="datetime64[ms]")),
+        "bid_price": bid,
+        "ask_price": ask,
+        "volume": pa.array(volume if volume is not None else [None] * len(bid), pa.float64()),
+    })
+
+
+def random_ticks(count=20_000, seed=11):
+    rng = np.random.default_rng(seed)
+    offsets = np.sort(rng.integers(0, 40 * 86_400_000, count))
+    times = pd.Timestamp("2024-01-20") + pd.to_timedelta(offsets, unit="ms")
+    bid = 1.1 + rng.normal(0, 1e-4, count).cumsum()
+    return times, bid, bid + rng.uniform(1e-5, 3e-5, count), rng.uniform(0, 2, count)
+
+
+def test_streamed_bars_match_batch_bars():
+    times, bid, ask, volume = random_ticks()
+    aggregator = StreamingBarAggregator(TIMEFRAMES)
+    received = []
+    aggregator.subscribe(received.append)
+
+    aggregator.on_table("EURUSD", tick_table(times, bid, ask, volume))
+    aggregator.close_until(int(times[-1].value // 1_000_000) + 40 * 86_400_000)
+
+    frames = bars_to_frames(received)
+    expected = build_ladder(times, bid, ask, TIMEFRAMES, volume)
+    for name in TIMEFRAMES:
+        bars = frames[("EURUSD", name)]
+        assert bars.index.equals(expected[name].index)
+        np.testing.assert_allclose(bars[BAR_COLUMNS].to_numpy(float), expected[name].to_numpy(float))
+
+
+def test_bar_bounds_month_and_week():
+    moment = int(pd.Timestamp("2024-12-18 10:00").value // 1_000_000)
+    start, end = bar_bounds(moment, "MN1")
+    assert (pd.Timestamp(start, unit="ms"), pd.Timestamp(end, unit="ms")) == (
+        pd.Timestamp("2024-12-01"), pd.Timestamp("2025-01-01"))
+    assert pd.Timestamp(bar_bounds(moment, "W1")[0], unit="ms") == pd.Timestamp("2024-12-15")
+
+
+def test_watermark_closes_quiet_symbols_and_late_ticks_are_dropped():
+    aggregator = StreamingBarAggregator(["M1"], close_delay=1.0)
+    bars = aggregator.subscribe_queue()
+    aggregator.on_table("EURUSD", tick_table(["2024-01-02T10:00:05"], [1.1], [1.1002]))
+    aggregator.on_table("XAUUSD", tick_table(["2024-01-02T10:01:00.500"], [2000.0], [2000.3]))
+
+    # Within the close delay: nothing closes yet
+    assert aggregator.close_until() == []
+    aggregator.on_table("XAUUSD", tick_table(["2024-01-02T10:01:01.200"], [2000.1], [2000.4]))
+    closed = aggregator.close_until()
+
+    assert [(bar.symbol, bar.bar_time) for bar in closed] == [("EURUSD", datetime(2024, 1, 2, 10, 0))]
+    assert bars.get_nowait() == closed[0]
+    aggregator.on_table("EURUSD", tick_table(["2024-01-02T10:00:59"], [1.2], [1.2002]))
+    assert aggregator.late_ticks == 1
+    assert aggregator.open_bar("EURUSD", "M1") is None
+
+
+def test_sinks_are_written_on_flush(tmp_path):
+    store = BarStore(tmp_path)
+    aggregator = StreamingBarAggregator(["M1"], sinks=[ParquetBarSink(store, write_interval=0)])
+    times = pd.date_range("2024-01-02 10:00", periods=180, freq="s")
+    aggregator.on_table("EURUSD", tick_table(times, np.full(180, 1.1), np.full(180, 1.1002)))
+
+    assert store.read("EURUSD", "M1").empty
+    assert aggregator.flush() == 2
+    assert store.read("EURUSD", "M1")["tick_count"].tolist() == [60, 60]
+
+
+class FlakySink:
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def __call__(self, bars):
+        if self.fail:
+            raise ConnectionError("PostgreSQL is unavailable")
+        self.batches.append([bar.bar_time.minute for bar in bars])
+
+
+def test_bars_a_sink_fails_to_take_are_retried_for_that_sink_only():
+    flaky, healthy = FlakySink(), FlakySink()
+    aggregator = StreamingBarAggregator(["M1"], sinks=[flaky, healthy])
+    minutes = pd.date_range("2024-01-02 10:00", periods=4, freq="min")
+
+    aggregator.on_table("EURUSD", tick_table(minutes[:2], [1.1] * 2, [1.1002] * 2))
+    flaky.fail = True
+    assert aggregator.flush() == 1
+    aggregator.on_table("EURUSD", tick_table(minutes[2:], [1.1] * 2, [1.1002] * 2))
+    assert aggregator.flush() == 2
+    flaky.fail = False
+    assert aggregator.flush() == 0
+
+    assert flaky.batches == [[0, 1, 2]]
+    assert healthy.batches == [[0], [1, 2]]
+
+
+def test_parquet_sink_buffers_bars_between_writes(tmp_path):
+    store = BarStore(tmp_path)
+    now = [0.0]
+    sink = ParquetBarSink(store, write_interval=60, clock=lambda: now[0])
+    aggregator = StreamingBarAggregator(["M1"], sinks=[sink])
+    times = pd.date_range("2024-01-02 10:00", periods=600, freq="s")
+
+    for minute in range(10):
+        aggregator.on_table("EURUSD", tick_table(times[minute * 60:(minute + 1) * 60],
+                                                 np.full(60, 1.1), np.full(60, 1.1002)))
+        now[0] += 15
+        aggregator.flush()
+
+    assert len(store.parts("EURUSD", "M1")) == 2
+    sink.close()
+    assert len(store.parts("EURUSD", "M1")) == 3
+    assert store.read("EURUSD", "M1")["tick_count"].tolist() == [60] * 9
+
+
+def test_tick_to_closed_bar_latency_is_below_a_millisecond():
+    aggregator = StreamingBarAggregator(["M1", "M5", "H1"])
+    latencies = []
+    aggregator.subscribe(lambda bar: latencies.append(time.perf_counter() - started))
+    for minute in range(200):
+        started = time.perf_counter()
+        aggregator.on_tick("EURUSD", START_MSC + minute * 60_000, 1.1, 1.1002)
+
+    assert len(latencies) == 199 + 39 + 3
+    assert np.median(latencies) < 0.001
+
+
+def test_collector_feeds_the_aggregator():
+    mt5 = FakeMT5(streams={"EURUSD": make_ticks(START_MSC + np.arange(150) * 1000)})
+    aggregator = StreamingBarAggregator(["M1"], close_delay=0)
+    stream = TickStream(mt5, start_times={"EURUSD": START_MSC})
+    collector = TickCollector(["EURUSD"], stream, MemoryWriter(), MemorySink(),
+                              MarketStateCache(lambda symbol: True), bar_aggregator=aggregator)
+    bars = aggregator.subscribe_queue()
+
+    collector.run_once()
+
+    assert [bars.get_nowait().tick_count for _ in range(bars.qsize())] == [60, 60]
+    assert aggregator.open_bar("EURUSD", "M1").tick_count == 30
@@ -0,0 +1,59 @@
+# bulk_loader_test.py
+
+import csv
+import io
+from datetime import datetime
+
+import pyarrow as pa
+
+from bulk_loader import STAGING_TABLE, copy_tick_table
+
+
+class RecordingCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.conn.queries.append(query)
+        if query.lstrip().startswith("INSERT"):
+            self.rowcount = len(self.conn.copied)
+
+    def copy_expert(self, sql, payload):
+        self.conn.queries.append(sql)
+        self.conn.copied = list(csv.reader(io.StringIO(payload.read().decode())))
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.queries = []
+        self.copied = []
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+
+def test_tick_table_is_copied_as_csv_and_merged():
+    table = pa.table({
+        "symbol": ["EURUSD", "EURUSD"],
+        "tick_time": pa.array([datetime(2024, 1, 2, 10, 0, 0, 123000)] * 2, pa.timestamp("ms")),
+        "bid_price": [1.10001, 1.10002],
+        "ask_price": [1.10013, 1.10014],
+        "last_price": pa.array([None, None], pa.float64()),
+    })
+    conn = RecordingConnection()
+
+    assert copy_tick_table(conn, table) == 2
+    assert f"COPY {STAGING_TABLE} (symbol, tick_time, bid_price, ask_price, last_price)" in conn.queries[1]
+    # NULLs must be unquoted empty fields for COPY ... (FORMAT csv)
+    assert conn.copied[0] == ["EURUSD", "2024-01-02 10:00:00.123", "1.10001", "1.10013", ""]
+    assert "INSERT INTO market_data.tick_data" in conn.queries[2]
+
+
+def test_empty_table_is_not_copied():
+    conn = RecordingConnection()
+    assert copy_tick_table(conn, pa.table({"symbol": pa.array([], pa.string())})) == 0
+    assert conn.queries == []
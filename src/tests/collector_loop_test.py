@@ -0,0 +1,133 @@
+# collector_loop_test.py
+
+import numpy as np
+import pytest
+
+from collector_loop import MarketStateCache, TickCollector
+from fake_mt5 import FakeMT5, make_ticks
+from spill_log import SpillLog
+from tick_buffer import BLOCK, SPILL
+from tick_stream import TickStream
+
+START_MSC = 1_704_189_600_000
+
+
+class MemoryWriter:
+    def __init__(self):
+        self.rows = []
+
+    def write_table(self, symbol, table):
+        self.rows.extend((symbol, *row) for row in zip(
+            table["tick_time"].to_pylist(), table["bid_price"].to_pylist(), table["ask_price"].to_pylist()))
+
+
+class MemorySink:
+    def __init__(self, fail=False):
+        self.tables = []
+        self.fail = fail
+
+    def __call__(self, table):
+        if self.fail:
+            raise ConnectionError("PostgreSQL is unavailable")
+        self.tables.append(table)
+        return table.num_rows
+
+
+def make_collector(symbols, mt5, sink, check=lambda symbol: True):
+    stream = TickStream(mt5, start_times={symbol: START_MSC for symbol in symbols})
+    return TickCollector(symbols, stream, MemoryWriter(), sink, MarketStateCache(check))
+
+
+def test_one_pass_services_every_symbol_and_flushes_in_one_batch():
+    symbols = [f"SYM{i}" for i in range(50)]
+    mt5 = FakeMT5(streams={s: make_ticks(START_MSC + np.arange(10) * 100) for s in symbols})
+    sink = MemorySink()
+    collector = make_collector(symbols, mt5, sink)
+
+    assert collector.run_once() == 500
+    assert len(collector.parquet_writer.rows) == 500
+    assert collector.flush() == 500
+    assert len(sink.tables) == 1
+    assert set(sink.tables[0]["symbol"].to_pylist()) == set(symbols)
+    assert collector.flush() == 0
+
+
+def test_failed_flush_keeps_ticks_for_next_attempt():
+    mt5 = FakeMT5(streams={"EURUSD": make_ticks(START_MSC + np.arange(5))})
+    sink = MemorySink(fail=True)
+    collector = make_collector(["EURUSD"], mt5, sink)
+    collector.run_once()
+
+    assert collector.flush() == 0
+    sink.fail = False
+    assert collector.flush() == 5
+
+
+def test_failed_flush_requeues_ticks_ahead_of_newer_ones():
+    mt5 = FakeMT5(streams={"EURUSD": make_ticks(START_MSC + np.arange(5))})
+    sink = MemorySink(fail=True)
+    collector = make_collector(["EURUSD"], mt5, sink)
+    collector.run_once()
+    collector.flush()
+    mt5.append_ticks("EURUSD", make_ticks(START_MSC + np.arange(5, 8)))
+    collector.run_once()
+
+    sink.fail = False
+    assert collector.flush() == 8
+    times = sink.tables[0]["tick_time"].cast("int64").to_pylist()
+    assert times == sorted(times)
+    assert collector.buffers["EURUSD"].accepted == 8
+
+
+def test_block_policy_is_rejected_for_the_shared_loop():
+    with pytest.raises(ValueError):
+        TickCollector(["EURUSD"], None, MemoryWriter(), MemorySink(), None, buffer_policy=BLOCK)
+
+
+def test_closed_markets_are_skipped_and_state_is_cached():
+    checks = []
+
+    def check(symbol):
+        checks.append(symbol)
+        return symbol != "US30"
+
+    mt5 = FakeMT5(streams={s: make_ticks([START_MSC]) for s in ("US30", "BTCUSD")})
+    collector = make_collector(["US30", "BTCUSD"], mt5, MemorySink(), check)
+    for _ in range(5):
+        collector.run_once()
+
+    assert checks == ["US30", "BTCUSD"]
+    assert {row[0] for row in collector.parquet_writer.rows} == {"BTCUSD"}
+
+
+def test_market_state_expires_after_ttl():
+    now = [0.0]
+    calls = []
+    cache = MarketStateCache(lambda symbol: calls.append(symbol) or True, ttl=60, clock=lambda: now[0])
+    cache.is_open("EURUSD")
+    now[0] = 59.0
+    cache.is_open("EURUSD")
+    now[0] = 60.5
+    cache.is_open("EURUSD")
+    assert calls == ["EURUSD", "EURUSD"]
+
+
+def test_outage_spills_to_disk_and_replays_when_database_returns(tmp_path):
+    symbols = ["EURUSD", "XAUUSD"]
+    mt5 = FakeMT5(streams={s: make_ticks(START_MSC + np.arange(10)) for s in symbols})
+    sink = MemorySink(fail=True)
+    stream = TickStream(mt5, start_times={symbol: START_MSC for symbol in symbols})
+    collector = TickCollector(symbols, stream, MemoryWriter(), sink,
+                              MarketStateCache(lambda symbol: True), buffer_capacity=4,
+                              buffer_policy=SPILL, spill_log=SpillLog(tmp_path))
+
+    # Buffer overflow spills while capturing, the failed flush spills the rest
+    assert collector.run_once() == 20
+    assert collector.buffers["EURUSD"].spilled == 6
+    assert collector.flush() == 0
+    assert all(len(buffer) == 0 for buffer in collector.buffers.values())
+
+    sink.fail = False
+    collector.flush()
+    assert sum(t.num_rows for t in sink.tables) == 20
+    assert not collector.spill_log.has_pending()
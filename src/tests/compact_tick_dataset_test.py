@@ -0,0 +1,81 @@
+# compact_tick_dataset_test.py
+
+import os
+from datetime import date, datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from compact_tick_dataset import compact_partition, needs_compaction
+from tick_dataset import in_progress_path, next_part_path, open_writer, part_files, partition_dir, to_file_table
+
+
+def write_part(directory, start, count, row_group_size):
+    # Prices follow the time of day, so overlapping parts contain identical ticks
+    seconds = [start.hour * 3600 + start.minute * 60 + start.second + i for i in range(count)]
+    table = to_file_table(pa.table({
+        "tick_time": pa.array([start + timedelta(seconds=i) for i in range(count)], pa.timestamp("ms")),
+        "bid_price": [1.1 + s * 1e-6 for s in seconds],
+        "ask_price": [1.1002 + s * 1e-6 for s in seconds],
+    }))
+    directory.mkdir(parents=True, exist_ok=True)
+    with open_writer(next_part_path(directory)) as writer:
+        writer.write_table(table, row_group_size=row_group_size)
+
+
+def test_small_parts_are_merged_sorted_and_deduplicated(tmp_path):
+    directory = partition_dir(tmp_path, "EURUSD", date(2024, 1, 2))
+    start = datetime(2024, 1, 2, 10)
+    write_part(directory, start + timedelta(seconds=50), 100, row_group_size=10)  # later session first
+    write_part(directory, start, 60, row_group_size=10)                           # overlaps by 10 ticks
+    assert needs_compaction(part_files(directory))
+
+    before, after = compact_partition(directory, row_group_size=64)
+
+    assert (before.files, before.row_groups, before.rows) == (2, 16, 160)
+    assert (after.files, after.row_groups, after.rows) == (1, 3, 150)
+    table = pq.ParquetFile(directory / "part-000.parquet").read()
+    assert table["tick_time"].to_pylist() == [start + timedelta(seconds=i) for i in range(150)]
+    assert not needs_compaction(part_files(directory), row_group_size=64)
+
+
+def test_large_partitions_are_split_into_target_sized_files(tmp_path):
+    directory = partition_dir(tmp_path, "EURUSD", date(2024, 1, 2))
+    write_part(directory, datetime(2024, 1, 2), 1000, row_group_size=10)
+
+    _, after = compact_partition(directory, row_group_size=100, target_file_bytes=1)
+
+    assert after.files == 10
+    assert [p.name for p in part_files(directory)][-1] == "part-009.parquet"
+
+
+def test_partitions_being_written_are_skipped(tmp_path):
+    directory = partition_dir(tmp_path, "EURUSD", date(2024, 1, 2))
+    write_part(directory, datetime(2024, 1, 2), 10, row_group_size=5)
+    in_progress_path(next_part_path(directory)).write_bytes(b"partial")
+
+    assert compact_partition(directory) is None
+    assert sorted(p.name for p in directory.iterdir()) == [".part-001.parquet.inprogress", "part-000.parquet"]
+
+
+def test_readers_never_see_rows_missing_while_files_are_installed(tmp_path, monkeypatch):
+    directory = partition_dir(tmp_path, "EURUSD", date(2024, 1, 2))
+    start = datetime(2024, 1, 2)
+    for hour in range(3):
+        write_part(directory, start + timedelta(hours=hour), 500, row_group_size=100)
+    expected = {start + timedelta(hours=hour, seconds=i) for hour in range(3) for i in range(500)}
+
+    seen = []
+    replace = os.replace
+
+    def replace_and_read(source, target):
+        replace(source, target)
+        seen.append({t for path in part_files(directory) for t in pq.read_table(path)["tick_time"].to_pylist()})
+    monkeypatch.setattr(os, "replace", replace_and_read)
+
+    _, after = compact_partition(directory, row_group_size=100, target_file_bytes=1)
+
+    assert after.files == 15 and after.rows == 1500
+    assert len(seen) > after.files
+    assert all(ticks == expected for ticks in seen)
+    assert [p.name for p in part_files(directory)] == [f"part-{i:03d}.parquet" for i in range(15)]
@@ -0,0 +1,14 @@
+# conftest.py: Make the src/ modules and scripts importable the same way they are at runtime
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+for path in (ROOT / "src" / "utils", ROOT / "src" / "collectors",
+             ROOT / "src" / "processors", ROOT / "scripts"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+# The manual connectivity checks need a live MT5 terminal / Spark cluster
+collect_ignore = ["mt5_test.py", "spark_test.py", "timeframe_tester.py"]
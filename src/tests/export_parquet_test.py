@@ -0,0 +1,53 @@
+# export_parquet_test.py
+
+from datetime import datetime, timedelta
+
+import pyarrow.parquet as pq
+
+from export_and_regenerate_parquet import DailyParquetWriter, month_shards, rows_to_batch
+
+
+def rows(start, count, step=timedelta(hours=1)):
+    return [(start + i * step, 1.1 + i * 1e-5, 1.1002 + i * 1e-5, None, None, 0.5) for i in range(count)]
+
+
+def test_rows_become_batches_with_spread():
+    batch = rows_to_batch(rows(datetime(2024, 1, 2, 10), 3))
+
+    assert batch.num_rows == 3
+    assert batch.column("spread").to_pylist() == [
+        a - b for a, b in zip(batch.column("ask_price").to_pylist(), batch.column("bid_price").to_pylist())
+    ]
+    assert batch.column("tick_size").to_pylist() == [0.5] * 3
+
+
+def test_batches_are_split_into_day_files(tmp_path):
+    writer = DailyParquetWriter(tmp_path)
+    start = datetime(2024, 1, 2, 20)
+    writer.write(rows_to_batch(rows(start, 3)))                       # 20:00 - 22:00
+    writer.write(rows_to_batch(rows(start + timedelta(hours=3), 6)))  # 23:00 - 04:00
+    writer.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["2024-01-02.parquet", "2024-01-03.parquet"]
+    assert pq.ParquetFile(tmp_path / "2024-01-02.parquet").metadata.num_rows == 4
+    assert pq.ParquetFile(tmp_path / "2024-01-02.parquet").metadata.num_row_groups == 2
+    assert pq.ParquetFile(tmp_path / "2024-01-03.parquet").metadata.num_rows == 5
+
+
+def test_abort_discards_day_in_progress(tmp_path):
+    writer = DailyParquetWriter(tmp_path)
+    writer.write(rows_to_batch(rows(datetime(2024, 1, 2, 10), 2)))
+    writer.abort()
+
+    assert not list(tmp_path.iterdir())
+
+
+def test_month_shards_cover_first_tick_to_until():
+    shards = month_shards(datetime(2023, 11, 17, 8, 30), datetime(2024, 2, 10))
+
+    assert shards == [
+        (datetime(2023, 11, 1), datetime(2023, 12, 1)),
+        (datetime(2023, 12, 1), datetime(2024, 1, 1)),
+        (datetime(2024, 1, 1), datetime(2024, 2, 1)),
+        (datetime(2024, 2, 1), datetime(2024, 2, 10)),
+    ]
@@ -0,0 +1,110 @@
+# fake_mt5.py: Scriptable stand-in for the MetaTrader5 module used in tests
+
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+# Layout of the structured arrays returned by mt5.copy_ticks_*
+MT5_TICK_DTYPE = np.dtype([
+    ("time", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("last", "<f8"),
+    ("volume", "<u8"), ("time_msc", "<i8"), ("flags", "<u4"), ("volume_real", "<f8"),
+])
+
+# Shape of the object returned by mt5.symbol_info_tick
+Tick = namedtuple("Tick", MT5_TICK_DTYPE.names)
+
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+
+
+def make_ticks(time_msc, bid=None, spread=0.00012):
+    """Build an MT5-style tick array for the given millisecond timestamps."""
+    time_msc = np.asarray(time_msc, dtype=np.int64)
+    ticks = np.zeros(len(time_msc), dtype=MT5_TICK_DTYPE)
+    ticks["time_msc"] = time_msc
+    ticks["time"] = time_msc // 1000
+    ticks["bid"] = 1.1 + np.arange(len(time_msc)) * 1e-5 if bid is None else bid
+    ticks["ask"] = ticks["bid"] + spread
+    ticks["volume"] = np.arange(len(time_msc)) % 5
+    ticks["volume_real"] = ticks["volume"] * 1.5
+    return ticks
+
+
+def _to_msc(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    return int(value) * 1000
+
+
+class FakeMT5:
+    """
+    Minimal MetaTrader5 API backed by scripted tick streams.
+
+    Each symbol either has a fixed tick rate (`rates`, ticks per second, used
+    to synthesize history on demand) or an explicit tick array (`streams`)
+    that can be extended while a test is running.
+    """
+
+    COPY_TICKS_ALL = COPY_TICKS_ALL
+    COPY_TICKS_INFO = COPY_TICKS_INFO
+    COPY_TICKS_TRADE = COPY_TICKS_TRADE
+
+    def __init__(self, rates=None, streams=None, unavailable=()):
+        self.rates = dict(rates or {})
+        self.streams = {symbol: ticks for symbol, ticks in (streams or {}).items()}
+        self.unavailable = set(unavailable)
+        self.calls = []
+
+    # Terminal
+    def initialize(self, *args, **kwargs):
+        return True
+
+    def shutdown(self):
+        return None
+
+    def last_error(self):
+        return (1, "Success")
+
+    # Scripted data
+    def append_ticks(self, symbol, ticks):
+        current = self.streams.get(symbol)
+        self.streams[symbol] = ticks if current is None else np.concatenate([current, ticks])
+
+    def _ticks_between(self, symbol, start_msc, end_msc):
+        if symbol in self.streams:
+            ticks = self.streams[symbol]
+            mask = (ticks["time_msc"] >= start_msc) & (ticks["time_msc"] < end_msc)
+            return ticks[mask]
+
+        rate = self.rates.get(symbol, 0)
+        if not rate:
+            return np.zeros(0, dtype=MT5_TICK_DTYPE)
+        step = max(1, int(1000 / rate))
+        first = -(-start_msc // step) * step
+        return make_ticks(np.arange(first, end_msc, step))
+
+    # MetaTrader5 API
+    def symbol_info(self, symbol):
+        return None if symbol in self.unavailable else {"name": symbol}
+
+    def symbol_info_tick(self, symbol):
+        self.calls.append(("symbol_info_tick", symbol))
+        ticks = self.streams.get(symbol)
+        if ticks is None or not len(ticks):
+            return None
+        return Tick(*ticks[-1].tolist())
+
+    def copy_ticks_range(self, symbol, date_from, date_to, flags):
+        self.calls.append(("copy_ticks_range", symbol))
+        if symbol in self.unavailable:
+            return None
+        return self._ticks_between(symbol, _to_msc(date_from), _to_msc(date_to))
+
+    def copy_ticks_from(self, symbol, date_from, count, flags):
+        self.calls.append(("copy_ticks_from", symbol))
+        if symbol in self.unavailable:
+            return None
+        ticks = self.streams.get(symbol, np.zeros(0, dtype=MT5_TICK_DTYPE))
+        return ticks[ticks["time_msc"] >= _to_msc(date_from)][:count]
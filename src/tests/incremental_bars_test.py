@@ -0,0 +1,153 @@
+# incremental_bars_test.py
+
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_builder import BAR_COLUMNS, build_ladder
+from incremental_bars import BarStore, IncrementalBarEngine
+from price_processor import PriceProcessor
+from price_processor_test import hours, write_day
+
+TIMEFRAMES = ["M1", "M5", "H1", "H4", "D1", "W1"]
+
+
+def random_ticks(seed=5, count=30_000):
+    rng = np.random.default_rng(seed)
+    offsets = np.unique(rng.integers(0, 3 * 86_400_000, count))
+    times = pd.Timestamp("2024-01-06") + pd.to_timedelta(offsets, unit="ms")
+    bid = 1.1 + rng.normal(0, 1e-4, len(times)).cumsum()
+    return pd.DataFrame({"bid": bid, "ask": bid + rng.uniform(1e-5, 3e-5, len(times)),
+                         "volume": rng.uniform(0, 2, len(times))}, index=times)
+
+
+def engine_for(tmp_path, timeframes=TIMEFRAMES):
+    return IncrementalBarEngine(BarStore(tmp_path / "bars"), tmp_path / "state", timeframes)
+
+
+def test_incremental_updates_match_a_full_rebuild(tmp_path):
+    ticks = random_ticks()
+    # Uneven batches, some ending mid-bar; a fresh engine per batch reloads the state from disk
+    for batch in np.array_split(ticks, [7, 4000, 4001, 12_345, 20_000]):
+        engine_for(tmp_path).update("EURUSD", batch)
+
+    engine = engine_for(tmp_path)
+    expected = build_ladder(ticks.index, ticks["bid"], ticks["ask"], TIMEFRAMES, ticks["volume"])
+    for name in TIMEFRAMES:
+        bars = engine.bars("EURUSD", name)
+        assert bars.index.equals(expected[name].index)
+        np.testing.assert_allclose(bars[BAR_COLUMNS].to_numpy(float), expected[name].to_numpy(float))
+        assert bars["tick_count"].dtype == np.int64
+
+
+def test_state_tracks_last_tick_and_closed_bars(tmp_path):
+    engine = engine_for(tmp_path, ["M5"])
+    ticks = random_ticks().iloc[:1000]
+
+    closed = engine.update("EURUSD", ticks)
+
+    state = engine.load_state("EURUSD")
+    assert engine.last_tick_time("EURUSD") == ticks.index[-1]
+    assert closed == {"M5": len(engine.store.read("EURUSD", "M5"))}
+    assert pd.Timestamp(state["last_closed"]["M5"]) == engine.store.read("EURUSD", "M5").index[-1]
+    assert engine.open_bar("EURUSD", "M5").index[0] == ticks.index[-1].floor("5min")
+
+
+def test_replayed_ticks_are_ignored(tmp_path):
+    engine = engine_for(tmp_path, ["M1"])
+    ticks = random_ticks().iloc[:2000]
+    engine.update("EURUSD", ticks.iloc[:1500])
+
+    assert engine.update("EURUSD", ticks.iloc[:1000]) == {}
+    engine.update("EURUSD", ticks)
+    assert engine.bars("EURUSD", "M1")["tick_count"].sum() == len(ticks)
+
+
+def test_compact_merges_parts(tmp_path):
+    engine = engine_for(tmp_path, ["M1"])
+    for batch in np.array_split(random_ticks().iloc[:5000], 5):
+        engine.update("EURUSD", batch)
+    before = engine.store.read("EURUSD", "M1")
+
+    engine.store.compact("EURUSD", "M1")
+
+    assert len(engine.store.parts("EURUSD", "M1")) == 1
+    pd.testing.assert_frame_equal(engine.store.read("EURUSD", "M1"), before)
+
+
+def test_processor_feeds_only_new_ticks(tmp_path):
+    day = date(2024, 1, 2)
+    write_day(tmp_path / "ticks", "BTCUSD", day, hours(day, 0, 12))
+    processor = PriceProcessor(tmp_path / "ticks")
+    engine = engine_for(tmp_path, ["H1", "D1"])
+
+    with pytest.raises(ValueError):
+        processor.update_symbol_bars("BTCUSD", engine, datetime(2024, 1, 3))
+    assert processor.update_symbol_bars("BTCUSD", engine, datetime(2024, 1, 3), datetime(2024, 1, 2)) == {"H1": 11, "D1": 0}
+
+    write_day(tmp_path / "ticks", "BTCUSD", day, hours(day, 12, 24))
+    assert processor.update_symbol_bars("BTCUSD", engine, datetime(2024, 1, 3)) == {"H1": 12, "D1": 0}
+    assert engine.bars("BTCUSD", "D1")["tick_count"].tolist() == [24]
+
+
+def test_ticks_arriving_later_in_the_last_millisecond_are_counted(tmp_path):
+    engine = engine_for(tmp_path, ["M1"])
+    ticks = random_ticks().iloc[:100]
+    late = ticks.iloc[[-1, -1]].assign(bid=ticks["bid"].iloc[-1] + 1e-3)
+
+    engine.update("EURUSD", ticks)
+    engine.update("EURUSD", pd.concat([ticks.iloc[-1:], late.iloc[:1]]))
+    engine.update("EURUSD", pd.concat([ticks.iloc[-1:], late]))
+
+    assert engine.load_state("EURUSD")["last_tick_count"] == 3
+    bars = engine.bars("EURUSD", "M1")
+    assert bars["tick_count"].sum() == 102
+    assert bars["bid_close"].iloc[-1] == late["bid"].iloc[-1]
+
+
+def test_store_compacts_once_it_has_too_many_parts(tmp_path):
+    store = BarStore(tmp_path / "bars", max_parts=3)
+    engine = IncrementalBarEngine(store, tmp_path / "state", ["M1"])
+    ticks = random_ticks().iloc[:5000]
+    for batch in np.array_split(ticks, 10):
+        engine.update("EURUSD", batch)
+
+    parts = [p.name for p in store.parts("EURUSD", "M1")]
+    assert parts[0] == "month-202401.parquet" and len(parts) <= 4
+    expected = build_ladder(ticks.index, ticks["bid"], ticks["ask"], ["M1"], ticks["volume"])["M1"]
+    assert engine.bars("EURUSD", "M1").index.equals(expected.index)
+
+
+def test_compaction_never_rewrites_earlier_months(tmp_path):
+    store = BarStore(tmp_path / "bars", max_parts=None)
+    times = pd.date_range("2024-01-20", "2024-02-10", freq="7min")
+    bid = np.linspace(1.1, 1.2, len(times))
+    bars = build_ladder(times, bid, bid + 2e-4, ["H1"])["H1"]
+    january, february = bars.loc[:"2024-01-31"], bars.loc["2024-02-01":]
+    store.append("EURUSD", "H1", january)
+    store.compact("EURUSD", "H1")
+    compacted = store.month_path("EURUSD", "H1", january.index[0])
+    written = compacted.stat().st_mtime_ns
+
+    for chunk in np.array_split(february, 3):
+        store.append("EURUSD", "H1", chunk)
+    store.compact("EURUSD", "H1")
+
+    assert [p.name for p in store.parts("EURUSD", "H1")] == ["month-202401.parquet", "month-202402.parquet"]
+    assert compacted.stat().st_mtime_ns == written
+    assert store.read("EURUSD", "H1").index.equals(bars.index)
+
+
+def test_processor_picks_up_ticks_written_later_in_the_same_millisecond(tmp_path):
+    day = date(2024, 1, 2)
+    write_day(tmp_path / "ticks", "BTCUSD", day, hours(day, 0, 12))
+    processor = PriceProcessor(tmp_path / "ticks")
+    engine = engine_for(tmp_path, ["H1"])
+    processor.update_symbol_bars("BTCUSD", engine, datetime(2024, 1, 3), datetime(2024, 1, 2))
+
+    write_day(tmp_path / "ticks", "BTCUSD", day, hours(day, 11, 12) * 2)
+    processor.update_symbol_bars("BTCUSD", engine, datetime(2024, 1, 3))
+
+    assert engine.bars("BTCUSD", "H1")["tick_count"].tolist() == [1] * 11 + [3]
@@ -0,0 +1,28 @@
+# migrate_schema_test.py
+
+from migrate_schema import MIGRATIONS_DIR, NO_TRANSACTION, discover_migrations, split_statements
+
+
+def test_migrations_are_numbered_and_ordered(tmp_path):
+    for name in ("010_later.sql", "002_second.sql", "001_first.sql", "notes.sql"):
+        (tmp_path / name).write_text("SELECT 1;")
+
+    assert [(v, n) for v, n, _ in discover_migrations(tmp_path)] == [
+        (1, "first"), (2, "second"), (10, "later"),
+    ]
+
+
+def test_shipped_migrations_have_unique_versions():
+    versions = [version for version, _, _ in discover_migrations(MIGRATIONS_DIR)]
+    assert versions == sorted(set(versions))
+    assert versions[:2] == [1, 2]
+
+
+def test_no_transaction_migrations_split_into_statements():
+    sql = (MIGRATIONS_DIR / "003_tick_bars_continuous_aggregates.sql").read_text(encoding="utf-8-sig")
+    statements = split_statements(sql)
+
+    assert sql.startswith(NO_TRANSACTION)
+    assert len(statements) == 10
+    assert statements[0].startswith("CREATE MATERIALIZED VIEW IF NOT EXISTS market_data.tick_bars_1m")
+    assert all(s.rstrip().endswith(";") for s in statements)
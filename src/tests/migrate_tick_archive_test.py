@@ -0,0 +1,39 @@
+# migrate_tick_archive_test.py
+
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from migrate_tick_archive import discover_legacy_files, migrate_day
+from tick_dataset import FILE_SCHEMA, partition_dir
+
+
+def test_legacy_days_are_merged_into_one_sorted_file(tmp_path):
+    source, target = tmp_path / "ticks", tmp_path / "dataset"
+    (source / "EURUSD").mkdir(parents=True)
+
+    # Old export (pandas, ns timestamps) and a later collector part for the same day
+    pd.DataFrame({
+        "tick_time": pd.to_datetime(["2024-01-02 10:00:02", "2024-01-02 10:00:01"]),
+        "bid_price": [1.2, 1.1], "ask_price": [1.2002, 1.1002],
+        "last_price": [None, None], "volume": [None, None], "spread": [0.0002, 0.0002], "tick_size": [None, None],
+    }).to_parquet(source / "EURUSD" / "20240102.parquet", index=False)
+    pd.DataFrame({
+        "symbol": ["EURUSD", "EURUSD"],
+        "tick_time": pd.to_datetime(["2024-01-02 10:00:02", "2024-01-02 10:00:03"]),
+        "bid_price": [1.2, 1.3], "ask_price": [1.2002, 1.3002], "spread": [0.0002, 0.0002],
+    }).to_parquet(source / "EURUSD" / "20240102_001.parquet", index=False)
+    (source / "EURUSD" / "notes.txt").write_text("not a tick file")
+
+    days = discover_legacy_files(source)
+    assert list(days) == [("EURUSD", date(2024, 1, 2))]
+
+    rows = migrate_day("EURUSD", date(2024, 1, 2), days[("EURUSD", date(2024, 1, 2))], target)
+    # Re-running merges with what is already there instead of duplicating it
+    rows = migrate_day("EURUSD", date(2024, 1, 2), days[("EURUSD", date(2024, 1, 2))], target)
+
+    table = pq.ParquetFile(partition_dir(target, "EURUSD", date(2024, 1, 2)) / "part-000.parquet").read()
+    assert rows == 3
+    assert table.schema == FILE_SCHEMA
+    assert table["tick_time"].to_pylist() == [datetime(2024, 1, 2, 10, 0, s) for s in (1, 2, 3)]
@@ -0,0 +1,118 @@
+# parquet_writer_test.py
+
+from datetime import date, datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import parquet_writer
+from parquet_writer import RollingParquetWriter
+from tick_dataset import FILE_SCHEMA, open_writer, partition_dir
+
+
+def test_row_groups_are_flushed_by_size(tmp_path):
+    writer = RollingParquetWriter(tmp_path, row_group_size=3, flush_interval=3600)
+    start = datetime(2024, 1, 2, 10, 0, 0)
+    for i in range(7):
+        writer.write("EURUSD", start + timedelta(seconds=i), 1.1 + i * 1e-5, 1.1002 + i * 1e-5)
+
+    # Nothing is visible until the file is finalized
+    partition = partition_dir(tmp_path, "EURUSD", date(2024, 1, 2))
+    assert not list(partition.glob("*.parquet"))
+    writer.close()
+
+    parquet_file = pq.ParquetFile(partition / "part-000.parquet")
+    assert parquet_file.schema_arrow == FILE_SCHEMA
+    assert parquet_file.metadata.num_rows == 7
+    assert parquet_file.metadata.num_row_groups == 3
+    assert parquet_file.metadata.row_group(0).sorting_columns[0].column_index == 0
+
+
+def test_rolls_at_day_boundary_and_keeps_repeated_ticks(tmp_path):
+    writer = RollingParquetWriter(tmp_path, row_group_size=100)
+    late = datetime(2024, 1, 2, 23, 59, 59)
+    writer.write("XAUUSD", late, 2050.1, 2050.4)
+    writer.write("XAUUSD", late, 2050.1, 2050.4)
+    writer.write("XAUUSD", late + timedelta(seconds=2), 2050.2, 2050.5)
+    writer.close()
+
+    first = pq.read_table(partition_dir(tmp_path, "XAUUSD", date(2024, 1, 2)) / "part-000.parquet")
+    second = pq.read_table(partition_dir(tmp_path, "XAUUSD", date(2024, 1, 3)) / "part-000.parquet")
+    assert first.num_rows == 2
+    assert second.num_rows == 1
+    assert second["spread"][0].as_py() == 2050.5 - 2050.2
+
+
+def test_new_session_does_not_overwrite_finalized_file(tmp_path):
+    tick_time = datetime(2024, 1, 2, 12, 0, 0)
+    for bid in (1.0, 2.0):
+        writer = RollingParquetWriter(tmp_path)
+        writer.write("AUDUSD", tick_time, bid, bid + 0.1)
+        writer.close()
+
+    files = sorted(p.name for p in partition_dir(tmp_path, "AUDUSD", date(2024, 1, 2)).iterdir())
+    assert files == ["part-000.parquet", "part-001.parquet"]
+
+
+def test_tables_are_split_at_midnight_and_buffered_as_chunks(tmp_path):
+    writer = RollingParquetWriter(tmp_path, row_group_size=1000)
+    times = [datetime(2024, 1, 2, 23, 59, 58), datetime(2024, 1, 2, 23, 59, 59, 500000),
+             datetime(2024, 1, 2, 23, 59, 59, 500000), datetime(2024, 1, 3, 0, 0, 1)]
+    writer.write_table("EURUSD", pa.table({
+        "symbol": ["EURUSD"] * 4,
+        "tick_time": pa.array(times, pa.timestamp("ms")),
+        "bid_price": [1.1] * 4,
+        "ask_price": [1.1002] * 4,
+        "last_price": pa.array([None] * 4, pa.float64()),
+        "volume": [1.0] * 4,
+        "spread": [0.0002] * 4,
+        "tick_size": [0.00001] * 4,
+    }))
+    assert len(writer._files["EURUSD"].chunks) == 1
+    writer.close()
+
+    first = pq.read_table(partition_dir(tmp_path, "EURUSD", date(2024, 1, 2)) / "part-000.parquet")
+    second = pq.read_table(partition_dir(tmp_path, "EURUSD", date(2024, 1, 3)) / "part-000.parquet")
+    assert first["tick_time"].to_pylist() == times[:3]
+    assert second["tick_time"].to_pylist() == times[3:]
+    assert first["tick_size"].to_pylist() == [0.00001] * 3
+
+
+def test_ticks_of_a_failed_write_are_kept_and_written_to_a_new_part(tmp_path, monkeypatch):
+    opened = []
+
+    def failing_first(path, **options):
+        opened.append(path)
+        if len(opened) == 1:
+            return FailingWriter()
+        return open_writer(path, **options)
+    monkeypatch.setattr(parquet_writer, "open_writer", failing_first)
+
+    writer = RollingParquetWriter(tmp_path, row_group_size=2, max_buffered_rows=3)
+    start = datetime(2024, 1, 2, 10)
+    for i in range(4):
+        writer.write("EURUSD", start + timedelta(seconds=i), 1.1 + i * 1e-5, 1.1002 + i * 1e-5)
+    writer.close()
+
+    table = pq.read_table(partition_dir(tmp_path, "EURUSD", date(2024, 1, 2)))
+    assert table["tick_time"].to_pylist() == [start + timedelta(seconds=i) for i in range(4)]
+
+
+def test_unwritten_ticks_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(parquet_writer, "open_writer", lambda path, **options: FailingWriter())
+    writer = RollingParquetWriter(tmp_path, row_group_size=2, max_buffered_rows=3)
+    start = datetime(2024, 1, 2, 10)
+    for i in range(6):
+        writer.write("EURUSD", start + timedelta(seconds=i), 1.1, 1.1002)
+
+    buffered = writer._files["EURUSD"]
+    assert len(buffered) == 3
+    assert pa.concat_tables(buffered.chunks)["tick_time"].to_pylist() == [start + timedelta(seconds=i) for i in (3, 4, 5)]
+
+
+class FailingWriter:
+    def write_table(self, table):
+        raise OSError("disk full")
+
+    def close(self):
+        pass
@@ -0,0 +1,116 @@
+# price_processor_test.py
+
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from price_processor import PriceProcessor
+from tick_cache import TickCache
+from tick_dataset import next_part_path, open_writer, partition_dir, to_file_table
+
+
+def write_day(base, symbol, day, times, row_group_size=6):
+    directory = partition_dir(base, symbol, day)
+    directory.mkdir(parents=True, exist_ok=True)
+    table = to_file_table(pa.table({
+        "tick_time": pa.array(times, pa.timestamp("ms")),
+        "bid_price": [1.1] * len(times),
+        "ask_price": [1.1002] * len(times),
+        "volume": [1.0] * len(times),
+    }))
+    with open_writer(next_part_path(directory)) as writer:
+        writer.write_table(table, row_group_size=row_group_size)
+
+
+def hours(day, first=0, last=24):
+    return [datetime.combine(day, datetime.min.time()) + timedelta(hours=h) for h in range(first, last)]
+
+
+def test_range_read_is_projected_sorted_and_inclusive(tmp_path):
+    for day in (date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)):
+        write_day(tmp_path, "EURUSD", day, hours(day))
+    write_day(tmp_path, "XAUUSD", date(2024, 1, 3), hours(date(2024, 1, 3)))
+
+    data = PriceProcessor(tmp_path).read_raw_data("EURUSD", datetime(2024, 1, 2, 22), datetime(2024, 1, 3, 2))
+
+    assert list(data.columns) == ["bid", "ask", "volume"]
+    assert list(data.index) == [datetime(2024, 1, 2, 22) + timedelta(hours=h) for h in range(5)]
+
+
+def test_overlapping_parts_are_sorted_and_deduplicated(tmp_path):
+    day = date(2024, 1, 2)
+    write_day(tmp_path, "EURUSD", day, hours(day, 10, 14))
+    write_day(tmp_path, "EURUSD", day, hours(day, 8, 12))
+
+    data = PriceProcessor(tmp_path).read_raw_data("EURUSD", datetime(2024, 1, 2), datetime(2024, 1, 3))
+
+    assert list(data.index) == hours(day, 8, 14)
+
+
+def test_missing_symbol_raises(tmp_path):
+    with pytest.raises(ValueError):
+        PriceProcessor(tmp_path).read_raw_data("EURUSD", datetime(2024, 1, 2), datetime(2024, 1, 3))
+
+
+def test_cached_reads_match_dataset_reads(tmp_path):
+    for day in (date(2024, 1, 2), date(2024, 1, 3)):
+        write_day(tmp_path / "archive", "EURUSD", day, hours(day))
+    cache = TickCache(tmp_path / "cache")
+    start, end = datetime(2024, 1, 2, 22), datetime(2024, 1, 3, 2)
+
+    expected = PriceProcessor(tmp_path / "archive").read_raw_data("EURUSD", start, end)
+    cached = PriceProcessor(tmp_path / "archive", cache=cache)
+    cached.read_raw_data("EURUSD", start, end)
+
+    assert cached.read_raw_data("EURUSD", start, end).equals(expected)
+    assert cache.hits == 2
+
+
+def test_cached_reads_of_unsorted_parts_are_filtered(tmp_path):
+    day = date(2024, 1, 2)
+    write_day(tmp_path / "archive", "EURUSD", day, hours(day, 10, 14))
+    write_day(tmp_path / "archive", "EURUSD", day, hours(day, 8, 12))
+    cached = PriceProcessor(tmp_path / "archive", cache=TickCache(tmp_path / "cache"))
+
+    data = cached.read_raw_data("EURUSD", datetime(2024, 1, 2, 9), datetime(2024, 1, 2, 12))
+
+    assert list(data.index) == hours(day, 9, 13)
+
+
+def test_market_gaps_follow_the_symbol_session(tmp_path):
+    index = pd.date_range("2024-01-05 20:00", "2024-01-06 02:00", freq="1h")
+    data = pd.DataFrame({"bid": 1.1, "ask": 1.1002}, index=index)
+    processor = PriceProcessor(tmp_path)
+
+    fx = processor._handle_market_gap(data.copy(), "EURUSD")
+    crypto = processor._handle_market_gap(data.copy(), "BTCUSD")
+
+    # Friday 22:00 break and Saturday are closed for FX; crypto trades throughout
+    assert fx["bid"].notna().tolist() == [True, True, False, True, False, False, False]
+    assert crypto["bid"].notna().all()
+
+
+def test_process_symbol_builds_ohlc_bars_with_empty_gaps(tmp_path):
+    day = date(2024, 1, 2)
+    write_day(tmp_path, "EURUSD", day, hours(day, 8, 10) + hours(day, 12, 13))
+
+    bars = PriceProcessor(tmp_path).process_symbol("EURUSD", datetime(2024, 1, 2), datetime(2024, 1, 3), "1h")
+
+    assert list(bars.index) == hours(day, 8, 13)
+    assert bars["tick_count"].tolist() == [1, 1, 0, 0, 1]
+    assert bars["bid_close"].notna().all()  # short gaps are forward filled
+
+
+def test_ladder_reads_once_and_returns_every_timeframe(tmp_path):
+    day = date(2024, 1, 2)
+    write_day(tmp_path, "BTCUSD", day, hours(day))
+
+    ladder = PriceProcessor(tmp_path).process_symbol_ladder(
+        "BTCUSD", datetime(2024, 1, 2), datetime(2024, 1, 3), ["M5", "H4", "D1"]
+    )
+
+    assert ladder["H4"]["tick_count"].tolist() == [4] * 6
+    assert ladder["D1"]["tick_count"].tolist() == [24]
+    assert ladder["M5"]["tick_count"].sum() == 24
@@ -0,0 +1,31 @@
+# sessions_test.py
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from sessions import CRYPTO, FX, INDEX_CFD, session_for
+
+
+def test_fx_closes_on_weekends_and_for_the_daily_break():
+    friday = datetime(2024, 1, 5)
+    assert FX.is_open(friday.replace(hour=21, minute=59))
+    assert not FX.is_open(friday.replace(hour=22, minute=30))
+    assert FX.is_open(friday.replace(hour=23))
+    assert not FX.is_open(datetime(2024, 1, 6, 12))
+    assert not FX.is_open(datetime(2024, 1, 7, 12))
+
+
+def test_symbols_map_to_sessions():
+    assert session_for("BTCUSD") is CRYPTO
+    assert session_for("USTEC") is INDEX_CFD
+    assert session_for("EURUSD") is FX
+    assert session_for(None) is FX
+
+
+def test_vector_mask_matches_scalar_checks():
+    index = pd.date_range("2023-12-30", "2024-01-09", freq="7min")
+    for session in (CRYPTO, FX, INDEX_CFD):
+        expected = np.array([session.is_open(ts) for ts in index])
+        np.testing.assert_array_equal(session.open_mask(index), expected)
@@ -0,0 +1,46 @@
+# spark_bars_test.py
+
+from datetime import date, datetime
+
+import pyarrow as pa
+import pytest
+
+pyspark = pytest.importorskip("pyspark")
+
+from pyspark.sql import SparkSession
+
+from spark_bars import build_bars, with_scan_order
+from tick_dataset import next_part_path, open_writer, partition_dir, to_file_table
+
+
+@pytest.fixture(scope="module")
+def spark():
+    session = SparkSession.builder \
+        .master("local[2]") \
+        .config("spark.sql.session.timeZone", "UTC") \
+        .config("spark.sql.shuffle.partitions", "4") \
+        .getOrCreate()
+    yield session
+    session.stop()
+
+
+def test_ticks_sharing_a_timestamp_keep_their_archive_order(spark, tmp_path):
+    # Every tick of the bar falls in the same millisecond; only the file order tells them apart
+    directory = partition_dir(tmp_path, "EURUSD", date(2024, 1, 2))
+    directory.mkdir(parents=True)
+    bids = [1.1003, 1.1001, 1.1004, 1.1000, 1.1002]
+    with open_writer(next_part_path(directory)) as writer:
+        writer.write_table(to_file_table(pa.table({
+            "tick_time": pa.array([datetime(2024, 1, 2, 10, 0, 0, 500_000)] * 5, pa.timestamp("ms")),
+            "bid_price": bids,
+            "ask_price": [bid + 0.0002 for bid in bids],
+            "volume": [1.0] * 5,
+        })))
+
+    ticks = with_scan_order(spark.read.parquet(str(tmp_path))).repartition(4)
+    bars = build_bars(ticks, ["M1", "M5"]).collect()
+
+    assert {row["timeframe"] for row in bars} == {"M1", "M5"}
+    for row in bars:
+        assert (row["bid_open"], row["bid_close"]) == (bids[0], bids[-1])
+        assert (row["bid_high"], row["bid_low"], row["tick_count"]) == (max(bids), min(bids), 5)
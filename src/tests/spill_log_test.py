@@ -0,0 +1,63 @@
+# spill_log_test.py
+
+import numpy as np
+
+from fake_mt5 import make_ticks
+from spill_log import SpillLog, read_segment
+from tick_columns import ticks_to_table
+
+START_MSC = 1_704_189_600_000
+
+
+def table(symbol, start, count):
+    return ticks_to_table(symbol, make_ticks(START_MSC + np.arange(start, start + count)))
+
+
+def test_replay_loads_segments_in_order_and_deletes_them(tmp_path):
+    log = SpillLog(tmp_path, segment_bytes=2048)
+    for i in range(10):
+        log.append(table("EURUSD", i * 20, 20))
+    assert len(log.sealed_segments()) > 1
+
+    loaded = []
+    assert log.replay(lambda t: loaded.append(t) or t.num_rows) == 200
+    times = np.concatenate([t["tick_time"].to_numpy() for t in loaded])
+    assert len(times) == 200 and (np.diff(times.astype(np.int64)) > 0).all()
+    assert not log.has_pending()
+    assert not list(tmp_path.iterdir())
+
+
+def test_failed_replay_keeps_segments(tmp_path):
+    log = SpillLog(tmp_path)
+    log.append(table("XAUUSD", 0, 5))
+
+    def down(t):
+        raise ConnectionError("PostgreSQL is unavailable")
+
+    assert log.replay(down) == 0
+    assert log.has_pending()
+    assert log.replay(lambda t: t.num_rows) == 5
+
+
+def test_open_segment_of_crashed_process_is_recovered(tmp_path):
+    log = SpillLog(tmp_path, fsync_interval=0)
+    log.append(table("US30", 0, 7))
+    log.append(table("US30", 7, 3))
+    # Simulate a crash: the writer is never closed and the tail is torn
+    log._file.flush()
+    path = log._path
+    path.write_bytes(path.read_bytes()[:-40])
+
+    recovered = SpillLog(tmp_path)
+    segments = recovered.sealed_segments()
+    assert len(segments) == 1
+    assert read_segment(segments[0]).num_rows == 7
+
+    recovered.append(table("US30", 10, 1))
+    assert recovered.replay(lambda t: t.num_rows) == 8
+
+
+def test_rejects_nothing_for_empty_tables(tmp_path):
+    log = SpillLog(tmp_path)
+    log.append(table("US30", 0, 0))
+    assert not log.has_pending()
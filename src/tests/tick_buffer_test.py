@@ -0,0 +1,112 @@
+# tick_buffer_test.py
+
+import threading
+
+import numpy as np
+import pytest
+
+from fake_mt5 import make_ticks
+from tick_buffer import BLOCK, BUFFER_DTYPE, DROP_OLDEST, SPILL, TickRingBuffer
+
+START_MSC = 1_704_189_600_000
+
+
+def ticks(start, count):
+    return make_ticks(START_MSC + np.arange(start, start + count))
+
+
+def test_compact_storage():
+    assert BUFFER_DTYPE.itemsize == 48
+    assert TickRingBuffer("EURUSD", capacity=1000)._data.nbytes == 48_000
+
+
+def test_drain_preserves_order_across_wraparound():
+    buffer = TickRingBuffer("EURUSD", capacity=8)
+    buffer.put(ticks(0, 6))
+    assert list(buffer.drain(4)["time_msc"] - START_MSC) == [0, 1, 2, 3]
+    buffer.put(ticks(6, 5))
+
+    drained = buffer.drain()
+    assert list(drained["time_msc"] - START_MSC) == [4, 5, 6, 7, 8, 9, 10]
+    np.testing.assert_array_equal(drained["bid"][2:], ticks(6, 5)["bid"])
+    assert len(buffer) == 0
+
+
+def test_drop_oldest_counts_drops():
+    buffer = TickRingBuffer("EURUSD", capacity=5, policy=DROP_OLDEST)
+    buffer.put(ticks(0, 3))
+    buffer.put(ticks(3, 4))
+    buffer.put(ticks(7, 12))
+
+    assert list(buffer.drain()["time_msc"] - START_MSC) == [14, 15, 16, 17, 18]
+    assert buffer.stats() == {"symbol": "EURUSD", "buffered": 0, "accepted": 19,
+                              "dropped": 14, "spilled": 0}
+
+
+def test_spill_receives_oldest_ticks_in_order():
+    spilled = []
+    buffer = TickRingBuffer("XAUUSD", capacity=4, policy=SPILL,
+                            spill=lambda symbol, rows: spilled.append((symbol, rows)))
+    buffer.put(ticks(0, 4))
+    buffer.put(ticks(4, 6))
+
+    spilled_times = np.concatenate([rows["time_msc"] for _, rows in spilled]) - START_MSC
+    assert list(spilled_times) == [0, 1, 2, 3, 4, 5]
+    assert list(buffer.drain()["time_msc"] - START_MSC) == [6, 7, 8, 9]
+    assert buffer.spilled == 6 and buffer.dropped == 0
+
+
+def test_block_waits_for_consumer():
+    buffer = TickRingBuffer("US30", capacity=4, policy=BLOCK)
+    buffer.put(ticks(0, 4))
+    producer = threading.Thread(target=buffer.put, args=(ticks(4, 2),))
+    producer.start()
+    producer.join(timeout=0.2)
+    assert producer.is_alive()
+
+    assert len(buffer.drain()) == 4
+    producer.join(timeout=1)
+    assert not producer.is_alive()
+    assert list(buffer.drain()["time_msc"] - START_MSC) == [4, 5]
+    assert buffer.dropped == 0
+
+
+def test_spill_policy_requires_callback():
+    with pytest.raises(ValueError):
+        TickRingBuffer("US30", policy=SPILL)
+
+
+def test_requeue_puts_ticks_back_in_front_without_counting_them():
+    buffer = TickRingBuffer("EURUSD", capacity=8)
+    buffer.put(ticks(0, 6))
+    drained = buffer.drain()
+    buffer.put(ticks(6, 2))
+    buffer.requeue(drained)
+
+    assert list(buffer.drain()["time_msc"] - START_MSC) == [0, 1, 2, 3, 4, 5, 6, 7]
+    assert buffer.accepted == 8 and buffer.dropped == 0
+
+
+def test_requeue_overflow_drops_the_oldest_requeued_ticks():
+    buffer = TickRingBuffer("EURUSD", capacity=5, policy=DROP_OLDEST)
+    buffer.put(ticks(0, 4))
+    drained = buffer.drain()
+    buffer.put(ticks(4, 3))
+    buffer.requeue(drained)
+
+    assert list(buffer.drain()["time_msc"] - START_MSC) == [2, 3, 4, 5, 6]
+    assert buffer.stats()["accepted"] == 7 and buffer.dropped == 2
+
+
+def test_requeue_overflow_spills_the_oldest_requeued_ticks():
+    spilled = []
+    buffer = TickRingBuffer("XAUUSD", capacity=3, policy=SPILL,
+                            spill=lambda symbol, rows: spilled.append(rows))
+    buffer.put(ticks(0, 3))
+    drained = buffer.drain()
+    buffer.put(ticks(3, 2))
+    buffer.requeue(drained)
+
+    assert list(np.concatenate(spilled)["time_msc"] - START_MSC) == [0, 1]
+    assert list(buffer.drain()["time_msc"] - START_MSC) == [2, 3, 4]
+    assert buffer.spilled == 2
@@ -0,0 +1,84 @@
+# tick_cache_test.py
+
+import os
+from datetime import date, datetime, timedelta
+
+import pyarrow as pa
+
+from tick_cache import TickCache
+from tick_dataset import FILE_SCHEMA, next_part_path, open_writer, partition_dir, to_file_table
+
+
+def write_day(base, day, count=100):
+    directory = partition_dir(base, "EURUSD", day)
+    directory.mkdir(parents=True, exist_ok=True)
+    start = datetime.combine(day, datetime.min.time())
+    path = next_part_path(directory)
+    with open_writer(path) as writer:
+        writer.write_table(to_file_table(pa.table({
+            "tick_time": pa.array([start + timedelta(seconds=i) for i in range(count)], pa.timestamp("ms")),
+            "bid_price": [1.1] * count,
+            "ask_price": [1.1002] * count,
+        })))
+    return path
+
+
+def test_second_read_is_a_memory_mapped_hit(tmp_path):
+    day = date(2024, 1, 2)
+    files = [write_day(tmp_path / "archive", day)]
+    cache = TickCache(tmp_path / "cache")
+
+    first = cache.get("EURUSD", day, files)
+    allocated = pa.total_allocated_bytes()
+    second = cache.get("EURUSD", day, files)
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second.schema == FILE_SCHEMA
+    assert second.equals(first)
+    # Zero-copy: the column buffers live in the mapped file, not on the heap
+    assert pa.total_allocated_bytes() - allocated < second.nbytes
+
+
+def test_rewritten_partition_replaces_its_entry(tmp_path):
+    day = date(2024, 1, 2)
+    cache = TickCache(tmp_path / "cache")
+    first = [write_day(tmp_path / "archive", day)]
+    cache.get("EURUSD", day, first)
+
+    table = cache.get("EURUSD", day, first + [write_day(tmp_path / "archive", day, count=10)])
+
+    assert table.num_rows == 110
+    assert cache.misses == 2
+    assert len(cache.entries()) == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    days = [date(2024, 1, d) for d in (2, 3, 4)]
+    files = {day: [write_day(tmp_path / "archive", day)] for day in days}
+    cache = TickCache(tmp_path / "cache")
+    for day in days:
+        cache.get("EURUSD", day, files[day])
+    entry_size = cache.entries()[0][1]
+
+    # Make Jan 2 the most recently used, then shrink the cache to two entries
+    for age, day in enumerate([date(2024, 1, 3), date(2024, 1, 4), date(2024, 1, 2)]):
+        path = cache.entry_path("EURUSD", day, files[day])
+        os.utime(path, ns=(age * 10**9, age * 10**9))
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+
+    assert sorted(path.name[:10] for path, _, _ in cache.entries()) == ["2024-01-02", "2024-01-04"]
+
+
+def test_entry_larger_than_the_budget_is_still_returned(tmp_path):
+    day = date(2024, 1, 2)
+    files = [write_day(tmp_path / "archive", day)]
+    cache = TickCache(tmp_path / "cache", max_bytes=100)
+
+    table = cache.get("EURUSD", day, files)
+
+    assert table.num_rows == 100
+    # The oversized entry stays until a later insert needs the room
+    assert len(cache.entries()) == 1
+    assert cache.get("EURUSD", date(2024, 1, 3), [write_day(tmp_path / "archive", date(2024, 1, 3))]).num_rows == 100
+    assert [path.name[:10] for path, _, _ in cache.entries()] == ["2024-01-03"]
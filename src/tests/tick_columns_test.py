@@ -0,0 +1,45 @@
+# tick_columns_test.py
+
+from datetime import datetime
+
+import numpy as np
+
+from fake_mt5 import make_ticks as make_mt5_ticks
+from tick_columns import ticks_to_table
+
+
+def make_ticks(count, start_msc=1_704_189_600_000, step_ms=137):
+    return make_mt5_ticks(start_msc + np.arange(count) * step_ms)
+
+
+def test_matches_per_tick_conversion():
+    ticks = make_ticks(500)
+    table = ticks_to_table("EURUSD", ticks)
+
+    assert table.num_rows == 500
+    assert set(table["symbol"].to_pylist()) == {"EURUSD"}
+    for i in (0, 1, 250, 499):
+        tick = ticks[i]
+        assert table["tick_time"][i].as_py() == datetime.fromtimestamp(tick["time_msc"] / 1000)
+        assert table["bid_price"][i].as_py() == float(tick["bid"])
+        assert table["ask_price"][i].as_py() == float(tick["ask"])
+        assert table["spread"][i].as_py() == float(tick["ask"] - tick["bid"])
+        assert table["volume"][i].as_py() == int(tick["volume"])
+        assert table["tick_size"][i].as_py() == float(tick["volume_real"])
+
+
+def test_missing_optional_fields_become_nulls():
+    full = make_ticks(3)
+    dtype = np.dtype([("time", "<i8"), ("bid", "<f8"), ("ask", "<f8")])
+    ticks = np.zeros(3, dtype=dtype)
+    for name in dtype.names:
+        ticks[name] = full[name]
+
+    table = ticks_to_table("XAUUSD", ticks)
+    assert table["last_price"].null_count == 3
+    assert table["volume"].null_count == 3
+    assert table["tick_time"][2].as_py() == datetime.fromtimestamp(int(full["time"][2]))
+
+
+def test_empty_batch():
+    assert ticks_to_table("AUDUSD", make_ticks(0)).num_rows == 0
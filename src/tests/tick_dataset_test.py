@@ -0,0 +1,94 @@
+# tick_dataset_test.py
+
+from datetime import date, datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from tick_dataset import (
+    DATASET_SCHEMA, FILE_SCHEMA, in_progress_path, install_partition_file,
+    next_part_path, open_dataset, open_writer, partition_dir, sort_ticks, to_file_table,
+)
+
+
+def file_table(times, bids):
+    return to_file_table(pa.table({
+        "tick_time": pa.array(times, pa.timestamp("ms")),
+        "bid_price": bids,
+        "ask_price": [bid + 0.0002 for bid in bids],
+    }))
+
+
+def write_partition(base, symbol, day, table):
+    directory = partition_dir(base, symbol, day)
+    directory.mkdir(parents=True, exist_ok=True)
+    with open_writer(next_part_path(directory)) as writer:
+        writer.write_table(table)
+
+
+def test_legacy_collector_schema_is_normalized():
+    legacy = pa.table({
+        "symbol": ["EURUSD"],
+        "tick_time": pa.array([datetime(2024, 1, 2, 10, 0, 0, 123456)], pa.timestamp("ns")),
+        "bid_price": [1.1],
+        "ask_price": [1.1002],
+    })
+    table = to_file_table(legacy)
+
+    assert table.schema == FILE_SCHEMA
+    assert table["tick_time"][0].as_py() == datetime(2024, 1, 2, 10, 0, 0, 123000)
+    assert table["spread"][0].as_py() == 1.1002 - 1.1
+    assert table["volume"].null_count == 1
+
+
+def test_sort_ticks_orders_and_drops_repeats():
+    t = [datetime(2024, 1, 2, 10, 0, s) for s in (2, 1, 2, 1)]
+    table = sort_ticks(file_table(t, [1.2, 1.1, 1.2, 1.3]))
+
+    assert table["bid_price"].to_pylist() == [1.1, 1.3, 1.2]
+
+
+def test_sort_ticks_keeps_the_order_of_ticks_within_a_millisecond():
+    t = [datetime(2024, 1, 2, 10, 0, 1)] * 5 + [datetime(2024, 1, 2, 10, 0, 0)]
+    table = sort_ticks(file_table(t, [1.3, 1.1, 1.3, 1.2, 1.1, 1.4]))
+
+    assert table["bid_price"].to_pylist() == [1.4, 1.3, 1.1, 1.2]
+    assert table["tick_time"].to_pylist() == [t[-1]] + t[:3]
+
+
+def test_sort_ticks_keeps_ticks_differing_only_in_volume():
+    t = [datetime(2024, 1, 2, 10, 0, 1)] * 3
+    table = file_table(t, [1.1] * 3).set_column(
+        FILE_SCHEMA.get_field_index("volume"), "volume", pa.array([2.0, 1.0, 2.0]))
+
+    assert sort_ticks(table)["volume"].to_pylist() == [2.0, 1.0]
+
+
+def test_installed_file_replaces_all_parts(tmp_path):
+    day = date(2024, 1, 2)
+    table = file_table([datetime(2024, 1, 2, 10)], [1.1])
+    write_partition(tmp_path, "EURUSD", day, table)
+    write_partition(tmp_path, "EURUSD", day, table)
+
+    partition = partition_dir(tmp_path, "EURUSD", day)
+    staged = in_progress_path(partition / "new.parquet")
+    pq.write_table(table, staged)
+    install_partition_file(staged, partition)
+
+    assert [p.name for p in partition.iterdir()] == ["part-000.parquet"]
+
+
+def test_dataset_filters_on_partitions_and_skips_in_progress_files(tmp_path):
+    for symbol in ("EURUSD", "XAUUSD"):
+        for day in (date(2024, 1, 2), date(2024, 1, 3)):
+            write_partition(tmp_path, symbol, day, file_table([datetime.combine(day, datetime.min.time())], [1.1]))
+    in_progress_path(partition_dir(tmp_path, "EURUSD", date(2024, 1, 3)) / "part-001.parquet").write_bytes(b"partial")
+
+    dataset = open_dataset(tmp_path)
+    table = dataset.to_table(filter=(ds.field("symbol") == "EURUSD") & (ds.field("date") >= date(2024, 1, 3)))
+
+    assert dataset.schema == DATASET_SCHEMA
+    assert table.num_rows == 1
+    assert table["symbol"].type == pa.dictionary(pa.int32(), pa.string())
+    assert table["tick_time"][0].as_py() == datetime(2024, 1, 3)
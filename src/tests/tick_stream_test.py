@@ -0,0 +1,54 @@
+# tick_stream_test.py
+
+import numpy as np
+
+from fake_mt5 import FakeMT5, make_ticks
+from tick_stream import TickStream
+
+START_MSC = 1_704_189_600_000
+
+
+def test_polls_are_complete_and_do_not_overlap():
+    # Bursts of several ticks in the same millisecond, straddling batch boundaries
+    time_msc = START_MSC + np.repeat(np.arange(0, 5000, 250), 7)
+    ticks = make_ticks(time_msc, bid=np.arange(len(time_msc)) * 1.0)
+    mt5 = FakeMT5(streams={"EURUSD": ticks[:40]})
+    stream = TickStream(mt5, batch_size=5, start_times={"EURUSD": START_MSC})
+
+    received = [stream.poll("EURUSD")]
+    assert stream.poll("EURUSD").size == 0
+
+    mt5.append_ticks("EURUSD", ticks[40:])
+    received.append(stream.poll("EURUSD"))
+
+    combined = np.concatenate(received)
+    np.testing.assert_array_equal(combined["bid"], ticks["bid"])
+    assert stream.last_time_msc("EURUSD") == int(time_msc[-1])
+
+
+def test_burst_larger_than_batch_grows_request():
+    time_msc = np.full(50, START_MSC + 10)
+    ticks = make_ticks(np.concatenate([time_msc, [START_MSC + 2000]]))
+    mt5 = FakeMT5(streams={"XAUUSD": ticks})
+    stream = TickStream(mt5, batch_size=8, start_times={"XAUUSD": START_MSC})
+
+    assert len(stream.poll("XAUUSD")) == 51
+
+
+def test_starts_at_current_tick_and_uses_few_calls():
+    ticks = make_ticks(START_MSC + np.arange(0, 10_000, 100))
+    mt5 = FakeMT5(streams={"US30": ticks[:10]})
+    stream = TickStream(mt5)
+
+    first = stream.poll("US30")
+    assert len(first) == 1
+    assert first["time_msc"][0] == ticks["time_msc"][9]
+
+    mt5.append_ticks("US30", ticks[10:])
+    mt5.calls.clear()
+    assert len(stream.poll("US30")) == 90
+    assert len(mt5.calls) == 1
+
+
+def test_unknown_symbol_returns_none():
+    assert TickStream(FakeMT5()).poll("NOPE") is None
@@ -0,0 +1,90 @@
+# bar_queries.py: OHLC bars from the tick_bars_* continuous aggregates
+
+import pandas as pd
+from datetime import timedelta
+
+# Bar width and view per timeframe (docker/migrations/003_tick_bars_continuous_aggregates.sql),
+# finest first: each view rolls up from the one before it
+BAR_VIEWS = {
+    "M1": ("market_data.tick_bars_1m", timedelta(minutes=1)),
+    "M5": ("market_data.tick_bars_5m", timedelta(minutes=5)),
+    "M15": ("market_data.tick_bars_15m", timedelta(minutes=15)),
+    "H1": ("market_data.tick_bars_1h", timedelta(hours=1)),
+    "D1": ("market_data.tick_bars_1d", timedelta(days=1)),
+}
+
+BAR_COLUMNS = ("bucket", "open", "high", "low", "close",
+               "spread_min", "spread_max", "spread_mean", "tick_count", "volume")
+
+# Materialized bars up to the symbol's watermark, raw tick aggregation past it.
+# Both sides select every bar overlapping [start, end).
+BARS_QUERY = """
+    WITH watermark AS (
+        SELECT COALESCE(MAX(bucket) + %(width)s, '-infinity'::timestamp) AS ts
+        FROM {view}
+        WHERE symbol = %(symbol)s
+    )
+    SELECT bucket, open, high, low, close,
+           spread_min, spread_max, spread_sum / tick_count AS spread_mean, tick_count, volume
+    FROM {view}
+    WHERE symbol = %(symbol)s
+      AND bucket >= time_bucket(%(width)s, %(start)s::timestamp)
+      AND bucket < %(end)s
+      AND bucket < (SELECT ts FROM watermark)
+    UNION ALL
+    SELECT time_bucket(%(width)s, tick_time) AS bucket,
+           first(bid_price, tick_time), max(bid_price), min(bid_price), last(bid_price, tick_time),
+           min(ask_price - bid_price), max(ask_price - bid_price), avg(ask_price - bid_price),
+           count(*), sum(volume)
+    FROM market_data.tick_data
+    WHERE symbol = %(symbol)s
+      AND tick_time >= GREATEST(time_bucket(%(width)s, %(start)s::timestamp), (SELECT ts FROM watermark))
+      AND tick_time < %(end)s
+    GROUP BY 1
+    ORDER BY bucket;
+"""
+
+
+def resolve_timeframe(timeframe):
+    """Accept a Timeframe member or its name; only the aggregated ones are valid."""
+    name = getattr(timeframe, "name", timeframe)
+    if name not in BAR_VIEWS:
+        raise ValueError(f"No continuous aggregate for timeframe {name}; available: {', '.join(BAR_VIEWS)}")
+    return name
+
+
+def fetch_bars(conn, symbol, timeframe, start, end):
+    """
+    Fetch bid OHLC bars for `symbol` in [start, end) as a DataFrame indexed by bucket.
+
+    Bars already materialized by the refresh policies come from the
+    continuous aggregate (an index range scan); buckets past the last
+    materialized one are aggregated from tick_data on the fly, so the most
+    recent bars are always included.
+    """
+    view, width = BAR_VIEWS[resolve_timeframe(timeframe)]
+    with conn.cursor() as cursor:
+        cursor.execute(BARS_QUERY.format(view=view), {
+            "symbol": symbol, "width": width, "start": start, "end": end,
+        })
+        rows = cursor.fetchall()
+    conn.rollback()
+    return pd.DataFrame(rows, columns=BAR_COLUMNS).set_index("bucket")
+
+
+def refresh_bars(conn, start, end):
+    """
+    Materialize all bar views for [start, end), finest first.
+
+    The refresh policies only look back a few hours, so this is needed after
+    backfilling older ticks. `conn` must be in autocommit mode.
+    """
+    with conn.cursor() as cursor:
+        for view, width in BAR_VIEWS.values():
+            # Start widens to a whole bucket; end stops at the last complete one
+            # so the still-open bucket stays on the raw aggregation path
+            cursor.execute(
+                "CALL refresh_continuous_aggregate(%s, time_bucket(%s, %s::timestamp), "
+                "time_bucket(%s, %s::timestamp));",
+                (view, width, start, width, end),
+            )
@@ -0,0 +1,67 @@
+# bulk_loader.py: COPY-based bulk ingestion into market_data.tick_data
+
+import io
+import pyarrow.csv as pacsv
+
+# Columns that identify a tick; duplicates on these are skipped on merge
+CONFLICT_COLUMNS = ("symbol", "tick_time", "bid_price", "ask_price")
+
+STAGING_TABLE = "tick_data_staging"
+
+
+def _ensure_staging_table(cursor):
+    cursor.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+            symbol TEXT,
+            tick_time TIMESTAMP,
+            bid_price DOUBLE PRECISION,
+            ask_price DOUBLE PRECISION,
+            last_price DOUBLE PRECISION,
+            volume DOUBLE PRECISION,
+            spread DOUBLE PRECISION,
+            tick_size DOUBLE PRECISION
+        );
+        TRUNCATE {STAGING_TABLE};
+    """)
+
+
+def _merge_staging(cursor, columns, table):
+    column_list = ", ".join(columns)
+    cursor.execute(f"""
+        INSERT INTO {table} ({column_list})
+        SELECT {column_list} FROM {STAGING_TABLE}
+        ON CONFLICT ({", ".join(CONFLICT_COLUMNS)}) DO NOTHING;
+    """)
+    return cursor.rowcount
+
+
+def copy_tick_table(conn, table, target="market_data.tick_data"):
+    """
+    Bulk load an Arrow table of ticks with COPY and merge it into `target`.
+
+    The table is rendered as CSV by Arrow in one vectorized pass, copied
+    into a session-local staging table in a single round-trip and then
+    merged with ON CONFLICT DO NOTHING on the tick key, so duplicates are
+    skipped. The transaction is left open; committing is up to the caller.
+    Column names of `table` must match tick_data columns.
+
+    Returns:
+        Number of rows inserted into `target`
+    """
+    if not table.num_rows:
+        return 0
+
+    payload = io.BytesIO()
+    pacsv.write_csv(table, payload, pacsv.WriteOptions(include_header=False))
+    payload.seek(0)
+
+    cursor = conn.cursor()
+    try:
+        _ensure_staging_table(cursor)
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} ({', '.join(table.column_names)}) FROM STDIN WITH (FORMAT csv)",
+            payload,
+        )
+        return _merge_staging(cursor, table.column_names, target)
+    finally:
+        cursor.close()
@@ -0,0 +1,76 @@
+# sessions.py: Vectorized trading-session calendar per symbol
+
+import numpy as np
+import pandas as pd
+from datetime import time
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# 1970-01-01, minute 0 of the epoch, was a Thursday
+_EPOCH_WEEKDAY = 3
+
+
+class Session:
+    """
+    Weekly trading session as a lookup table with one flag per minute of the week.
+
+    Times are wall-clock times of the tick data (the terminal's local time,
+    like tick_time). open_mask() checks a whole DatetimeIndex with integer
+    arithmetic and one table lookup, so masking a year of minute bars costs
+    milliseconds.
+
+    Args:
+        name: Name of the session definition
+        weekdays: Days the market trades (0 = Monday)
+        breaks: Daily (start, end) times when the market is closed
+    """
+
+    def __init__(self, name, weekdays=range(7), breaks=()):
+        self.name = name
+        self.weekdays = tuple(weekdays)
+        self.breaks = tuple(breaks)
+
+        minutes = np.zeros(MINUTES_PER_WEEK, dtype=bool)
+        for weekday in self.weekdays:
+            minutes[weekday * MINUTES_PER_DAY:(weekday + 1) * MINUTES_PER_DAY] = True
+        for start, end in self.breaks:
+            first, last = start.hour * 60 + start.minute, end.hour * 60 + end.minute
+            for weekday in range(7):
+                minutes[weekday * MINUTES_PER_DAY + first:weekday * MINUTES_PER_DAY + last] = False
+        self.minutes = minutes
+
+    def __repr__(self):
+        return f"Session({self.name!r})"
+
+    def open_mask(self, index):
+        """Boolean array, True where the market is open at each timestamp of `index`."""
+        epoch_minutes = pd.DatetimeIndex(index).asi8 // 60_000_000_000
+        return self.minutes[(epoch_minutes + _EPOCH_WEEKDAY * MINUTES_PER_DAY) % MINUTES_PER_WEEK]
+
+    def is_open(self, timestamp):
+        """Whether the market is open at a single timestamp."""
+        return bool(self.minutes[timestamp.weekday() * MINUTES_PER_DAY + timestamp.hour * 60 + timestamp.minute])
+
+
+# Crypto trades around the clock
+CRYPTO = Session("crypto")
+
+# FX and metals: Monday to Friday, with the daily rollover break
+FX = Session("fx", weekdays=range(5), breaks=[(time(22, 0), time(23, 0))])
+
+# Index CFDs: Monday to Friday, with a longer break around the US cash close
+INDEX_CFD = Session("index_cfd", weekdays=range(5), breaks=[(time(21, 0), time(23, 0))])
+
+SYMBOL_SESSIONS = {
+    "BTCUSD": CRYPTO,
+    "BTCJPY": CRYPTO,
+    "US30": INDEX_CFD,
+    "US500": INDEX_CFD,
+    "USTEC": INDEX_CFD,
+}
+
+
+def session_for(symbol):
+    """Session of a symbol; anything not listed trades FX hours."""
+    return SYMBOL_SESSIONS.get(symbol, FX)
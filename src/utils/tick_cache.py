@@ -0,0 +1,125 @@
+# tick_cache.py: Memory-mapped Arrow IPC cache of decoded tick partitions
+
+import os
+import hashlib
+import logging
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from tick_dataset import to_file_table
+
+
+def fingerprint(paths):
+    """Short hash of the names, sizes and modification times of the source files."""
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = Path(path).stat()
+        digest.update(f"{Path(path).name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+class TickCache:
+    """
+    Local cache of decoded (symbol, day) tick partitions as uncompressed Arrow IPC files.
+
+    A partition is decoded from Parquet once and stored under
+    `{cache_dir}/{symbol}/{YYYY-MM-DD}-{fingerprint}.arrow`. The fingerprint
+    covers the partition's files, so a partition that was rewritten (new
+    collector part, compaction) gets a new entry. Reads memory-map the entry:
+    nothing is decoded or copied, and processes reading the same day share
+    the pages in the OS cache.
+
+    Entries are evicted least recently used first once the cache grows past
+    `max_bytes`. An entry's modification time is its last use, so recency is
+    shared by every process using the directory.
+
+    Args:
+        cache_dir: Directory for the cache files
+        max_bytes: Size the cache is trimmed to after every insert
+    """
+
+    def __init__(self, cache_dir, max_bytes=8 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, symbol, day, paths):
+        return self.cache_dir / symbol / f"{day.isoformat()}-{fingerprint(paths)}.arrow"
+
+    def get(self, symbol, day, paths):
+        """Table (tick_dataset.FILE_SCHEMA) of a partition, given its part files."""
+        path = self.entry_path(symbol, day, paths)
+        try:
+            table = self._open(path)
+            os.utime(path)
+            self.hits += 1
+            return table
+        except FileNotFoundError:
+            pass
+
+        self.misses += 1
+        table = pa.concat_tables([to_file_table(pq.read_table(p, partitioning=None)) for p in paths])
+        self._store(path, table)
+        # Map the new entry before anything can evict it; the mapping stays
+        # valid even if another process removes the file afterwards
+        table = self._open(path)
+
+        # Entries of earlier versions of the partition can never be hit again
+        for stale in path.parent.glob(f"{day.isoformat()}-*.arrow"):
+            if stale != path:
+                self._remove(stale)
+        self.evict(keep=path)
+        return table
+
+    def _open(self, path):
+        return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+    def _store(self, path, table):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Another process may store the same entry concurrently; both renames are complete files
+        temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with pa.OSFile(str(temporary), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temporary, path)
+
+    def _remove(self, path):
+        try:
+            path.unlink()
+            return True
+        except OSError as e:
+            # Still mapped by a reader on Windows; it goes on a later eviction
+            logging.debug(f"Could not evict {path}: {e}")
+            return False
+
+    def entries(self):
+        """[(path, size, last use)] of every entry, least recently used first."""
+        entries = []
+        for path in self.cache_dir.glob("*/*.arrow"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime_ns))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+
+        `keep` (the entry just stored) is never removed, even if it alone is
+        larger than max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep and self._remove(path):
+                total -= size
+        return total
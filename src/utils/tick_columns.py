@@ -0,0 +1,84 @@
+# tick_columns.py: Vectorized conversion of MT5 tick arrays into columnar tables
+
+import time
+import numpy as np
+import pyarrow as pa
+
+# Arrow schema matching the columns of market_data.tick_data
+TICK_TABLE_SCHEMA = pa.schema([
+    ("symbol", pa.string()),
+    ("tick_time", pa.timestamp("ms")),
+    ("bid_price", pa.float64()),
+    ("ask_price", pa.float64()),
+    ("last_price", pa.float64()),
+    ("volume", pa.float64()),
+    ("spread", pa.float64()),
+    ("tick_size", pa.float64()),
+])
+
+_MS_PER_HOUR = 3_600_000
+
+
+def epoch_ms_to_local(epoch_ms):
+    """
+    Shift epoch milliseconds to naive local wall-clock milliseconds.
+
+    Matches `datetime.fromtimestamp`, which the tick tables have always been
+    filled with. UTC offsets only change on hour boundaries, so the offset is
+    looked up once per distinct hour instead of once per tick.
+    """
+    epoch_ms = np.asarray(epoch_ms, dtype=np.int64)
+    if not len(epoch_ms):
+        return epoch_ms
+    hours, inverse = np.unique(epoch_ms // _MS_PER_HOUR, return_inverse=True)
+    offsets = np.fromiter(
+        (time.localtime(int(hour) * 3600).tm_gmtoff * 1000 for hour in hours),
+        dtype=np.int64, count=len(hours),
+    )
+    return epoch_ms + offsets[inverse]
+
+
+def _optional_column(ticks, name, length):
+    # Field presence is checked once per batch, not per tick
+    if name in ticks.dtype.names:
+        return pa.array(ticks[name].astype(np.float64, copy=False))
+    return pa.nulls(length, pa.float64())
+
+
+def ticks_to_table(symbol, ticks):
+    """
+    Convert a structured array from `mt5.copy_ticks_*` into an Arrow table.
+
+    Args:
+        symbol: The trading symbol the ticks belong to
+        ticks: Structured NumPy array with at least time/bid/ask fields
+
+    Returns:
+        pyarrow.Table with TICK_TABLE_SCHEMA
+    """
+    length = len(ticks)
+    names = ticks.dtype.names
+
+    # time_msc carries millisecond precision; fall back to whole seconds
+    if "time_msc" in names:
+        epoch_ms = ticks["time_msc"].astype(np.int64, copy=False)
+    else:
+        epoch_ms = ticks["time"].astype(np.int64) * 1000
+    tick_time = epoch_ms_to_local(epoch_ms).view("datetime64[ms]")
+
+    bid = ticks["bid"].astype(np.float64, copy=False)
+    ask = ticks["ask"].astype(np.float64, copy=False)
+
+    return pa.Table.from_arrays(
+        [
+            pa.repeat(pa.scalar(symbol, pa.string()), length),
+            pa.array(tick_time, pa.timestamp("ms")),
+            pa.array(bid),
+            pa.array(ask),
+            _optional_column(ticks, "last", length),
+            _optional_column(ticks, "volume", length),
+            pa.array(ask - bid),
+            _optional_column(ticks, "volume_real", length),  # stored as tick_size
+        ],
+        schema=TICK_TABLE_SCHEMA,
+    )
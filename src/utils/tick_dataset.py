@@ -0,0 +1,189 @@
+# tick_dataset.py: Canonical schema and hive-partitioned layout of the Parquet tick archive
+
+import os
+import re
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pathlib import Path
+from datetime import date
+from tick_columns import TICK_TABLE_SCHEMA
+
+# Columns stored in every file; symbol and date live in the directory names:
+#
+#     {base}/symbol=EURUSD/date=2024-01-02/part-000.parquet
+#
+# tick_time is a timestamp[ms], i.e. INT64 milliseconds in Parquet
+FILE_SCHEMA = pa.schema([field for field in TICK_TABLE_SCHEMA if field.name != "symbol"])
+
+PARTITION_SCHEMA = pa.schema([
+    ("symbol", pa.dictionary(pa.int32(), pa.string())),
+    ("date", pa.date32()),
+])
+
+# Schema seen by dataset readers
+DATASET_SCHEMA = pa.schema(list(FILE_SCHEMA) + list(PARTITION_SCHEMA))
+
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor="hive", dictionaries="infer")
+
+# Row group size for files written in one go (exports, rewrites)
+ROW_GROUP_SIZE = 100_000
+
+# Ticks of one timestamp with equal values in all of these are repeats of
+# the same tick (e.g. from overlapping parts)
+DEDUP_COLUMNS = ("tick_time", "bid_price", "ask_price", "last_price", "volume")
+
+# Rows within every file are ordered by tick_time, and the footer says so
+SORTING_COLUMNS = [pq.SortingColumn(FILE_SCHEMA.get_field_index("tick_time"))]
+
+# Files starting with '.' are skipped by pyarrow dataset discovery, so work in
+# progress is never read
+IN_PROGRESS_PREFIX = "."
+IN_PROGRESS_SUFFIX = ".inprogress"
+
+_PART_PATTERN = re.compile(r"part-(\d+)\.parquet")
+
+
+def partition_dir(base_dir, symbol, day):
+    """Directory of one (symbol, day) partition; `day` is a date."""
+    return Path(base_dir) / f"symbol={symbol}" / f"date={day.isoformat()}"
+
+
+def in_progress_path(path):
+    """Hidden name a file is written under until it is complete."""
+    path = Path(path)
+    return path.with_name(f"{IN_PROGRESS_PREFIX}{path.name}{IN_PROGRESS_SUFFIX}")
+
+
+def part_files(directory):
+    """Finished part files of a partition, in part order."""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    return sorted(p for p in directory.iterdir() if _PART_PATTERN.fullmatch(p.name))
+
+
+def next_part_path(directory):
+    """First part file name not used by a finished or in-progress file."""
+    directory = Path(directory)
+    part = 0
+    while True:
+        path = directory / f"part-{part:03d}.parquet"
+        if not path.exists() and not in_progress_path(path).exists():
+            return path
+        part += 1
+
+
+def open_writer(path, compression="snappy", **options):
+    """ParquetWriter for FILE_SCHEMA with column statistics and the sort order recorded."""
+    return pq.ParquetWriter(
+        path, FILE_SCHEMA, compression=compression,
+        write_statistics=True, sorting_columns=SORTING_COLUMNS, **options,
+    )
+
+
+def to_file_table(table):
+    """
+    Normalize a tick table of any earlier archive schema to FILE_SCHEMA.
+
+    Missing columns become nulls (spread is derived from bid/ask), extra ones
+    such as symbol are dropped, and timestamps are truncated to milliseconds.
+    """
+    columns = []
+    for field in FILE_SCHEMA:
+        if field.name in table.column_names:
+            columns.append(table[field.name].cast(field.type, safe=False))
+        elif field.name == "spread":
+            columns.append(pc.subtract(table["ask_price"].cast(pa.float64()),
+                                       table["bid_price"].cast(pa.float64())))
+        else:
+            columns.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(columns, schema=FILE_SCHEMA)
+
+
+def sort_ticks(table, deduplicate=True):
+    """
+    Sort a FILE_SCHEMA table by tick_time, dropping repeated ticks unless told not to.
+
+    The sort is stable, so ticks sharing a millisecond keep their order in
+    `table` (arrival order for parts concatenated in part order), which
+    decides bar opens and closes. Of the ticks of one timestamp with equal
+    DEDUP_COLUMNS, the first is kept, without reordering the rest.
+    """
+    times = table["tick_time"].cast(pa.int64()).to_numpy(zero_copy_only=False)
+    table = table.take(pa.array(np.argsort(times, kind="stable")))
+    if not deduplicate or table.num_rows < 2:
+        return table
+    first = table.select(list(DEDUP_COLUMNS)).append_column("row", pa.array(np.arange(table.num_rows))) \
+        .group_by(list(DEDUP_COLUMNS), use_threads=False).aggregate([("row", "min")])
+    return table.take(pa.array(np.sort(first["row_min"].to_numpy())))
+
+
+def install_partition_file(path, directory):
+    """Make `path` the only file of the partition `directory` (as part-000.parquet)."""
+    return install_partition_files([path], directory)[0]
+
+
+def install_partition_files(paths, directory):
+    """
+    Make `paths` the only files of the partition `directory`.
+
+    The new files are first renamed in after the old parts, the old parts
+    are removed, and the new files are then renumbered part-000, part-001,
+    ... in order. Every step is a single rename or removal, so a concurrent
+    reader may briefly see old and new rows side by side, but never a
+    partition with rows missing, and part order stays the row order.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    old_parts = part_files(directory)
+    first = int(_PART_PATTERN.fullmatch(old_parts[-1].name).group(1)) + 1 if old_parts else 0
+    staged = []
+    for part, path in enumerate(paths, start=first):
+        target = directory / f"part-{part:03d}.parquet"
+        os.replace(path, target)
+        staged.append(target)
+    for stale in old_parts:
+        stale.unlink()
+    targets = []
+    for part, path in enumerate(staged):
+        target = directory / f"part-{part:03d}.parquet"
+        if path != target:
+            os.replace(path, target)
+        targets.append(target)
+    return targets
+
+
+def open_dataset(base_dir):
+    """pyarrow dataset over the archive, with symbol and date as partition columns."""
+    # The schema is discovered (every file has FILE_SCHEMA) so the symbol dictionary can be inferred
+    return ds.dataset(str(base_dir), format="parquet", partitioning=PARTITIONING)
+
+
+def symbol_partitions(base_dir, symbol, first_day, last_day):
+    """[(day, part files), ...] of one symbol from first_day to last_day, in time order."""
+    symbol_dir = Path(base_dir) / f"symbol={symbol}"
+    if not symbol_dir.exists():
+        return []
+    partitions = []
+    # ISO dates sort chronologically, and parts of a day are numbered in write order
+    for date_dir in sorted(symbol_dir.glob("date=*")):
+        day = date.fromisoformat(date_dir.name.split("=", 1)[1])
+        if first_day <= day <= last_day:
+            files = part_files(date_dir)
+            if files:
+                partitions.append((day, files))
+    return partitions
+
+
+def symbol_day_files(base_dir, symbol, first_day, last_day):
+    """Finished part files of one symbol's partitions from first_day to last_day, in time order."""
+    return [path for _, files in symbol_partitions(base_dir, symbol, first_day, last_day) for path in files]
+
+
+def open_files(base_dir, paths):
+    """pyarrow dataset over selected files of the archive, keeping their order."""
+    return ds.dataset([str(p) for p in paths], format="parquet",
+                      partitioning=PARTITIONING, partition_base_dir=str(base_dir))